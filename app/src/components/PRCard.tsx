@@ -1,15 +1,21 @@
 import React, { useState } from 'react';
 import { PR } from '../types/PR';
+import { PRDataService } from '../services/PRDataService';
 import { renderMarkdown } from '../utils/markdown';
 
 interface PRCardProps {
   pr: PR;
 }
 
-const PRCard: React.FC<PRCardProps> = ({ pr }) => {
+const PRCard: React.FC<PRCardProps> = ({ pr: listedPR }) => {
   const [isExpanded, setIsExpanded] = useState(false);
+  const [fullPR, setFullPR] = useState<PR | null>(null);
+  const pr = fullPR && fullPR.number === listedPR.number ? fullPR : listedPR;
 
   const toggleExpanded = () => {
+    if (!isExpanded && listedPR.detail && pr === listedPR) {
+      PRDataService.loadPRDetail(listedPR).then(setFullPR);
+    }
     setIsExpanded(!isExpanded);
   };
 
@@ -22,7 +28,8 @@ const PRCard: React.FC<PRCardProps> = ({ pr }) => {
   };
 
   // Clean up the summary text
-  let summary = pr.summary || 'No summary available';
+  const loadingDetail = isExpanded && pr.detail !== undefined && pr.summary === undefined;
+  let summary = pr.summary || (loadingDetail ? 'Loading…' : 'No summary available');
   if (summary.includes('Based on the git diff')) {
     summary = pr.details && pr.details.length > 0 ? pr.details[0] : 'No summary available';
   }
@@ -43,6 +50,21 @@ const PRCard: React.FC<PRCardProps> = ({ pr }) => {
             </a>
             <span>📅 {formatDate(pr.created)}</span>
             <span>👤 {pr.author}</span>
+            {pr.generated_by?.startsWith('rules:') && (
+              <span title="Summarized from a template, without the model">⚙️ {pr.generated_by.replace('rules:', '')}</span>
+            )}
+            {pr.generated_by?.startsWith('similar:') && (
+              <a
+                href={pr.url.replace(/\/pull\/\d+$/, `/pull/${pr.generated_by.replace('similar:', '')}`)}
+                target="_blank"
+                rel="noopener noreferrer"
+                onClick={(e) => e.stopPropagation()}
+                title="Summary reused from a nearly identical or reverted PR"
+                style={{ textDecoration: 'none' }}
+              >
+                ♻️ Reused from #{pr.generated_by.replace('similar:', '')}
+              </a>
+            )}
           </div>
           <div className="pr-title">{pr.generated_title}</div>
           
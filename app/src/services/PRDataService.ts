@@ -1,7 +1,12 @@
 import { PR } from '../types/PR';
 import { generatePRData } from './DataGenerator';
+import { SearchIndex } from './SearchIndex';
 
 export class PRDataService {
+  private static searchIndex: Promise<SearchIndex | null> | null = null;
+  private static searchIndexData: PR[] | null = null;
+  private static details = new Map<string, Promise<PR>>();
+
   static async loadPRData(): Promise<PR[]> {
     try {
       // Load the generated sample data
@@ -14,14 +19,52 @@ export class PRDataService {
     }
   }
 
+  // Full record of a PR from a compact payload; PRs without a detail file are already complete
+  static loadPRDetail(pr: PR): Promise<PR> {
+    const path = pr.detail;
+    if (!path) {
+      return Promise.resolve(pr);
+    }
+    let detail = this.details.get(path);
+    if (!detail) {
+      detail = fetch(`/${path}`)
+        .then(response => {
+          if (!response.ok) {
+            throw new Error(`Failed to fetch PR details: ${response.status} ${response.statusText}`);
+          }
+          return response.json();
+        })
+        .then((full: PR) => ({ ...pr, ...full }))
+        .catch(error => {
+          console.error(`Error fetching PR details from /${path}:`, error);
+          this.details.delete(path);
+          return pr;
+        });
+      this.details.set(path, detail);
+    }
+    return detail;
+  }
+
   static async searchPRs(query: string, data: PR[]): Promise<PR[]> {
+    // Load the prebuilt index once per data set
+    if (this.searchIndex === null || this.searchIndexData !== data) {
+      this.searchIndex = SearchIndex.load(data);
+      this.searchIndexData = data;
+    }
+
+    const index = await this.searchIndex;
+    if (index) {
+      return index.search(query);
+    }
+
+    // Fall back to a linear scan if the index is unavailable
     const lowercaseQuery = query.toLowerCase();
     return data.filter(pr =>
       pr.title.toLowerCase().includes(lowercaseQuery) ||
       pr.number.toString().includes(lowercaseQuery) ||
       pr.author.toLowerCase().includes(lowercaseQuery) ||
-      pr.summary.toLowerCase().includes(lowercaseQuery) ||
-      pr.details.some(detail => detail.toLowerCase().includes(lowercaseQuery))
+      (pr.summary || '').toLowerCase().includes(lowercaseQuery) ||
+      (pr.details || []).some(detail => detail.toLowerCase().includes(lowercaseQuery))
     );
   }
 }
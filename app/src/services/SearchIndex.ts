@@ -0,0 +1,83 @@
+import { PR } from '../types/PR';
+
+interface SearchIndexData {
+  version: number;
+  terms: [string, number[]][];
+  authors: [string, number[]][];
+}
+
+const TOKEN_REGEX = /[a-z0-9]+/g;
+
+// Index of the first entry whose key is >= prefix (entries are sorted by key)
+const lowerBound = (entries: [string, number[]][], prefix: string): number => {
+  let low = 0;
+  let high = entries.length;
+  while (low < high) {
+    const mid = (low + high) >>> 1;
+    if (entries[mid][0] < prefix) {
+      low = mid + 1;
+    } else {
+      high = mid;
+    }
+  }
+  return low;
+};
+
+// Union of the postings of every key starting with prefix
+const prefixMatches = (entries: [string, number[]][], prefix: string): Set<number> => {
+  const matches = new Set<number>();
+  for (let i = lowerBound(entries, prefix); i < entries.length && entries[i][0].startsWith(prefix); i++) {
+    entries[i][1].forEach(number => matches.add(number));
+  }
+  return matches;
+};
+
+export class SearchIndex {
+  private data: SearchIndexData;
+  private prsByNumber: Map<number, PR>;
+
+  constructor(data: SearchIndexData, prs: PR[]) {
+    this.data = data;
+    this.prsByNumber = new Map(prs.map(pr => [pr.number, pr] as [number, PR]));
+  }
+
+  static async load(prs: PR[]): Promise<SearchIndex | null> {
+    try {
+      const response = await fetch('/search-index.json');
+      if (!response.ok) {
+        throw new Error(`Failed to fetch search index: ${response.status} ${response.statusText}`);
+      }
+      const data: SearchIndexData = await response.json();
+      return new SearchIndex(data, prs);
+    } catch (error) {
+      console.error('Error fetching search index from /search-index.json:', error);
+      return null;
+    }
+  }
+
+  // Every query term must prefix-match a term of the PR; results keep the order of the PR list
+  search(query: string): PR[] {
+    const lowercaseQuery = query.toLowerCase().trim();
+    const queryTerms = lowercaseQuery.match(TOKEN_REGEX) || [];
+    if (queryTerms.length === 0) {
+      return [];
+    }
+
+    let result: Set<number> | null = null;
+    for (const term of queryTerms) {
+      const matches = prefixMatches(this.data.terms, term);
+      result = result === null ? matches : new Set(Array.from(result).filter(number => matches.has(number)));
+      if (result.size === 0) {
+        break;
+      }
+    }
+
+    // Authors may contain characters the tokenizer splits on (e.g. "docs-bot")
+    prefixMatches(this.data.authors, lowercaseQuery).forEach(number => result!.add(number));
+
+    return Array.from(result!)
+      .map(number => this.prsByNumber.get(number))
+      .filter((pr): pr is PR => pr !== undefined)
+      .sort((a, b) => b.number - a.number);
+  }
+}
@@ -2,15 +2,18 @@ export interface PR {
   number: number;
   title: string;
   author: string;
-  state: string;
+  state?: string;
   created: string;
   url: string;
-  repository: string;
-  analysis_date: string;
-  details: string[];
-  summary: string;
+  repository?: string;
+  analysis_date?: string;
+  details?: string[];
+  summary?: string;
   generated_title: string;
-  commits: string[];
-  original_description: string;
-  raw_analysis: string;
+  commits?: string[];
+  original_description?: string;
+  raw_analysis?: string;
+  generated_by?: string;
+  // Compact payloads: path of the full record, fetched when the card is expanded
+  detail?: string;
 }
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Storage backends for PR analyses
+The default keeps one JSON file per PR; the SQLite backend consolidates all analyses in one
+indexed database with existence checks, range queries by number/date and bulk export
+"""
+
+import os
+import json
+import sqlite3
+import argparse
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional, Set
+
+
+class AnalysisStore(ABC):
+    """Interface shared by all storage backends"""
+
+    @abstractmethod
+    def exists(self, number: int) -> bool:
+        """Check whether an analysis exists for the PR"""
+
+    @abstractmethod
+    def get(self, number: int) -> Optional[Dict[str, Any]]:
+        """Return the analysis of a PR, or None"""
+
+    @abstractmethod
+    def put(self, record: Dict[str, Any]):
+        """Insert or replace the analysis of a PR (record["number"] is the key)"""
+
+    @abstractmethod
+    def numbers(self) -> Set[int]:
+        """Return the numbers of all stored PRs"""
+
+    @abstractmethod
+    def query(self, min_number: Optional[int] = None, max_number: Optional[int] = None,
+              since: Optional[str] = None, until: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over analyses, newest PR number first
+
+        Args:
+            min_number: Smallest PR number to include
+            max_number: Largest PR number to include
+            since: Earliest "created" timestamp to include (ISO 8601)
+            until: Latest "created" timestamp to include (ISO 8601)
+        """
+
+    def export(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over all analyses, newest PR number first"""
+        return self.query()
+
+    @abstractmethod
+    def fingerprint(self) -> str:
+        """Return a value that changes whenever the stored analyses change"""
+
+
+class FileAnalysisStore(AnalysisStore):
+    def __init__(self, folder: str):
+        """
+        Store analyses as <folder>/<number>.json files (the layout of data/analysis)
+
+        Args:
+            folder: Analysis folder of one repository
+        """
+        self.folder = Path(folder)
+
+    def _path(self, number: int) -> Path:
+        return self.folder / f"{number}.json"
+
+    def exists(self, number: int) -> bool:
+        return self._path(number).exists()
+
+    def get(self, number: int) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(number), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def put(self, record: Dict[str, Any]):
+        self.folder.mkdir(parents=True, exist_ok=True)
+        with open(self._path(record["number"]), 'w', encoding='utf-8') as f:
+            json.dump(record, f, indent=2, ensure_ascii=False)
+
+    def numbers(self) -> Set[int]:
+        if not self.folder.is_dir():
+            return set()
+        numbers = set()
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                stem, ext = os.path.splitext(entry.name)
+                if ext == ".json" and stem.isdigit():
+                    numbers.add(int(stem))
+        return numbers
+
+    def query(self, min_number=None, max_number=None, since=None, until=None):
+        for number in sorted(self.numbers(), reverse=True):
+            if min_number is not None and number < min_number:
+                continue
+            if max_number is not None and number > max_number:
+                continue
+            record = self.get(number)
+            if record is None:
+                continue
+            created = record.get('created', '')
+            if since is not None and created < since:
+                continue
+            if until is not None and created > until:
+                continue
+            yield record
+
+    def fingerprint(self) -> str:
+        latest = 0.0
+        count = 0
+        if self.folder.is_dir():
+            with os.scandir(self.folder) as it:
+                for entry in it:
+                    if entry.name.endswith('.json'):
+                        count += 1
+                        latest = max(latest, entry.stat().st_mtime)
+        return f"{count}:{latest}"
+
+
+class SQLiteAnalysisStore(AnalysisStore):
+    def __init__(self, path: str, repository: Optional[str] = None):
+        """
+        Store analyses in one SQLite database, indexed by repository, number and creation date
+
+        Args:
+            path: Database file
+            repository: "owner/repo" this store reads and writes; None reads all repositories
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.repository = repository
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                repository TEXT NOT NULL,
+                number INTEGER NOT NULL,
+                created TEXT,
+                data TEXT NOT NULL,
+                PRIMARY KEY (repository, number)
+            );
+            CREATE INDEX IF NOT EXISTS analyses_created ON analyses (repository, created);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+        """)
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread, as sqlite3 connections are not shared across threads"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _where(self, clauses, params):
+        if self.repository is not None:
+            clauses.insert(0, "repository = ?")
+            params.insert(0, self.repository)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else ""
+
+    def _sql_params(self, base_sql, clauses, params):
+        """Fill the {where} placeholder of a query, adding the repository filter"""
+        clauses = list(clauses)
+        params = list(params)
+        where = self._where(clauses, params)
+        return base_sql.format(where=where), params
+
+    def exists(self, number: int) -> bool:
+        row = self._conn().execute(*self._sql_params("SELECT 1 FROM analyses{where} LIMIT 1",
+                                                     ["number = ?"], [number])).fetchone()
+        return row is not None
+
+    def get(self, number: int) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(*self._sql_params("SELECT data FROM analyses{where} LIMIT 1",
+                                                     ["number = ?"], [number])).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, record: Dict[str, Any]):
+        repository = record.get("repository") or self.repository or ""
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses (repository, number, created, data) VALUES (?, ?, ?, ?)",
+                (repository, record["number"], record.get("created"), json.dumps(record, ensure_ascii=False)),
+            )
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+            conn.commit()
+
+    def put_many(self, records):
+        """Insert or replace many analyses in one transaction"""
+        with self._write_lock:
+            conn = self._conn()
+            conn.executemany(
+                "INSERT OR REPLACE INTO analyses (repository, number, created, data) VALUES (?, ?, ?, ?)",
+                ((record.get("repository") or self.repository or "", record["number"], record.get("created"),
+                  json.dumps(record, ensure_ascii=False)) for record in records),
+            )
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+            conn.commit()
+
+    def numbers(self) -> Set[int]:
+        rows = self._conn().execute(*self._sql_params("SELECT number FROM analyses{where}", [], []))
+        return {row[0] for row in rows}
+
+    def query(self, min_number=None, max_number=None, since=None, until=None):
+        clauses = []
+        params = []
+        if min_number is not None:
+            clauses.append("number >= ?")
+            params.append(min_number)
+        if max_number is not None:
+            clauses.append("number <= ?")
+            params.append(max_number)
+        if since is not None:
+            clauses.append("created >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created <= ?")
+            params.append(until)
+        sql, params = self._sql_params("SELECT data FROM analyses{where} ORDER BY number DESC", clauses, params)
+        for row in self._conn().execute(sql, params):
+            yield json.loads(row[0])
+
+    def fingerprint(self) -> str:
+        version = self._conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+        return f"sqlite:{version}"
+
+
+def is_sqlite_location(location: str) -> bool:
+    """Check whether a store location names a SQLite database"""
+    return str(location).endswith((".sqlite", ".sqlite3", ".db"))
+
+
+def open_store(location: str, repository: Optional[str] = None) -> AnalysisStore:
+    """
+    Open the storage backend for a location
+
+    Args:
+        location: SQLite file (*.sqlite, *.sqlite3, *.db) or analysis folder of one repository
+        repository: "owner/repo" for SQLite stores shared by several repositories
+
+    Returns:
+        The matching store
+    """
+    if is_sqlite_location(location):
+        return SQLiteAnalysisStore(location, repository)
+    return FileAnalysisStore(location)
+
+
+def import_files(folder: str, store: AnalysisStore) -> int:
+    """
+    Import per-PR JSON files into another store
+
+    Args:
+        folder: Analysis folder with <number>.json files
+        store: Destination store
+
+    Returns:
+        Number of imported analyses
+    """
+    source = FileAnalysisStore(folder)
+    records = list(source.export())
+    if isinstance(store, SQLiteAnalysisStore):
+        store.put_many(records)
+    else:
+        for record in records:
+            store.put(record)
+    return len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the PR analysis store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Import per-PR JSON files into a store")
+    import_parser.add_argument("--from", dest="source", required=True, help="Analysis folder, e.g. data/analysis/github/docs")
+    import_parser.add_argument("--to", dest="target", required=True, help="Store location, e.g. data/analysis.sqlite")
+
+    export_parser = subparsers.add_parser("export", help="Export analyses as a JSON list")
+    export_parser.add_argument("--store", required=True, help="Store location")
+    export_parser.add_argument("--repository", help="Only export this owner/repo")
+    export_parser.add_argument("--output", required=True, help="Output JSON file")
+
+    args = parser.parse_args()
+
+    if args.command == "import":
+        count = import_files(args.source, open_store(args.target))
+        print(f"Imported {count} analyses from {args.source} into {args.target}")
+    elif args.command == "export":
+        records = list(open_store(args.store, args.repository).export())
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(records, f, indent=2, ensure_ascii=False)
+        print(f"Exported {len(records)} analyses to {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark
+Runs discovery, summarization and website data generation against local fake GitHub and
+OpenRouter services replaying the recorded PRs, and reports throughput, latency and memory
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import contextlib
+import tracemalloc
+import multiprocessing
+from typing import Dict, Any, List, Optional
+
+import requests
+
+from fake_services import (
+    FakeServiceConfig, FakeGitHubHandler, FakeOpenRouterHandler, load_corpus, start_server
+)
+from metrics import percentile
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, where the platform reports it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def serve_fakes(args: Dict[str, Any], ports):
+    """Child process entry point: serve both fake services until terminated"""
+    corpus = load_corpus(args["corpus"], args["prs"], args["diff_lines"], lockfile_lines=args["lockfile_lines"])
+    github = start_server(FakeGitHubHandler, corpus, FakeServiceConfig(
+        latency=args["github_latency"], rate_limit=args["github_rate_limit"],
+        error_rate=args["error_rate"], seed=args["seed"]))
+    openrouter = start_server(FakeOpenRouterHandler, corpus, FakeServiceConfig(
+        latency=0.0, rate_limit=args["llm_rate_limit"], error_rate=args["error_rate"], seed=args["seed"] + 1),
+        first_token_latency=args["llm_first_token"], tokens_per_second=args["llm_tps"],
+        straggler_rate=args["llm_straggler_rate"], straggler_delay=args["llm_straggler_delay"])
+    ports.put((github.server_port, openrouter.server_port, len(corpus)))
+    threading.Event().wait()
+
+
+def run_pipeline(args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    """
+    Run the three pipeline stages in workdir against the fake services
+
+    The pipeline modules read their endpoints from the environment at import
+    time, so they are imported only after the environment points at the fakes.
+
+    Returns:
+        Stage timings, per-PR latencies and client counters
+    """
+    from list_prs_without_summaries import list_prs_without_summaries
+    from http_cache import get_shared_session
+    from rate_limit import TokenBucket, get_shared_governor
+    from llm_cache import LLMCache
+    import generate_summary
+    from generate_website_data import build_website
+    from metrics import get_shared_metrics
+    from model_router import ModelRouter
+    from run_planner import RunBudget
+
+    owner, repo = args.repo.split("/")
+    data_folder = os.path.join(workdir, "data", "analysis")
+    output_dir = os.path.join(data_folder, owner, repo)
+    site_dir = os.path.join(workdir, "site")
+    os.makedirs(site_dir, exist_ok=True)
+
+    governor = get_shared_governor()
+    if not args.client_pacing:
+        for family in governor.buckets:
+            governor.buckets[family] = TokenBucket(capacity=1e9, rate=1e9)
+
+    # Time each PR through process_prs_batch's worker pool
+    pr_latencies = []
+    latency_lock = threading.Lock()
+    process_pr = generate_summary.process_pr
+
+    def timed_process_pr(*pr_args, **pr_kwargs):
+        start = time.perf_counter()
+        try:
+            return process_pr(*pr_args, **pr_kwargs)
+        finally:
+            with latency_lock:
+                pr_latencies.append(time.perf_counter() - start)
+
+    generate_summary.process_pr = timed_process_pr
+    stages = {}
+    try:
+        start = time.perf_counter()
+        listing = list_prs_without_summaries(owner, repo, "benchmark-token", args.days, data_folder,
+                                             os.path.join(workdir, "discovery.json"))
+        stages["discover"] = time.perf_counter() - start
+
+        analyzer = generate_summary.GitHubPRAnalyzer(
+            "benchmark-key", chunk_tokens=args.chunk_tokens, diff_budget=args.diff_budget,
+            router=ModelRouter(hedge_after=args.hedge_after),
+            llm_cache=LLMCache(os.path.join(workdir, ".cache", "llm")),
+            first_token_timeout=args.first_token_timeout, total_timeout=args.total_timeout,
+        )
+        budget = None
+        if args.max_tokens is not None or args.max_minutes is not None:
+            budget = RunBudget(analyzer.metrics, args.max_tokens,
+                               args.max_minutes * 60 if args.max_minutes is not None else None)
+        start = time.perf_counter()
+        results = generate_summary.process_prs_batch(
+            analyzer, owner, repo, [pr["number"] for pr in listing], output_dir,
+            concurrency=args.concurrency, listing={pr["number"]: pr for pr in listing}, backend=args.backend,
+            budget=budget,
+        )
+        stages["summarize"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        build_website(output_dir, os.path.join(site_dir, "pr-data.json"),
+                      manifest=os.path.join(workdir, ".cache", "website.manifest.json"),
+                      feed_output=os.path.join(site_dir, "feed.atom"))
+        stages["publish"] = time.perf_counter() - start
+    finally:
+        generate_summary.process_pr = process_pr
+
+    session = get_shared_session()
+    metrics = get_shared_metrics().report()
+    return {
+        "metrics": {"stages": metrics["stages"], "counters": metrics["counters"]},
+        "listed": len(listing),
+        "results": results,
+        "deferred": sorted(budget.deferred) if budget else [],
+        "stages": stages,
+        "pr_latencies": pr_latencies,
+        "llm_first_token": [entry["first_token"] for entry in analyzer.latencies if entry["first_token"] is not None],
+        "llm_total": [entry["total"] for entry in analyzer.latencies],
+        "client": {"retries": governor.retries, "http_cache_hits": session.hits, "http_cache_misses": session.misses},
+    }
+
+
+def summarize_run(run: Dict[str, Any], heap_peak: int, servers: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the benchmark report from a pipeline run"""
+    failed = sorted(number for number, error in run["results"].items() if error)
+    succeeded = len(run["results"]) - len(failed)
+    total = sum(run["stages"].values())
+
+    def latency_summary(values: List[float]) -> Dict[str, Optional[float]]:
+        return {
+            "p50": percentile(values, 0.5),
+            "p95": percentile(values, 0.95),
+            "max": max(values) if values else None,
+        }
+
+    return {
+        "prs_listed": run["listed"],
+        "prs_succeeded": succeeded,
+        "prs_failed": failed,
+        "prs_deferred": run["deferred"],
+        "stages_seconds": run["stages"],
+        "total_seconds": total,
+        "prs_per_minute": succeeded / run["stages"]["summarize"] * 60 if run["stages"].get("summarize") else 0.0,
+        "end_to_end_prs_per_minute": succeeded / total * 60 if total else 0.0,
+        "pr_latency_seconds": latency_summary(run["pr_latencies"]),
+        "llm_first_token_seconds": latency_summary(run["llm_first_token"]),
+        "llm_total_seconds": latency_summary(run["llm_total"]),
+        "peak_memory_mb": {"python_heap": heap_peak / (1024 * 1024), "rss": peak_rss_mb()},
+        "client": run["client"],
+        "pipeline": run["metrics"],
+        "servers": servers,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    """Print the benchmark report as a short table"""
+    def seconds(value):
+        return f"{value:.3f}s" if value is not None else "n/a"
+
+    print("\n=== Benchmark ===")
+    print(f"PRs: {report['prs_succeeded']}/{report['prs_listed']} succeeded, {len(report['prs_deferred'])} deferred")
+    for stage, duration in report["stages_seconds"].items():
+        print(f"  {stage:<10} {seconds(duration)}")
+    print(f"Throughput: {report['prs_per_minute']:.1f} PRs/min "
+          f"(end to end {report['end_to_end_prs_per_minute']:.1f} PRs/min)")
+    for name, label in (("pr_latency_seconds", "PR latency"), ("llm_first_token_seconds", "LLM first token"),
+                        ("llm_total_seconds", "LLM total")):
+        values = report[name]
+        print(f"{label}: "
+              f"p50 {seconds(values['p50'])}, p95 {seconds(values['p95'])}, max {seconds(values['max'])}")
+    memory = report["peak_memory_mb"]
+    rss = f"{memory['rss']:.1f} MB" if memory["rss"] is not None else "n/a"
+    print(f"Peak memory: Python heap {memory['python_heap']:.1f} MB, RSS {rss}")
+    print("Pipeline stages (total time across workers):")
+    for stage, stats in sorted(report["pipeline"]["stages"].items(), key=lambda item: -item[1]["total_seconds"]):
+        print(f"  {stage:<18} {stats['count']:>5} x  total {seconds(stats['total_seconds'])}  p95 {seconds(stats['p95_seconds'])}")
+    counters = report["pipeline"]["counters"]
+    print(f"Tokens: {int(counters.get('prompt_tokens', 0))} prompt ({int(counters.get('diff_tokens_saved', 0))} saved by "
+          f"diff compaction), {int(counters.get('completion_tokens', 0))} completion; "
+          f"GitHub bytes: {int(counters.get('github_bytes', 0))}")
+    print(f"Client retries: {report['client']['retries']}")
+    for name, stats in report["servers"].items():
+        print(f"{name}: {stats.get('requests', 0)} requests, {stats.get('rate_limited', 0)} rate limited, "
+              f"{stats.get('errors_injected', 0)} errors injected")
+
+
+def main():
+    """Main function to run the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline against local fake GitHub and OpenRouter services")
+    parser.add_argument("--corpus", default="data/analysis/github/docs", help="Recorded analyses to replay (default: data/analysis/github/docs)")
+    parser.add_argument("--repo", default="github/docs", help="Repository name used for the replayed PRs")
+    parser.add_argument("--prs", type=int, default=50, help="Number of recorded PRs to replay, newest first (default: 50, 0 for all)")
+    parser.add_argument("--diff-lines", type=int, default=20, help="Context lines per changed file in the synthesized diffs (default: 20)")
+    parser.add_argument("--lockfile-lines", type=int, default=0, help="Changed package-lock.json lines added to every PR (default: 0)")
+    parser.add_argument("--diff-budget", type=int, default=500000, help="Client diff byte budget per PR, 0 for no limit (default: 500000)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent PRs in generate_summary (default: 4)")
+    parser.add_argument("--backend", choices=["graphql", "rest"], default="graphql", help="Metadata backend (default: graphql)")
+    parser.add_argument("--chunk-tokens", type=int, default=30000, help="Token budget per LLM prompt (default: 30000)")
+    parser.add_argument("--days", type=int, default=1, help="Discovery window in days (default: 1)")
+    parser.add_argument("--github-latency", type=float, default=0.05, help="Seconds added to each GitHub response (default: 0.05)")
+    parser.add_argument("--github-rate-limit", type=int, default=0, help="GitHub requests per minute before 403s, 0 for none (default: 0)")
+    parser.add_argument("--llm-first-token", type=float, default=0.5, help="Seconds until the first LLM token (default: 0.5)")
+    parser.add_argument("--llm-tps", type=float, default=100, help="LLM output tokens per second (default: 100)")
+    parser.add_argument("--llm-straggler-rate", type=float, default=0.0, help="Fraction of LLM requests delayed by --llm-straggler-delay (default: 0)")
+    parser.add_argument("--llm-straggler-delay", type=float, default=30, help="Extra seconds before the first token of a straggler (default: 30)")
+    parser.add_argument("--hedge-after", type=float, help="Client hedging deadline in seconds (default: no hedging)")
+    parser.add_argument("--llm-rate-limit", type=int, default=0, help="LLM requests per minute before 429s, 0 for none (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 502 (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for error injection (default: 0)")
+    parser.add_argument("--max-tokens", type=int, help="Token cap of the run; PRs over it are deferred (default: no cap)")
+    parser.add_argument("--max-minutes", type=float, help="Wall-clock cap of the summarize stage in minutes (default: no cap)")
+    parser.add_argument("--first-token-timeout", type=float, default=30, help="Client first-token timeout in seconds (default: 30)")
+    parser.add_argument("--total-timeout", type=float, default=120, help="Client total LLM timeout in seconds (default: 120)")
+    parser.add_argument("--no-client-pacing", dest="client_pacing", action="store_false",
+                        help="Disable the client's own rate limit pacing to measure raw pipeline throughput")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    parser.add_argument("--keep-workdir", action="store_true", help="Keep the temporary working directory")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.corpus):
+        print(f"Error: corpus folder not found: {args.corpus}")
+        sys.exit(1)
+
+    ports = multiprocessing.Queue()
+    server_args = dict(vars(args), corpus=os.path.abspath(args.corpus))
+    servers = multiprocessing.Process(target=serve_fakes, args=(server_args, ports), daemon=True)
+    servers.start()
+    github_port, openrouter_port, corpus_size = ports.get(timeout=120)
+    github_url = f"http://127.0.0.1:{github_port}"
+    openrouter_url = f"http://127.0.0.1:{openrouter_port}"
+    print(f"Replaying {corpus_size} PRs: GitHub at {github_url}, OpenRouter at {openrouter_url}")
+
+    os.environ.update({
+        "GITHUB_API_URL": github_url,
+        "GITHUB_GRAPHQL_URL": f"{github_url}/graphql",
+        "OPENROUTER_BASE_URL": openrouter_url,
+        "GITHUB_TOKEN": "benchmark-token",
+    })
+
+    workdir = tempfile.mkdtemp(prefix="pr-summary-bench-")
+    original_cwd = os.getcwd()
+    output = None if args.output is None else os.path.abspath(args.output)
+    try:
+        # Relative cache folders (.cache/http, .cache/llm) start cold inside the working directory
+        os.chdir(workdir)
+        tracemalloc.start()
+        if args.verbose:
+            run = run_pipeline(args, workdir)
+        else:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                run = run_pipeline(args, workdir)
+        _, heap_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        server_stats = {
+            "github": requests.get(f"{github_url}/_stats", timeout=10).json(),
+            "openrouter": requests.get(f"{openrouter_url}/_stats", timeout=10).json(),
+        }
+    finally:
+        os.chdir(original_cwd)
+        servers.terminate()
+        if args.keep_workdir:
+            print(f"Working directory kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = summarize_run(run, heap_peak, server_stats)
+    print_report(report)
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
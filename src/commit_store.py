@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Persistent per-commit summary store
+Commit summaries are appended to a JSON lines file so sub-PRs repeated across "Repo sync" PRs are summarized once
+"""
+
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+
+class CommitSummaryStore:
+    def __init__(self, path: str):
+        """
+        Load the store from disk
+
+        Args:
+            path: JSON lines file with one {"sha", "summary", ...} record per line
+        """
+        self.path = Path(path)
+        self.summaries = {}
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self.summaries[record["sha"]] = record["summary"]
+                    except (ValueError, KeyError):
+                        # Ignore a partially written last line
+                        continue
+
+    def get(self, sha: str) -> Optional[str]:
+        """
+        Look up the summary of a commit
+
+        Args:
+            sha: Full commit SHA
+
+        Returns:
+            Stored summary, or None if the commit was never summarized
+        """
+        return self.summaries.get(sha)
+
+    def put(self, sha: str, summary: str, message: str = ""):
+        """
+        Append a commit summary to the store
+
+        Args:
+            sha: Full commit SHA
+            summary: Bullet point summary of the commit
+            message: First line of the commit message, kept for readability
+        """
+        record = {
+            "sha": sha,
+            "message": message,
+            "summary": summary,
+            "analysis_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with self._lock:
+            if sha in self.summaries:
+                return
+            self.summaries[sha] = summary
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def is_merge_commit(commit: Dict[str, Any]) -> bool:
+    """
+    Check whether a commit (REST shape) is a merge commit
+
+    Args:
+        commit: Commit from the PR commits listing
+
+    Returns:
+        True for merge commits, whose diff only repeats their merged commits
+    """
+    if "parents" in commit:
+        return len(commit["parents"]) > 1
+    message = commit.get('commit', {}).get('message', '')
+    return message.startswith(("Merge pull request", "Merge branch"))
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Hunk-aware git diff parsing and token-budgeted chunking
+Splits a unified diff into files and hunks and packs them into chunks that fit a prompt budget
+"""
+
+import re
+from typing import Dict, Any, List
+
+
+FILE_HEADER_RE = re.compile(r'^diff --git a/(.*?) b/(.*)$')
+HUNK_HEADER_RE = re.compile(r'^@@ ')
+
+# Rough average for code and prose with common tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text without a tokenizer
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Approximate token count
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def parse_diff(diff_content: str) -> List[Dict[str, Any]]:
+    """
+    Split a unified diff into files and hunks
+
+    Args:
+        diff_content: Raw git diff
+
+    Returns:
+        List of files, each with "path", "header" (text before the first hunk)
+        and "hunks" (list of hunk texts including their @@ line)
+    """
+    files = []
+    current = None
+    hunk_lines = None
+
+    def finish_hunk():
+        if current is not None and hunk_lines:
+            current["hunks"].append(''.join(hunk_lines))
+
+    for line in diff_content.splitlines(keepends=True):
+        match = FILE_HEADER_RE.match(line.rstrip('\n'))
+        if match:
+            finish_hunk()
+            hunk_lines = None
+            current = {"path": match.group(2), "header": line, "hunks": []}
+            files.append(current)
+        elif current is None:
+            # Preamble before the first file header; keep it with a pseudo file
+            current = {"path": "", "header": line, "hunks": []}
+            files.append(current)
+        elif HUNK_HEADER_RE.match(line):
+            finish_hunk()
+            hunk_lines = [line]
+        elif hunk_lines is not None:
+            hunk_lines.append(line)
+        else:
+            current["header"] += line
+
+    finish_hunk()
+    return files
+
+
+def _split_hunk(hunk: str, max_chars: int) -> List[str]:
+    """Split an oversized hunk on line boundaries, repeating its @@ line in each piece"""
+    lines = hunk.splitlines(keepends=True)
+    hunk_header, body = lines[0], lines[1:]
+    pieces = []
+    piece = [hunk_header]
+    size = len(hunk_header)
+
+    for line in body:
+        if size + len(line) > max_chars and len(piece) > 1:
+            pieces.append(''.join(piece))
+            piece = [hunk_header]
+            size = len(hunk_header)
+        # A single line longer than the budget (minified files) is cut
+        line = line[:max_chars]
+        piece.append(line)
+        size += len(line)
+
+    if len(piece) > 1:
+        pieces.append(''.join(piece))
+    return pieces
+
+
+def chunk_diff(diff_content: str, max_tokens: int) -> List[str]:
+    """
+    Group files and hunks into diff chunks that each fit a token budget
+
+    Hunks of one file stay together where possible; each chunk repeats the
+    file header so the model always knows which file a hunk belongs to.
+
+    Args:
+        diff_content: Raw git diff
+        max_tokens: Approximate token budget per chunk
+
+    Returns:
+        List of diff texts, in original order
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    current_size = 0
+
+    def flush():
+        nonlocal current, current_size
+        if current:
+            chunks.append(''.join(current))
+        current = []
+        current_size = 0
+
+    for file_diff in parse_diff(diff_content):
+        header = file_diff["header"]
+        header_in_chunk = False
+
+        if not file_diff["hunks"]:
+            # Renames, mode changes, binary files: header only
+            if current_size + len(header) > max_chars:
+                flush()
+            current.append(header[:max_chars])
+            current_size += len(header[:max_chars])
+            continue
+
+        for hunk in file_diff["hunks"]:
+            pieces = [hunk] if len(header) + len(hunk) <= max_chars else \
+                _split_hunk(hunk, max(max_chars - len(header), 1))
+            for piece in pieces:
+                needed = len(piece) + (0 if header_in_chunk else len(header))
+                if current_size + needed > max_chars:
+                    flush()
+                    header_in_chunk = False
+                    needed = len(piece) + len(header)
+                if not header_in_chunk:
+                    current.append(header)
+                    header_in_chunk = True
+                current.append(piece)
+                current_size += needed
+
+    flush()
+    return chunks
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Token-minimizing diff rewrite
+Rewrites a diff into a compact form before it goes into a prompt: trimmed context, no index or
+---/+++ headers, whitespace-only hunks collapsed, renames and moves reported as one line, and
+binary, minified and base64 noise replaced by short stat lines
+"""
+
+import re
+import hashlib
+from typing import List
+
+from diff_chunker import parse_diff
+from diff_filter import parse_stat_summary, stat_summary
+from trivial_prs import changed_lines, normalize_whitespace
+
+
+# Lines this long, or this long on average, only occur in minified or generated files
+MINIFIED_LINE_CHARS = 1000
+MINIFIED_AVERAGE_CHARS = 300
+
+BASE64_RE = re.compile(r'[A-Za-z0-9+/]{100,}={0,2}')
+
+DROPPED_HEADER_PREFIXES = ("index ", "--- ", "+++ ", "similarity index ", "dissimilarity index ", "rename to ")
+
+
+def compact_header(header: str) -> str:
+    """Keep the file line of a diff header and shorten the extended headers"""
+    lines = []
+    for line in header.splitlines(keepends=True):
+        if line.startswith(DROPPED_HEADER_PREFIXES):
+            continue
+        if line.startswith("new file mode"):
+            lines.append("new file\n")
+        elif line.startswith("deleted file mode"):
+            lines.append("deleted file\n")
+        elif line.startswith("rename from "):
+            lines.append(f"renamed from {line[len('rename from '):]}")
+        else:
+            lines.append(line)
+    return ''.join(lines)
+
+
+def trim_context(hunk: str, context_lines: int) -> str:
+    """
+    Keep only the context lines next to a change
+
+    Runs of context dropped between two changes are replaced by one " ..."
+    line, so separate changes are not read as adjacent.
+    """
+    lines = hunk.splitlines(keepends=True)
+    header, body = lines[0], lines[1:]
+    changed = [i for i, line in enumerate(body) if line.startswith(("+", "-"))]
+    if not changed:
+        return header
+    keep = set()
+    for i in changed:
+        keep.update(range(max(0, i - context_lines), min(len(body), i + context_lines + 1)))
+    result = [header]
+    skipped = False
+    for i, line in enumerate(body):
+        # "\ No newline at end of file" belongs to the line before it
+        if i in keep or (line.startswith("\\") and i - 1 in keep):
+            if skipped and len(result) > 1:
+                result.append(" ...\n")
+            skipped = False
+            result.append(line)
+        else:
+            skipped = True
+    return ''.join(result)
+
+
+def shorten_base64(line: str) -> str:
+    """Replace embedded base64 blobs (data URIs, inline images, keys) by their length"""
+    return BASE64_RE.sub(lambda match: f"<base64, {len(match.group(0))} chars>", line)
+
+
+def is_minified(added: List[str]) -> bool:
+    """Check whether added lines look like minified or generated code"""
+    if not added:
+        return False
+    longest = max(len(line) for line in added)
+    return longest > MINIFIED_LINE_CHARS or sum(len(line) for line in added) / len(added) > MINIFIED_AVERAGE_CHARS
+
+
+def content_key(lines: List[str]) -> str:
+    """Hash of a file's added or removed lines, to match moved files"""
+    return hashlib.sha256('\n'.join(lines).encode('utf-8')).hexdigest()
+
+
+def compact_diff(diff_content: str, context_lines: int = 1) -> str:
+    """
+    Rewrite a diff into a compact form for the prompt
+
+    Args:
+        diff_content: Diff as returned by fetch_pr_diff (stat summaries followed by the kept diff)
+        context_lines: Unchanged lines kept around each change
+
+    Returns:
+        Stat summaries of the files left out, followed by the compacted diff
+    """
+    summarized, diff = parse_stat_summary(diff_content)
+    files = parse_diff(diff)
+    preamble = ""
+    kept = []
+    added_files = {}
+    deleted_files = {}
+
+    for file in files:
+        if not file["path"]:
+            preamble += file["header"]
+            continue
+        header = file["header"]
+        removed, added = changed_lines(file["hunks"])
+        entry = {"filename": file["path"]}
+        if "\nnew file mode" in header:
+            entry["status"] = "added"
+        elif "\ndeleted file mode" in header:
+            entry["status"] = "removed"
+
+        if "\nBinary files " in header or "\nGIT binary patch" in header:
+            summarized.append((entry, "binary"))
+            continue
+        entry.update(additions=len(added), deletions=len(removed))
+        if is_minified(added):
+            summarized.append((entry, "minified"))
+            continue
+        if not file["hunks"] and "\nrename from " in header:
+            old_path = re.search(r'^rename from (.*)$', header, re.MULTILINE).group(1)
+            summarized.append(({"filename": file["path"], "status": "renamed"},
+                               f"renamed from {old_path} without changes"))
+            continue
+        if "\nnew file mode" in header and added and not removed:
+            added_files.setdefault(content_key(added), []).append(file)
+        elif "\ndeleted file mode" in header and removed and not added:
+            deleted_files.setdefault(content_key(removed), []).append(file)
+        kept.append(file)
+
+    # Moves git did not detect as renames: one file deleted and another added with the same content
+    moved = set()
+    for key, deleted in deleted_files.items():
+        for old, new in zip(deleted, added_files.get(key, [])):
+            moved.update((id(old), id(new)))
+            summarized.append(({"filename": new["path"], "status": "renamed"},
+                               f"moved from {old['path']} without changes"))
+
+    parts = []
+    for file in kept:
+        if id(file) in moved:
+            continue
+        parts.append(compact_header(file["header"]))
+        for hunk in file["hunks"]:
+            removed, added = changed_lines([hunk])
+            if (removed or added) and normalize_whitespace(file["path"], removed) == normalize_whitespace(file["path"], added):
+                header_line = hunk.splitlines(keepends=True)[0].rstrip('\n')
+                parts.append(f"{header_line} (whitespace-only changes, {len(removed) + len(added)} lines)\n")
+                continue
+            trimmed = trim_context(hunk, context_lines)
+            parts.append(''.join(shorten_base64(line) for line in trimmed.splitlines(keepends=True)))
+
+    return stat_summary(summarized) + preamble + ''.join(parts)
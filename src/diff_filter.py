@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Budgeted, file-aware diff download
+Streams a diff and keeps only the files worth sending to the model: lockfiles, generated files,
+binary assets and vendored paths are reduced to one-line stat summaries, and the remaining files
+are chosen by priority until a byte budget is filled
+"""
+
+import re
+import fnmatch
+import posixpath
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+import requests
+
+
+FILE_HEADER_RE = re.compile(r'^diff --git a/(.*?) b/(.*)$')
+FILE_STATUS_RE = re.compile(r'^(new file mode|deleted file mode|rename from) ')
+STAT_LINE_RE = re.compile(r'^# - (.+?)(?: \((\w+)\))?: ([^,]+?)(?:, \+(\d+) -(\d+))?$')
+
+# Same status names as the PR files listing
+FILE_STATUSES = {"new file mode": "added", "deleted file mode": "removed", "rename from": "renamed"}
+
+LOCKFILES = {
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml", "bun.lockb",
+    "Cargo.lock", "poetry.lock", "Pipfile.lock", "uv.lock", "Gemfile.lock", "composer.lock",
+    "go.sum", "mix.lock", "packages.lock.json", "flake.lock",
+}
+
+GENERATED_PATTERNS = [
+    "*.min.js", "*.min.css", "*.map", "*_pb2.py", "*_pb2_grpc.py", "*.pb.go", "*.generated.*",
+    "*.snap", "*/__snapshots__/*", "dist/*", "build/*", "*/dist/*",
+]
+
+VENDORED_PREFIXES = ("vendor/", "node_modules/", "third_party/", "third-party/", "external/", "bower_components/")
+
+BINARY_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".ico", ".webp", ".bmp", ".tiff", ".svg", ".pdf",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot", ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z",
+    ".jar", ".war", ".exe", ".dll", ".so", ".dylib", ".bin", ".wasm", ".mp3", ".mp4", ".mov",
+    ".webm", ".psd", ".sketch", ".fig",
+}
+
+# Lower ranks are included first when the budget is tight
+DATA_EXTENSIONS = {".json", ".yml", ".yaml", ".csv", ".tsv", ".xml", ".toml", ".ini", ".lock", ".txt"}
+TEST_MARKERS = ("test/", "tests/", "__tests__/", "spec/", "_test.", ".test.", ".spec.", "test_")
+
+STAT_HEADER = "# Files not included in this diff (changes summarized only):"
+
+# Bytes per changed line when a file's patch size is unknown
+BYTES_PER_CHANGED_LINE = 60
+FILE_HEADER_BYTES = 200
+
+
+def classify_path(path: str) -> Optional[str]:
+    """
+    Decide whether a file is only summarized instead of sent as a diff
+
+    Args:
+        path: Repository path of the file
+
+    Returns:
+        "lockfile", "generated", "binary" or "vendored", or None if the diff is useful
+    """
+    name = posixpath.basename(path)
+    if name in LOCKFILES:
+        return "lockfile"
+    if path.startswith(VENDORED_PREFIXES) or any(f"/{prefix}" in path for prefix in VENDORED_PREFIXES):
+        return "vendored"
+    if posixpath.splitext(name)[1].lower() in BINARY_EXTENSIONS:
+        return "binary"
+    if any(fnmatch.fnmatch(path, pattern) for pattern in GENERATED_PATTERNS):
+        return "generated"
+    return None
+
+
+def file_rank(path: str) -> int:
+    """Priority of a file: 0 for source and docs, 1 for tests, 2 for data and configuration"""
+    lowered = path.lower()
+    if any(marker in lowered for marker in TEST_MARKERS):
+        return 1
+    if posixpath.splitext(lowered)[1] in DATA_EXTENSIONS:
+        return 2
+    return 0
+
+
+def estimate_file_bytes(entry: Dict[str, Any]) -> int:
+    """Estimate the diff size of a file from the PR files listing"""
+    if entry.get("patch") is not None:
+        return len(entry["patch"]) + FILE_HEADER_BYTES
+    return entry.get("changes", 0) * BYTES_PER_CHANGED_LINE + FILE_HEADER_BYTES
+
+
+def select_files(files: List[Dict[str, Any]], budget_bytes: int) -> Tuple[Set[str], List[Tuple[Dict[str, Any], str]]]:
+    """
+    Choose the files whose diff is sent to the model
+
+    Files are taken by rank and then smallest first, so the budget covers as
+    many meaningful files as possible instead of one huge one.
+
+    Args:
+        files: Entries of the PR files listing (filename, status, additions, deletions, changes, patch)
+        budget_bytes: Byte budget for the included diffs
+
+    Returns:
+        Paths to include, and (entry, reason) for every file reduced to a stat summary
+    """
+    selected = set()
+    summarized = []
+    candidates = []
+    for entry in files:
+        reason = classify_path(entry["filename"])
+        if reason:
+            summarized.append((entry, reason))
+        else:
+            candidates.append(entry)
+
+    used = 0
+    for entry in sorted(candidates, key=lambda entry: (file_rank(entry["filename"]), estimate_file_bytes(entry))):
+        size = estimate_file_bytes(entry)
+        if used + size <= budget_bytes:
+            selected.add(entry["filename"])
+            used += size
+        else:
+            summarized.append((entry, "over budget"))
+    return selected, summarized
+
+
+def stat_summary(summarized: List[Tuple[Dict[str, Any], str]]) -> str:
+    """
+    Describe the files left out of the diff, one line each
+
+    Returns:
+        Text placed before the diff, or "" if no file was left out
+    """
+    if not summarized:
+        return ""
+    lines = [STAT_HEADER]
+    for entry, reason in sorted(summarized, key=lambda item: item[0]["filename"]):
+        stats = ""
+        if "additions" in entry or "deletions" in entry:
+            stats = f", +{entry.get('additions', 0)} -{entry.get('deletions', 0)}"
+        status = f" ({entry['status']})" if entry.get("status") else ""
+        lines.append(f"# - {entry['filename']}{status}: {reason}{stats}")
+    return '\n'.join(lines) + '\n'
+
+
+def parse_stat_summary(diff_content: str) -> Tuple[List[Tuple[Dict[str, Any], str]], str]:
+    """
+    Split a diff produced by stat_summary + diff back into its two parts
+
+    Returns:
+        (entry, reason) for every summarized file, and the remaining diff text
+    """
+    if not diff_content.startswith(STAT_HEADER):
+        return [], diff_content
+    summarized = []
+    lines = diff_content.split('\n')
+    index = 1
+    while index < len(lines):
+        match = STAT_LINE_RE.match(lines[index])
+        if not match:
+            break
+        path, status, reason, additions, deletions = match.groups()
+        entry = {"filename": path}
+        if status:
+            entry["status"] = status
+        if additions is not None:
+            entry["additions"] = int(additions)
+            entry["deletions"] = int(deletions)
+        summarized.append((entry, reason))
+        index += 1
+    return summarized, '\n'.join(lines[index:])
+
+
+def iter_response_lines(response: requests.Response, chunk_size: int = 65536) -> Iterable[Tuple[str, int]]:
+    """Yield the lines of a streamed response, keeping their line endings, with their size in bytes"""
+    pending = b""
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.decode("utf-8", errors="replace") + "\n", len(line) + 1
+    if pending:
+        yield pending.decode("utf-8", errors="replace"), len(pending)
+
+
+class BudgetExceeded(Exception):
+    """Raised when a diff streamed without a file selection does not fit the budget"""
+
+    def __init__(self, downloaded: int):
+        super().__init__(f"Diff exceeds the budget after {downloaded} bytes")
+        self.downloaded = downloaded
+
+
+def read_diff(response: requests.Response, budget_bytes: int, include: Optional[Set[str]] = None,
+              stop_on_overflow: bool = False) -> Tuple[str, List[Tuple[Dict[str, Any], str]], int]:
+    """
+    Read a streamed diff, keeping only useful files within the budget
+
+    Lockfiles, generated, binary and vendored files are always dropped. With
+    include, only those paths are kept (others are not reported, as the caller
+    knows them from the files listing) and the download stops once all of them
+    were read; without it, files are kept in order until the budget is full.
+
+    Args:
+        response: Streaming response of a diff request
+        budget_bytes: Byte budget for the kept file diffs
+        include: Paths to keep, or None to keep every useful file that fits
+        stop_on_overflow: Raise BudgetExceeded as soon as a useful file does not fit
+
+    Returns:
+        Kept diff text, (entry, reason) for every dropped file, and the number of bytes downloaded
+    """
+    kept = []
+    kept_bytes = 0
+    summarized = []
+    downloaded = 0
+    remaining = set(include) if include is not None else None
+
+    section = None
+    section_size = 0
+    section_path = None
+    section_reason = None
+    section_stats = None
+    section_status = None
+
+    def finish_section():
+        nonlocal kept_bytes, section, section_path
+        if section_path is None:
+            return
+        if section_reason is None and section is not None:
+            kept.extend(section)
+            kept_bytes += section_size
+        elif section_reason != "not selected":
+            entry = {"filename": section_path, "additions": section_stats[0], "deletions": section_stats[1]}
+            if section_status:
+                entry["status"] = section_status
+            summarized.append((entry, section_reason))
+        section = None
+        section_path = None
+
+    for line, size in iter_response_lines(response):
+        downloaded += size
+        match = FILE_HEADER_RE.match(line.rstrip('\n'))
+        if match:
+            finish_section()
+            if remaining is not None and not remaining:
+                # Every selected file was read; skip the rest of the download
+                break
+            section_path = match.group(2)
+            section_stats = [0, 0]
+            section_status = None
+            if remaining is not None:
+                # Files outside the selection are already described by the files listing
+                section_reason = None if section_path in remaining else "not selected"
+                remaining.discard(section_path)
+            else:
+                section_reason = classify_path(section_path)
+            section = [line] if section_reason is None else None
+            section_size = size
+            continue
+
+        if section_path is None:
+            continue
+        if section_reason == "not selected":
+            continue
+        status_match = FILE_STATUS_RE.match(line)
+        if status_match:
+            section_status = FILE_STATUSES[status_match.group(1)]
+        if line.startswith("Binary files ") or line.startswith("GIT binary patch"):
+            section_reason = section_reason or "binary"
+            section = None
+        elif line.startswith("+") and not line.startswith("+++ "):
+            section_stats[0] += 1
+        elif line.startswith("-") and not line.startswith("--- "):
+            section_stats[1] += 1
+
+        if section is not None:
+            section.append(line)
+            section_size += size
+            # Drop a file as soon as it can no longer fit, instead of buffering it whole
+            if kept_bytes + section_size > budget_bytes:
+                if stop_on_overflow:
+                    raise BudgetExceeded(downloaded)
+                section = None
+                section_reason = "over budget"
+
+    finish_section()
+    return ''.join(kept), summarized, downloaded
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the GitHub and OpenRouter APIs
+Replays the recorded analyses of a data folder as PRs, commits and diffs, with configurable
+latency, rate limits and error injection, so the pipeline can be run without network access
+"""
+
+import re
+import ast
+import json
+import time
+import random
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+from diff_chunker import parse_diff
+
+
+COMMIT_RE = re.compile(r'^\*\*(\w+)\*\*: (.*?)(?: \(by (.*)\))?$')
+PR_PATH_RE = re.compile(r'content/pr-(\d+)/')
+
+
+def parse_list_field(value: Any) -> List[str]:
+    """Parse the list fields of an analysis, which are stored as Python list literals"""
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    try:
+        parsed = ast.literal_eval(value or "[]")
+        return [str(item) for item in parsed] if isinstance(parsed, list) else [str(parsed)]
+    except (ValueError, SyntaxError):
+        return [value] if value else []
+
+
+class RecordedPR:
+    def __init__(self, record: Dict[str, Any], updated: datetime, diff_lines: int, lockfile_lines: int = 0):
+        """
+        Build the GitHub view of one recorded analysis
+
+        Args:
+            record: Analysis JSON from the data folder
+            updated: Merge/update time assigned to the PR
+            diff_lines: Context lines per changed file of the synthesized diff
+            lockfile_lines: Changed lines of an added package-lock.json, to simulate large PRs
+        """
+        self.number = record["number"]
+        self.record = record
+        timestamp = updated.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        self.pr = {
+            "number": self.number,
+            "title": record.get("title", ""),
+            "body": record.get("original_description", ""),
+            "state": "closed",
+            "created_at": timestamp,
+            "merged_at": timestamp,
+            "updated_at": timestamp,
+            "user": {"login": record.get("author", "ghost")},
+        }
+
+        self.commits = []
+        for index, line in enumerate(parse_list_field(record.get("commits"))):
+            match = COMMIT_RE.match(line)
+            sha, message, author = match.groups() if match else (f"{self.number:x}{index:04x}", line, None)
+            sha = (sha * 8)[:40]
+            parents = [{"sha": "0" * 40}]
+            if message.startswith("Merge "):
+                parents.append({"sha": "1" * 40})
+            self.commits.append({
+                "sha": sha,
+                "parents": parents,
+                "commit": {"message": message, "author": {"name": author or "Unknown"}},
+            })
+
+        self.diff = self._synthesize_diff(diff_lines, lockfile_lines)
+        self.files = self._files_listing()
+        self.pr["additions"] = sum(entry["additions"] for entry in self.files)
+        self.pr["deletions"] = sum(entry["deletions"] for entry in self.files)
+        self.pr["changed_files"] = len(self.files)
+
+    def _synthesize_diff(self, diff_lines: int, lockfile_lines: int) -> str:
+        """One changed Markdown file per recorded detail bullet, padded with context lines"""
+        details = parse_list_field(self.record.get("details")) or [self.record.get("title", "")]
+        parts = []
+        if lockfile_lines:
+            lock_lines = [f'+    "node_modules/pkg-{line}": {{"version": "1.0.{line}"}},' for line in range(lockfile_lines)]
+            parts.append(
+                "diff --git a/package-lock.json b/package-lock.json\n"
+                "index 0000001..0000002 100644\n"
+                "--- a/package-lock.json\n"
+                "+++ b/package-lock.json\n"
+                f"@@ -0,0 +1,{lockfile_lines} @@\n" + '\n'.join(lock_lines) + '\n'
+            )
+        for index, detail in enumerate(details):
+            path = f"content/pr-{self.number}/change-{index + 1}.md"
+            context = [f" Line {line} of {path}" for line in range(diff_lines)]
+            hunk = context[:diff_lines // 2] + [f"-{detail[::-1]}", f"+{detail}"] + context[diff_lines // 2:]
+            parts.append(
+                f"diff --git a/{path} b/{path}\n"
+                f"index 0000001..0000002 100644\n"
+                f"--- a/{path}\n"
+                f"+++ b/{path}\n"
+                f"@@ -1,{diff_lines + 1} +1,{diff_lines + 1} @@\n" + '\n'.join(hunk) + '\n'
+            )
+        return ''.join(parts)
+
+    def _files_listing(self) -> List[Dict[str, Any]]:
+        """The /pulls/{number}/files entries matching the synthesized diff"""
+        files = []
+        for file_diff in parse_diff(self.diff):
+            patch = ''.join(file_diff["hunks"])
+            additions = sum(1 for line in patch.splitlines() if line.startswith("+"))
+            deletions = sum(1 for line in patch.splitlines() if line.startswith("-"))
+            files.append({
+                "filename": file_diff["path"],
+                "status": "modified",
+                "additions": additions,
+                "deletions": deletions,
+                "changes": additions + deletions,
+                "patch": patch,
+            })
+        return files
+
+    def graphql_node(self) -> Dict[str, Any]:
+        """The pullRequest node returned by the GraphQL API"""
+        return {
+            "number": self.number,
+            "title": self.pr["title"],
+            "body": self.pr["body"],
+            "state": "MERGED",
+            "createdAt": self.pr["created_at"],
+            "mergedAt": self.pr["merged_at"],
+            "updatedAt": self.pr["updated_at"],
+            "additions": self.pr["additions"],
+            "deletions": self.pr["deletions"],
+            "changedFiles": self.pr["changed_files"],
+            "files": {"nodes": [{"path": entry["filename"], "additions": entry["additions"],
+                                 "deletions": entry["deletions"]} for entry in self.files[:100]]},
+            "author": {"login": self.pr["user"]["login"]},
+            "commits": {"nodes": [{
+                "commit": {
+                    "oid": commit["sha"],
+                    "message": commit["commit"]["message"],
+                    "author": commit["commit"]["author"],
+                    "parents": {"nodes": [{"oid": parent["sha"]} for parent in commit["parents"]]},
+                }
+            } for commit in self.commits]},
+        }
+
+
+def load_corpus(analysis_folder: str, limit: Optional[int] = None, diff_lines: int = 20,
+                spread_hours: float = 12, lockfile_lines: int = 0) -> Dict[int, RecordedPR]:
+    """
+    Load recorded analyses as PRs merged within the last spread_hours
+
+    Args:
+        analysis_folder: Folder with <number>.json analyses
+        limit: Only use the newest PRs
+        diff_lines: Context lines per changed file of the synthesized diffs
+        lockfile_lines: Changed lines of a package-lock.json added to every PR
+        spread_hours: Time range over which the PRs' merge times are spread
+
+    Returns:
+        PRs keyed by number
+    """
+    records = []
+    for path in Path(analysis_folder).glob("*.json"):
+        if path.stem.isdigit():
+            with open(path, 'r', encoding='utf-8') as f:
+                records.append(json.load(f))
+    records.sort(key=lambda record: record["number"], reverse=True)
+    if limit:
+        records = records[:limit]
+
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    step = timedelta(hours=spread_hours) / max(1, len(records))
+    return {
+        record["number"]: RecordedPR(record, now - step * (index + 1), diff_lines, lockfile_lines)
+        for index, record in enumerate(records)
+    }
+
+
+class FakeServiceConfig:
+    def __init__(self, latency: float = 0.0, rate_limit: int = 0, rate_window: float = 60.0,
+                 error_rate: float = 0.0, seed: int = 0):
+        """
+        Behaviour shared by the fake services
+
+        Args:
+            latency: Seconds added to every response
+            rate_limit: Requests allowed per rate_window, 0 for no limit
+            rate_window: Length of a rate limit window in seconds
+            error_rate: Fraction of requests answered with a 502
+            seed: Seed of the error injection
+        """
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.window_start = time.time()
+        self.window_count = 0
+        self.stats = {"requests": 0, "rate_limited": 0, "errors_injected": 0}
+        self.lock = threading.Lock()
+
+    def admit(self) -> Tuple[str, float]:
+        """
+        Account for one request
+
+        Returns:
+            ("ok", 0), ("error", 0) or ("limited", seconds until the window resets)
+        """
+        with self.lock:
+            self.stats["requests"] += 1
+            now = time.time()
+            if now - self.window_start >= self.rate_window:
+                self.window_start = now
+                self.window_count = 0
+            if self.rate_limit and self.window_count >= self.rate_limit:
+                self.stats["rate_limited"] += 1
+                return "limited", self.window_start + self.rate_window - now
+            self.window_count += 1
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.stats["errors_injected"] += 1
+                return "error", 0.0
+            return "ok", 0.0
+
+    def chance(self, rate: float) -> bool:
+        """Draw from the seeded random source"""
+        with self.lock:
+            return self.random.random() < rate
+
+    def remaining(self) -> int:
+        with self.lock:
+            return max(0, self.rate_limit - self.window_count)
+
+
+class FakeHandler(BaseHTTPRequestHandler, ABC):
+    protocol_version = "HTTP/1.1"
+    corpus: Dict[int, RecordedPR] = {}
+    config: FakeServiceConfig = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status: int, body: str, content_type: str = "application/json",
+                  headers: Optional[Dict[str, str]] = None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def admit(self) -> bool:
+        """Apply latency, rate limit and error injection; False if the request was answered"""
+        if self.path == "/_stats":
+            self.send_body(200, json.dumps(self.config.stats))
+            return False
+        time.sleep(self.config.latency)
+        outcome, reset_in = self.config.admit()
+        if outcome == "limited":
+            self.send_rate_limited(reset_in)
+            return False
+        if outcome == "error":
+            self.send_body(502, json.dumps({"message": "Injected error"}))
+            return False
+        return True
+
+    @abstractmethod
+    def send_rate_limited(self, reset_in: float):
+        """Answer a request over the rate limit the way the real service does"""
+
+    def do_GET(self):
+        if self.admit():
+            self.send_body(404, json.dumps({"message": "Not Found"}))
+
+
+class FakeGitHubHandler(FakeHandler):
+    """REST endpoints used by the pipeline, plus the batched GraphQL query"""
+
+    def rate_headers(self) -> Dict[str, str]:
+        if not self.config.rate_limit:
+            return {}
+        return {
+            "X-RateLimit-Limit": str(self.config.rate_limit),
+            "X-RateLimit-Remaining": str(self.config.remaining()),
+            "X-RateLimit-Reset": str(int(self.config.window_start + self.config.rate_window)),
+        }
+
+    def send_rate_limited(self, reset_in: float):
+        self.send_body(403, json.dumps({"message": "API rate limit exceeded"}), headers={
+            "X-RateLimit-Limit": str(self.config.rate_limit),
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": str(int(time.time() + reset_in) + 1),
+        })
+
+    def do_GET(self):
+        if not self.admit():
+            return
+        parsed = urlparse(self.path)
+        parts = parsed.path.strip("/").split("/")
+        headers = self.rate_headers()
+
+        # /repos/{owner}/{repo}/pulls
+        if len(parts) == 4 and parts[0] == "repos" and parts[3] == "pulls":
+            query = parse_qs(parsed.query)
+            page = int(query.get("page", ["1"])[0])
+            per_page = int(query.get("per_page", ["30"])[0])
+            prs = sorted(self.corpus.values(), key=lambda pr: pr.pr["updated_at"], reverse=True)
+            page_prs = [pr.pr for pr in prs[(page - 1) * per_page:page * per_page]]
+            self.send_body(200, json.dumps(page_prs), headers=headers)
+            return
+
+        # /repos/{owner}/{repo}/pulls/{number}[/commits]
+        if len(parts) >= 5 and parts[0] == "repos" and parts[3] == "pulls" and parts[4].isdigit():
+            pr = self.corpus.get(int(parts[4]))
+            if pr is None:
+                self.send_body(404, json.dumps({"message": "Not Found"}), headers=headers)
+            elif len(parts) == 6 and parts[5] == "commits":
+                self.send_body(200, json.dumps(pr.commits), headers=headers)
+            elif len(parts) == 6 and parts[5] == "files":
+                query = parse_qs(parsed.query)
+                page = int(query.get("page", ["1"])[0])
+                per_page = int(query.get("per_page", ["30"])[0])
+                self.send_body(200, json.dumps(pr.files[(page - 1) * per_page:page * per_page]), headers=headers)
+            elif "diff" in self.headers.get("Accept", ""):
+                self.send_body(200, pr.diff, "text/plain; charset=utf-8", headers=headers)
+            else:
+                self.send_body(200, json.dumps(pr.pr), headers=headers)
+            return
+
+        # /repos/{owner}/{repo}/commits/{sha}
+        if len(parts) == 5 and parts[0] == "repos" and parts[3] == "commits":
+            for pr in self.corpus.values():
+                if any(commit["sha"] == parts[4] for commit in pr.commits):
+                    self.send_body(200, pr.diff, "text/plain; charset=utf-8", headers=headers)
+                    return
+
+        self.send_body(404, json.dumps({"message": "Not Found"}), headers=headers)
+
+    def do_POST(self):
+        query = self.read_json().get("query", "")
+        if not self.admit():
+            return
+        if urlparse(self.path).path.rstrip("/").endswith("graphql"):
+            nodes = {}
+            for alias, number in re.findall(r'(pr\d+): pullRequest\(number: (\d+)\)', query):
+                pr = self.corpus.get(int(number))
+                nodes[alias] = pr.graphql_node() if pr else None
+            self.send_body(200, json.dumps({"data": {"repository": nodes}}))
+            return
+        self.send_body(404, json.dumps({"message": "Not Found"}))
+
+
+class FakeOpenRouterHandler(FakeHandler):
+    """Streaming and non-streaming chat completions replaying the recorded analyses"""
+
+    first_token_latency = 0.5
+    tokens_per_second = 100.0
+    # Fraction of requests that wait straggler_delay extra seconds before the first token
+    straggler_rate = 0.0
+    straggler_delay = 30.0
+
+    def send_rate_limited(self, reset_in: float):
+        self.send_body(429, json.dumps({"error": {"message": "Rate limit exceeded", "code": 429}}),
+                       headers={"Retry-After": str(max(1, int(reset_in + 0.5)))})
+
+    def reply_for(self, prompt: str) -> str:
+        """The recorded analysis of the PR whose diff is in the prompt, or a generic reply"""
+        match = PR_PATH_RE.search(prompt)
+        pr = self.corpus.get(int(match.group(1))) if match else None
+        if pr and pr.record.get("raw_analysis") and "### Summary" in prompt:
+            return pr.record["raw_analysis"]
+        if "### Summary" in prompt:
+            return "### Summary\n- Replayed benchmark summary\n### Title\nBenchmark summary"
+        return "- Replayed benchmark change"
+
+    def do_POST(self):
+        payload = self.read_json()
+        if not self.admit():
+            return
+        prompt = ''.join(message.get("content", "") for message in payload.get("messages", []))
+        content = self.reply_for(prompt)
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": len(prompt) // 4 + len(content) // 4,
+        }
+
+        if not payload.get("stream"):
+            time.sleep(self.first_token_latency + usage["completion_tokens"] / self.tokens_per_second)
+            self.send_body(200, json.dumps({
+                "choices": [{"message": {"role": "assistant", "content": content}}],
+                "usage": usage,
+            }))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write(event: str):
+            data = event.encode("utf-8")
+            self.wfile.write(b"%x\r\n" % len(data) + data + b"\r\n")
+            self.wfile.flush()
+
+        delay = self.first_token_latency
+        if self.straggler_rate and self.config.chance(self.straggler_rate):
+            delay += self.straggler_delay
+        try:
+            write(": OPENROUTER PROCESSING\n\n")
+            # Queued requests receive keep-alive comments, like on OpenRouter
+            while delay > 1:
+                time.sleep(1)
+                delay -= 1
+                write(": OPENROUTER PROCESSING\n\n")
+            time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (e.g. a hedged request won)
+            return
+        # Stream words in pieces of about 4 tokens
+        words = re.findall(r'\S+\s*', content)
+        for start in range(0, len(words), 12):
+            piece = ''.join(words[start:start + 12])
+            write("data: " + json.dumps({"choices": [{"delta": {"content": piece}}]}) + "\n\n")
+            time.sleep(len(piece) / 4 / self.tokens_per_second)
+        write("data: " + json.dumps({"choices": [], "usage": usage}) + "\n\n")
+        write("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def start_server(handler: type, corpus: Dict[int, RecordedPR], config: FakeServiceConfig,
+                 **attributes) -> ThreadingHTTPServer:
+    """
+    Serve a fake service on a free local port in a background thread
+
+    Args:
+        handler: FakeGitHubHandler or FakeOpenRouterHandler
+        corpus: Recorded PRs to serve
+        config: Latency, rate limit and error injection settings
+        attributes: Extra handler class attributes (e.g. first_token_latency)
+
+    Returns:
+        The running server; its URL is http://127.0.0.1:<server.server_port>
+    """
+    handler_class = type(handler.__name__, (handler,), dict(corpus=corpus, config=config, **attributes))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Multi-repository fleet runner
+Discovers, summarizes and publishes PRs for many repositories in one process with a shared
+connection pool, a global concurrency limit and fair round-robin scheduling across repositories
+"""
+
+import os
+import sys
+import json
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, List
+
+from http_cache import get_shared_session
+from llm_cache import LLMCache
+from commit_store import CommitSummaryStore
+from similarity_index import SimilarityIndex
+from generate_summary import GitHubPRAnalyzer, process_pr
+from list_prs_without_summaries import list_prs_without_summaries
+from generate_website_data import build_website
+from metrics import get_shared_metrics
+
+
+def load_config(config_file: str) -> Dict[str, Any]:
+    """
+    Load the fleet configuration
+
+    Example:
+        {
+          "concurrency": 8,
+          "per_repo_concurrency": 2,
+          "days": 7,
+          "data_folder": "data/analysis",
+          "repos": [
+            {"owner": "github", "repo": "docs", "website_output": "app/public/pr-data.json", "compact": true}
+          ]
+        }
+
+    Args:
+        config_file: Path to the JSON configuration
+
+    Returns:
+        Configuration with defaults filled in
+    """
+    with open(config_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    config.setdefault("concurrency", 8)
+    config.setdefault("per_repo_concurrency", 2)
+    config.setdefault("days", 7)
+    config.setdefault("data_folder", "data/analysis")
+    config.setdefault("per_commit", False)
+    config.setdefault("reuse_similar", False)
+    for repo in config.get("repos", []):
+        repo.setdefault("days", config["days"])
+    return config
+
+
+def discover(config: Dict[str, Any], token: str) -> Dict[str, List[Dict]]:
+    """
+    List PRs without summaries for every repository
+
+    Args:
+        config: Fleet configuration
+        token: GitHub token
+
+    Returns:
+        PR listings keyed by "owner/repo"
+    """
+    listings = {}
+
+    def discover_repo(repo: Dict[str, Any]):
+        name = f"{repo['owner']}/{repo['repo']}"
+        state_file = os.path.join("data/discovery", repo['owner'], f"{repo['repo']}.json")
+        try:
+            listings[name] = list_prs_without_summaries(repo['owner'], repo['repo'], token, repo['days'],
+                                                        config['data_folder'], state_file)
+            print(f"{name}: {len(listings[name])} PRs without summaries")
+        except Exception as e:
+            print(f"{name}: discovery failed: {e}")
+            listings[name] = []
+
+    with ThreadPoolExecutor(max_workers=max(1, config['concurrency'])) as executor:
+        list(executor.map(discover_repo, config['repos']))
+
+    return listings
+
+
+def summarize(config: Dict[str, Any], api_key: str, listings: Dict[str, List[Dict]]) -> Dict[str, Dict[int, Any]]:
+    """
+    Summarize all listed PRs with fair scheduling across repositories
+
+    Repositories take turns when a worker slot frees up, and no repository
+    may use more than per_repo_concurrency slots, so one busy repository
+    cannot starve the others.
+
+    Args:
+        config: Fleet configuration
+        api_key: OpenRouter API key
+        listings: PR listings keyed by "owner/repo"
+
+    Returns:
+        Per repository, a mapping of PR number to None on success or the error message
+    """
+    session = get_shared_session()
+    llm_cache = LLMCache()
+    analyzers = {}
+    queues = {}
+
+    for repo in config['repos']:
+        name = f"{repo['owner']}/{repo['repo']}"
+        prs = listings.get(name, [])
+        if not prs:
+            continue
+
+        commit_store = None
+        if config['per_commit']:
+            commit_store = CommitSummaryStore(f"data/commit-summaries/{repo['owner']}/{repo['repo']}.jsonl")
+        similarity_index = None
+        if config['reuse_similar']:
+            similarity_index = SimilarityIndex(f"data/similarity/{repo['owner']}/{repo['repo']}.jsonl")
+        analyzer = GitHubPRAnalyzer(api_key, session=session, llm_cache=llm_cache, commit_store=commit_store,
+                                    similarity_index=similarity_index)
+        analyzers[name] = analyzer
+
+        pr_numbers = [pr["number"] for pr in prs]
+        prefetched = analyzer.prefetch_prs(repo['owner'], repo['repo'], pr_numbers,
+                                           {pr["number"]: pr for pr in prs})
+        output_dir = os.path.join(config['data_folder'], repo['owner'], repo['repo'])
+        os.makedirs(output_dir, exist_ok=True)
+        queues[name] = deque(
+            (repo['owner'], repo['repo'], number, os.path.join(output_dir, f"{number}.json"), prefetched.get(number))
+            for number in pr_numbers
+        )
+
+    results = {name: {} for name in queues}
+    in_flight = {name: 0 for name in queues}
+    rotation = deque(queues)
+
+    def next_task():
+        """Pick the next PR from the next repository with work and a free slot"""
+        for _ in range(len(rotation)):
+            name = rotation[0]
+            rotation.rotate(-1)
+            if queues[name] and in_flight[name] < config['per_repo_concurrency']:
+                return name, queues[name].popleft()
+        return None
+
+    with ThreadPoolExecutor(max_workers=max(1, config['concurrency'])) as executor:
+        futures = {}
+        while True:
+            while len(futures) < config['concurrency']:
+                task = next_task()
+                if task is None:
+                    break
+                name, (owner, repo_name, number, output_file, prefetched) = task
+                in_flight[name] += 1
+                future = executor.submit(process_pr, analyzers[name], owner, repo_name, number,
+                                         output_file, prefetched)
+                futures[future] = (name, number)
+
+            if not futures:
+                break
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, number = futures.pop(future)
+                in_flight[name] -= 1
+                try:
+                    future.result()
+                    results[name][number] = None
+                except Exception as e:
+                    print(f"{name} PR #{number} failed: {e}")
+                    results[name][number] = str(e)
+
+    print(llm_cache.stats())
+    return results
+
+
+def publish(config: Dict[str, Any]):
+    """Generate website data for every repository with a website_output"""
+    for repo in config['repos']:
+        if not repo.get("website_output"):
+            continue
+        analysis_folder = os.path.join(config['data_folder'], repo['owner'], repo['repo'])
+        try:
+            build_website(analysis_folder, repo['website_output'],
+                          feed_output=repo.get("feed_output", os.path.join(os.path.dirname(repo['website_output']), "feed.atom")),
+                          compact=repo.get("compact", False))
+        except Exception as e:
+            print(f"{repo['owner']}/{repo['repo']}: website data generation failed: {e}")
+
+
+def main():
+    """Main function to run the fleet"""
+    parser = argparse.ArgumentParser(description="Summarize PRs for many repositories in one process")
+    parser.add_argument("--config", default="fleet.json", help="Fleet configuration file (default: fleet.json)")
+    parser.add_argument("--token", help="GitHub token (or use GITHUB_TOKEN env var)")
+    parser.add_argument("--api-key", help="OpenRouter API key (or use OPENROUTER_API_KEY env var)")
+    parser.add_argument("--skip-website", action="store_true", help="Do not generate website data")
+    parser.add_argument("--metrics-output", help="Write per-stage timings, token usage and cost of this run as JSON")
+    parser.add_argument("--prometheus-output", help="Also write the run metrics as a Prometheus text file")
+
+    args = parser.parse_args()
+
+    token = args.token or os.getenv("GITHUB_TOKEN")
+    api_key = args.api_key or os.getenv("OPENROUTER_API_KEY")
+    if not token or not api_key:
+        print("Error: GitHub token and OpenRouter API key are required (GITHUB_TOKEN / OPENROUTER_API_KEY).")
+        sys.exit(1)
+    # The analyzer and GraphQL prefetch read the token from the environment
+    os.environ["GITHUB_TOKEN"] = token
+
+    try:
+        config = load_config(args.config)
+    except (IOError, ValueError) as e:
+        print(f"Error reading fleet configuration: {e}")
+        sys.exit(1)
+
+    listings = discover(config, token)
+    results = summarize(config, api_key, listings)
+
+    failed = 0
+    for name, repo_results in results.items():
+        repo_failed = sorted(number for number, error in repo_results.items() if error)
+        failed += len(repo_failed)
+        print(f"{name}: {len(repo_results) - len(repo_failed)} succeeded, {len(repo_failed)} failed")
+
+    if not args.skip_website:
+        publish(config)
+    get_shared_metrics().write(args.metrics_output, args.prometheus_output)
+
+    print("Done!")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,77 +7,416 @@ Fetches a GitHub Pull Request diff and analyzes it using OpenRouter API
 import os
 import sys
 import json
+import time
+import sqlite3
 import requests
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from http_cache import CachedSession, get_shared_session
+from github_graphql import fetch_prs_graphql
+from diff_chunker import chunk_diff, estimate_tokens
+from llm_cache import LLMCache
+from commit_store import CommitSummaryStore, is_merge_commit
+from openrouter_stream import StreamTimeout, stream_chat_completion
+from analysis_store import AnalysisStore, open_store
+from metrics import Metrics, get_shared_metrics, propagate_context
+from diff_filter import BudgetExceeded, read_diff, select_files, stat_summary
+from model_router import ModelRouter, run_hedged
+from trivial_prs import classify_trivial
+from similarity_index import SimilarityIndex, adapt_analysis
+from diff_compactor import compact_diff
+from run_planner import RunBudget, estimate_pr, plan_run, print_plan
+
+
+class PRAnalysisError(Exception):
+    """Raised when a single PR cannot be fetched, analyzed or saved"""
 
 
 class GitHubPRAnalyzer:
-    def __init__(self, openrouter_api_key: str):
+    def __init__(self, openrouter_api_key: str, session: Optional[CachedSession] = None,
+                 chunk_tokens: int = 30000, chunk_concurrency: int = 4,
+                 llm_cache: Optional[LLMCache] = None, commit_store: Optional[CommitSummaryStore] = None,
+                 first_token_timeout: float = 120, total_timeout: float = 600, llm_retries: int = 1,
+                 analysis_store: Optional[AnalysisStore] = None, metrics: Optional[Metrics] = None,
+                 diff_budget: int = 500000, router: Optional[ModelRouter] = None, rule_summaries: bool = True,
+                 similarity_index: Optional[SimilarityIndex] = None, similarity_threshold: float = 0.95,
+                 diff_context: Optional[int] = 1):
         """
         Initialize the analyzer with OpenRouter API key
         
         Args:
             openrouter_api_key: API key for OpenRouter
+            session: HTTP session to use (defaults to the shared pooled session)
+            chunk_tokens: Diff token budget per prompt; larger diffs are chunked
+            chunk_concurrency: Number of diff chunks summarized in parallel
+            llm_cache: Response cache consulted before calling OpenRouter
+            commit_store: Per-commit summary store; enables per-commit analysis of multi-commit PRs
+            first_token_timeout: Seconds to wait for the first streamed token
+            total_timeout: Seconds allowed for a whole streamed response
+            llm_retries: Number of retries after a timed out generation
+            analysis_store: Store receiving the analyses instead of per-PR output files
+            metrics: Stage timings and counters (defaults to the shared run metrics)
+            diff_budget: Bytes of file diffs downloaded per PR or commit, 0 for no limit
+            router: Model routing and hedging policy (defaults to the built-in size tiers)
+            rule_summaries: Summarize trivial PRs (lockfile bumps, image assets, whitespace and typo fixes) from templates
+            similarity_index: Near-duplicate diff index; PRs similar to an indexed PR reuse its analysis
+            similarity_threshold: Minimum estimated Jaccard similarity for reusing an analysis
+            diff_context: Context lines kept around changes when diffs are compacted for the prompt, None to send diffs verbatim
         """
         self.openrouter_api_key = openrouter_api_key
-        self.openrouter_base_url = "https://openrouter.ai/api/v1"
+        self.openrouter_base_url = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+        self.session = session or get_shared_session()
+        self.github_api_url = os.getenv("GITHUB_API_URL", "https://api.github.com")
+        self.chunk_tokens = chunk_tokens
+        self.chunk_concurrency = chunk_concurrency
+        self.llm_cache = llm_cache
+        self.commit_store = commit_store
+        self.router = router or ModelRouter()
+        self.temperature = 0.1
+        self.first_token_timeout = first_token_timeout
+        self.total_timeout = total_timeout
+        self.llm_retries = llm_retries
+        self.latencies = []
+        self.analysis_store = analysis_store
+        self.metrics = metrics or get_shared_metrics()
+        self.diff_budget = diff_budget
+        self.rule_summaries = rule_summaries
+        self.similarity_index = similarity_index
+        self.similarity_threshold = similarity_threshold
+        self.diff_context = diff_context
+        
+    def _github_headers(self) -> Dict[str, str]:
+        """Build the GitHub REST headers, including the token when available"""
+        headers = {
+            "Accept": "application/vnd.github.v3+json",
+            "User-Agent": "PR-Analyzer"
+        }
         
-    def fetch_pr_diff(self, repo_owner: str, repo_name: str, pr_number: int) -> str:
+        # Add GitHub token if available (for higher rate limits)
+        github_token = os.getenv("GITHUB_TOKEN")
+        if github_token:
+            headers["Authorization"] = f"token {github_token}"
+        return headers
+    
+    def fetch_pr_diff(self, repo_owner: str, repo_name: str, pr_number: int,
+                      pr_data: Optional[Dict[str, Any]] = None, commits_data: Optional[list] = None) -> str:
         """
         Fetch the diff from a GitHub Pull Request
         
+        Metadata and commits already known from a listing or a GraphQL batch are
+        reused; only the missing parts are fetched from the REST API.
+        
         Args:
             repo_owner: GitHub repository owner
             repo_name: GitHub repository name
             pr_number: Pull Request number
+            pr_data: Already fetched PR metadata, if any
+            commits_data: Already fetched commits, if any
             
         Returns:
             Raw diff content as string, PR data, and commits data
         """
-        url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/pulls/{pr_number}"
+        url = f"{self.github_api_url}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}"
+        headers = self._github_headers()
         
-        # Get PR info first
-        headers = {
-            "Accept": "application/vnd.github.v3+json",
-            "User-Agent": "PR-Analyzer"
-        }
+        try:
+            with self.metrics.timer("github_fetch"):
+                # Get PR info first
+                if pr_data is None:
+                    pr_data = self.fetch_pr_metadata(url, headers)
+                
+                # Get the commits
+                if commits_data is None:
+                    commits_url = f"{url}/commits"
+                    commits_response = self.session.get(commits_url, headers=headers)
+                    commits_response.raise_for_status()
+                    self.metrics.add("github_bytes", len(commits_response.content))
+                    commits_data = commits_response.json()
+                
+                # Get the diff
+                diff_content = self.fetch_filtered_diff(url, headers, files_url=f"{url}/files")
+            
+            return diff_content, pr_data, commits_data
+            
+        except requests.exceptions.RequestException as e:
+            raise PRAnalysisError(f"Error fetching PR diff: {e}") from e
+    
+    def fetch_pr_metadata(self, url: str, headers: Dict[str, str]) -> Dict[str, Any]:
+        """Fetch the REST metadata of a PR (title, body, line counts)"""
+        response = self.session.get(url, headers=headers)
+        response.raise_for_status()
+        self.metrics.add("github_bytes", len(response.content))
+        return response.json()
+    
+    def estimate_prs(self, repo_owner: str, repo_name: str,
+                     prefetched: Dict[int, Tuple[Optional[Dict[str, Any]], Optional[list]]]) -> List[Dict[str, Any]]:
+        """
+        Estimate the model usage of PRs from their line counts, without fetching diffs
         
-        # Add GitHub token if available (for higher rate limits)
-        github_token = os.getenv("GITHUB_TOKEN")
-        if github_token:
-            headers["Authorization"] = f"token {github_token}"
+        PRs whose prefetched metadata lacks line counts (e.g. REST listings) get
+        their metadata from the REST API; it is stored back into prefetched so
+        processing does not fetch it again.
         
+        Args:
+            repo_owner: GitHub repository owner
+            repo_name: GitHub repository name
+            prefetched: Mapping of PR number to (pr_data, commits_data) from prefetch_prs
+            
+        Returns:
+            Per-PR estimates from run_planner.estimate_pr
+        """
+        headers = self._github_headers()
+        estimates = []
+        for pr_number, (pr_data, commits_data) in prefetched.items():
+            if pr_data is None or pr_data.get("additions") is None:
+                url = f"{self.github_api_url}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}"
+                try:
+                    with self.metrics.timer("github_fetch"):
+                        pr_data = self.fetch_pr_metadata(url, headers)
+                    prefetched[pr_number] = (pr_data, commits_data)
+                except requests.exceptions.RequestException as e:
+                    print(f"PR #{pr_number}: could not fetch its size ({e}), assuming a full prompt")
+            estimates.append(estimate_pr(dict(pr_data or {}, number=pr_number), self.diff_budget, self.chunk_tokens))
+        return estimates
+    
+    def fetch_pr_files(self, files_url: str, headers: Dict[str, str]) -> List[Dict[str, Any]]:
+        """
+        Fetch the PR files listing (path, status, additions, deletions, patch)
+        
+        Args:
+            files_url: The PR's /files endpoint
+            headers: GitHub request headers
+            
+        Returns:
+            All listed files; GitHub lists at most 3000 files per PR
+        """
+        files = []
+        for page in range(1, 31):
+            response = self.session.get(files_url, headers=headers, params={"per_page": 100, "page": page})
+            response.raise_for_status()
+            self.metrics.add("github_bytes", len(response.content))
+            batch = response.json()
+            files.extend(batch)
+            if len(batch) < 100:
+                break
+        return files
+    
+    def _read_diff(self, url: str, headers: Dict[str, str], budget: int, include=None, stop_on_overflow=False):
+        """Stream one diff request through read_diff"""
+        response = self.session.get(url, headers=headers, stream=True, timeout=(10, 120))
         try:
-            response = requests.get(url, headers=headers)
             response.raise_for_status()
-            pr_data = response.json()
+            return read_diff(response, budget, include, stop_on_overflow)
+        finally:
+            response.close()
+    
+    def fetch_filtered_diff(self, url: str, headers: Dict[str, str], files_url: Optional[str] = None) -> str:
+        """
+        Download a diff within the byte budget, leaving out files not worth a prompt
+        
+        The diff is streamed and lockfiles, generated, binary and vendored files
+        are dropped on the fly. If the remaining files do not fit the budget and
+        a files listing is available, the download is stopped, files are chosen
+        by priority from the listing and only those are read from a second
+        stream, which ends as soon as the last chosen file was read. Files left
+        out are described by one-line stat summaries before the diff.
+        
+        Args:
+            url: Diff endpoint (PR or commit)
+            headers: GitHub request headers
+            files_url: The PR's /files endpoint, if any
+            
+        Returns:
+            Stat summaries of the left out files followed by the kept diff
+        """
+        diff_headers = headers.copy()
+        diff_headers["Accept"] = "application/vnd.github.v3.diff"
+        budget = self.diff_budget or sys.maxsize
+        
+        try:
+            diff_content, summarized, downloaded = self._read_diff(url, diff_headers, budget,
+                                                                   stop_on_overflow=files_url is not None)
+        except BudgetExceeded as e:
+            self.metrics.add("github_bytes", e.downloaded)
+            files = self.fetch_pr_files(files_url, headers)
+            include, summarized = select_files(files, budget)
+            print(f"Diff exceeds {budget} bytes, including {len(include)}/{len(files)} files")
+            diff_content, downloaded = "", 0
+            if include:
+                diff_content, overflowed, downloaded = self._read_diff(url, diff_headers, budget, include)
+                summarized += overflowed
+        
+        self.metrics.add("github_bytes", downloaded)
+        self.metrics.add("diff_bytes", len(diff_content))
+        self.metrics.add("diff_files_summarized", len(summarized))
+        return stat_summary(summarized) + diff_content
+    
+    def prefetch_prs(self, repo_owner: str, repo_name: str, pr_numbers: List[int],
+                     listing: Optional[Dict[int, Dict[str, Any]]] = None) -> Dict[int, Tuple[Optional[Dict[str, Any]], Optional[list]]]:
+        """
+        Fetch metadata and commits for many PRs ahead of their diffs
+        
+        Uses one batched GraphQL query per 50 PRs when a GitHub token is set.
+        PRs not covered by GraphQL keep any metadata from the listing and fall
+        back to the REST API for the rest.
+        
+        Args:
+            repo_owner: GitHub repository owner
+            repo_name: GitHub repository name
+            pr_numbers: Pull Request numbers to prefetch
+            listing: PR metadata by number from list_prs_without_summaries
             
-            # Get the commits
-            commits_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/pulls/{pr_number}/commits"
-            commits_response = requests.get(commits_url, headers=headers)
-            commits_response.raise_for_status()
-            commits_data = commits_response.json()
+        Returns:
+            Mapping of PR number to (pr_data, commits_data); either may be None
+        """
+        listing = listing or {}
+        prefetched = {number: (listing.get(number), None) for number in pr_numbers}
+        
+        github_token = os.getenv("GITHUB_TOKEN")
+        if github_token and pr_numbers:
+            with self.metrics.timer("github_prefetch"):
+                graphql_results = fetch_prs_graphql(repo_owner, repo_name, pr_numbers, github_token,
+                                                    session=self.session)
+            prefetched.update(graphql_results)
+            print(f"Prefetched {len(graphql_results)}/{len(pr_numbers)} PRs via GraphQL")
+        
+        return prefetched
+    
+    def fetch_commit_diff(self, repo_owner: str, repo_name: str, sha: str) -> str:
+        """
+        Fetch the diff of a single commit
+        
+        Args:
+            repo_owner: GitHub repository owner
+            repo_name: GitHub repository name
+            sha: Commit SHA
             
-            # Get the diff
-            diff_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/pulls/{pr_number}"
-            diff_headers = headers.copy()
-            diff_headers["Accept"] = "application/vnd.github.v3.diff"
+        Returns:
+            Raw diff content as string
+        """
+        try:
+            with self.metrics.timer("github_fetch"):
+                return self.fetch_filtered_diff(f"{self.github_api_url}/repos/{repo_owner}/{repo_name}/commits/{sha}",
+                                                self._github_headers())
+        except requests.exceptions.RequestException as e:
+            raise PRAnalysisError(f"Error fetching commit diff: {e}") from e
+    
+    def should_analyze_per_commit(self, commits_data: list) -> bool:
+        """
+        Check whether a PR is analyzed commit by commit
+        
+        This applies to PRs made of several non-merge commits, like the
+        "Repo sync" PRs whose sub-PR commits reappear in later syncs.
+        
+        Args:
+            commits_data: List of commits in the PR
             
-            diff_response = requests.get(diff_url, headers=diff_headers)
-            diff_response.raise_for_status()
+        Returns:
+            True if a commit store is configured and the PR has several commits
+        """
+        if not self.commit_store:
+            return False
+        return len([commit for commit in commits_data if not is_merge_commit(commit)]) > 1
+    
+    def analyze_per_commit(self, repo_owner: str, repo_name: str, commits_data: list) -> str:
+        """
+        Analyze a PR from per-commit summaries, reusing stored ones
+        
+        Only commits missing from the commit store are fetched and sent to
+        the LLM; merge commits are skipped since their diff repeats the
+        merged commits.
+        
+        Args:
+            repo_owner: GitHub repository owner
+            repo_name: GitHub repository name
+            commits_data: List of commits in the PR
             
-            return diff_response.text, pr_data, commits_data
+        Returns:
+            Analysis in the ### Summary / ### Title format
+        """
+        commits = [commit for commit in commits_data if not is_merge_commit(commit)]
+        unseen = [commit for commit in commits if self.commit_store.get(commit['sha']) is None]
+        print(f"Per-commit analysis: {len(commits) - len(unseen)}/{len(commits)} commit summaries reused")
+        
+        def summarize_commit(commit: Dict[str, Any]):
+            message = commit.get('commit', {}).get('message', '').split('\n')[0]
+            diff_content = self.compact_for_prompt(self.fetch_commit_diff(repo_owner, repo_name, commit['sha']))
             
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching PR diff: {e}")
-            sys.exit(1)
+            if estimate_tokens(diff_content) > self.chunk_tokens:
+                chunks = chunk_diff(diff_content, self.chunk_tokens)
+                summary = '\n'.join(self._summarize_part(chunk, index, len(chunks)).strip()
+                                    for index, chunk in enumerate(chunks))
+            else:
+                summary = self._summarize_commit(diff_content, message)
+            self.commit_store.put(commit['sha'], summary, message)
+        
+        with ThreadPoolExecutor(max_workers=max(1, self.chunk_concurrency)) as executor:
+            list(executor.map(propagate_context(summarize_commit), unseen))
+        
+        commit_summaries = []
+        for commit in commits:
+            message = commit.get('commit', {}).get('message', '').split('\n')[0]
+            commit_summaries.append(f"Commit: {message}\n{self.commit_store.get(commit['sha']).strip()}")
+        
+        commits_text = '\n'.join(
+            f"- {commit.get('commit', {}).get('message', '').split(chr(10))[0]}" for commit in commits_data
+        ) or 'No commit messages available'
+        return self._merge_partial_summaries(commit_summaries, commits_text)
+    
+    def compact_for_prompt(self, diff_content: str) -> str:
+        """
+        Compact a diff before it is put into a prompt, recording the tokens saved
+        
+        Args:
+            diff_content: Diff as returned by fetch_pr_diff or fetch_commit_diff
+            
+        Returns:
+            The compacted diff, or the diff unchanged if compaction is disabled
+        """
+        if self.diff_context is None:
+            return diff_content
+        compacted = compact_diff(diff_content, self.diff_context)
+        saved = estimate_tokens(diff_content) - estimate_tokens(compacted)
+        self.metrics.add("diff_tokens_saved", saved)
+        if saved > 0:
+            print(f"Compacted diff: {estimate_tokens(compacted)} tokens, {saved} saved")
+        return compacted
+    
+    def _summarize_commit(self, diff_content: str, message: str) -> str:
+        """
+        Summarize a single commit as plain bullet points
+        
+        Args:
+            diff_content: The git diff of the commit
+            message: First line of the commit message
+            
+        Returns:
+            Bullet point summary without headings
+        """
+        prompt = f"""You are a technical expert with deep knowledge of software development practices.
+You have been given the git diff of a single commit from a GitHub Pull Request.
+
+List the key changes in this commit as short bullet points.
+No more than 60 words. Do not add headings.
+
+Commit message: {message}
+
+Here is the git diff output for analysis:
+
+{diff_content}"""
+        return self._chat_completion(prompt)
     
     def analyze_with_openrouter(self, diff_content: str, pr_data: Dict[str, Any], commits_data: list) -> str:
         """
         Analyze the diff using OpenRouter API
         
+        Diffs larger than the chunk budget are split on file/hunk boundaries,
+        each chunk is summarized in parallel and the partial summaries are merged
+        in a final call.
+        
         Args:
             diff_content: The git diff content
             pr_data: PR metadata from GitHub API
@@ -86,6 +425,9 @@ class GitHubPRAnalyzer:
         Returns:
             Analysis result from OpenRouter
         """
+        prompt_start = time.perf_counter()
+        diff_content = self.compact_for_prompt(diff_content)
+        
         # Format commit messages
         commit_messages = []
         for commit in commits_data:
@@ -94,6 +436,10 @@ class GitHubPRAnalyzer:
         
         commits_text = '\n'.join(commit_messages) if commit_messages else 'No commit messages available'
         
+        if estimate_tokens(diff_content) > self.chunk_tokens:
+            self.metrics.observe("prompt_build", time.perf_counter() - prompt_start)
+            return self._analyze_chunked(diff_content, commits_text)
+        
         prompt = f"""You are a technical expert with deep knowledge of software development practices.
 You have been given the output of a git diff from a GitHub Pull Request, which shows the differences between the original and modified versions of a set of files.
 
@@ -113,7 +459,109 @@ Commits in this PR:
 Here is the git diff output for analysis:
 
 {diff_content}"""
+        self.metrics.observe("prompt_build", time.perf_counter() - prompt_start)
 
+        return self._chat_completion(prompt)
+    
+    def _analyze_chunked(self, diff_content: str, commits_text: str) -> str:
+        """
+        Map-reduce summarization for diffs that do not fit one prompt
+        
+        Args:
+            diff_content: The git diff content
+            commits_text: Formatted commit message list
+            
+        Returns:
+            Merged analysis in the ### Summary / ### Title format
+        """
+        chunks = chunk_diff(diff_content, self.chunk_tokens)
+        print(f"Diff too large for one prompt, summarizing {len(chunks)} chunks...")
+        
+        with ThreadPoolExecutor(max_workers=max(1, self.chunk_concurrency)) as executor:
+            partial_summaries = list(executor.map(
+                propagate_context(self._summarize_part), chunks, range(len(chunks)), [len(chunks)] * len(chunks)
+            ))
+        
+        return self._merge_partial_summaries(partial_summaries, commits_text)
+    
+    def _summarize_part(self, diff_part: str, index: int = 0, total: int = 1) -> str:
+        """
+        Summarize one part of a diff as plain bullet points
+        
+        Args:
+            diff_part: Part of a git diff that fits one prompt
+            index: Position of the part
+            total: Number of parts
+            
+        Returns:
+            Bullet point summary without headings
+        """
+        prompt = f"""You are a technical expert with deep knowledge of software development practices.
+You have been given part {index + 1} of {total} of a git diff from a GitHub Pull Request.
+
+List the key changes in this part as short bullet points, grouped by topic or functionality if applicable.
+Only describe what is in this part. No more than 80 words. Do not add headings.
+
+Here is the git diff part for analysis:
+
+{diff_part}"""
+        return self._chat_completion(prompt)
+    
+    def _merge_partial_summaries(self, partial_summaries: List[str], commits_text: str) -> str:
+        """
+        Merge separately generated summaries into the final analysis
+        
+        Args:
+            partial_summaries: Bullet point summaries of diff parts or commits
+            commits_text: Formatted commit message list
+            
+        Returns:
+            Merged analysis in the ### Summary / ### Title format
+        """
+        partials_text = '\n\n'.join(
+            f"Part {index + 1}:\n{summary.strip()}" for index, summary in enumerate(partial_summaries)
+        )
+        
+        prompt = f"""You are a technical expert with deep knowledge of software development practices.
+A large GitHub Pull Request was split into parts and each part was summarized separately.
+
+Please merge these partial summaries into one summary of what this Pull Request does. Focus on:
+1. Key changes made in the code. Grouped by topic or functionality if applicable. Drop duplicates and minor details.
+2. A short meaningful title describing the gist of these changes. This should be able to give a good understanding of the PR at a glance without additional context.
+
+Your response is formatted in markdown with the following structure.
+### Summary
+### Title
+
+Keep your response concise but informative, suitable for a technical audience. Your response must be extremely concise, no more than 100 words. Answer in bullet points, not in paragraphs.
+
+Commits in this PR:
+{commits_text}
+
+Partial summaries:
+
+{partials_text}"""
+
+        return self._chat_completion(prompt)
+    
+    def _chat_completion(self, prompt: str) -> str:
+        """
+        Send a single-message chat completion request to OpenRouter
+        
+        Args:
+            prompt: User prompt
+            
+        Returns:
+            Content of the model response
+        """
+        prompt_tokens = estimate_tokens(prompt)
+        tier, model = self.router.route(prompt_tokens)
+        if self.llm_cache:
+            cached = self.llm_cache.get(model, self.temperature, prompt)
+            if cached is not None:
+                self.metrics.add("llm_cache_hits")
+                return cached
+        
         headers = {
             "Authorization": f"Bearer {self.openrouter_api_key}",
             "Content-Type": "application/json",
@@ -121,9 +569,8 @@ Here is the git diff output for analysis:
             "X-Title": "GitHub PR Diff Analysis",
         }
         
-        # Use a capable model for code analysis
         data = {
-            "model": "deepseek/deepseek-r1-0528:free",
+            "model": model,
             "transforms": ["middle-out"],
             "messages": [
                 {
@@ -131,30 +578,87 @@ Here is the git diff output for analysis:
                     "content": prompt
                 }
             ],
-            "temperature": 0.1
+            "temperature": self.temperature,
+            # Ask OpenRouter to include the cost in the usage statistics
+            "usage": {"include": True}
         }
         
-        try:
-            response = requests.post(
-                f"{self.openrouter_base_url}/chat/completions",
-                headers=headers,
-                json=data
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
-            
-        except requests.exceptions.RequestException as e:
-            print(f"Error calling OpenRouter API: {e}")
-            if response is not None:
-                print(f"Response status: {response.status_code}")
-                print(f"Response content: {response.text}")
-            sys.exit(1)
+        def request(request_model: str):
+            def send(cancel):
+                self.metrics.add("llm_requests")
+                return stream_chat_completion(
+                    self.session,
+                    f"{self.openrouter_base_url}/chat/completions",
+                    headers,
+                    dict(data, model=request_model),
+                    first_token_timeout=self.first_token_timeout,
+                    total_timeout=self.total_timeout,
+                    cancel=cancel,
+                )
+            return send
+        
+        backup_model = self.router.backup_for(model)
+        self.metrics.add(f"llm_route_{tier}")
+        
+        for attempt in range(self.llm_retries + 1):
+            try:
+                start = time.perf_counter()
+                with self.metrics.timer("llm"):
+                    result, winner, hedged = run_hedged(
+                        request(model), request(backup_model) if backup_model else None,
+                        self.router.hedge_after, valid=lambda result: bool(result["content"]),
+                    )
+                winning_model = model if winner == "primary" else backup_model
+                if hedged:
+                    self.metrics.add("llm_hedges")
+                    self.metrics.add(f"llm_hedge_{winner}_wins")
+                self.router.record({
+                    "tier": tier,
+                    "prompt_tokens": prompt_tokens,
+                    "model": winning_model,
+                    "hedged": hedged,
+                    "winner": winner,
+                    "seconds": round(time.perf_counter() - start, 3),
+                })
+                break
+            except StreamTimeout as e:
+                self.metrics.add("llm_timeouts")
+                print(f"OpenRouter generation timed out ({e}), attempt {attempt + 1}/{self.llm_retries + 1}")
+                if attempt == self.llm_retries:
+                    raise PRAnalysisError(f"Error calling OpenRouter API: {e}") from e
+            except requests.exceptions.RequestException as e:
+                message = f"Error calling OpenRouter API: {e}"
+                response = getattr(e, 'response', None)
+                if response is not None:
+                    message += f"\nResponse status: {response.status_code}"
+                    message += f"\nResponse content: {response.text}"
+                raise PRAnalysisError(message) from e
+        
+        content = result["content"]
+        self.latencies.append({
+            "first_token": result["first_token_latency"],
+            "total": result["total_latency"],
+        })
+        first_token = result["first_token_latency"]
+        if first_token is not None:
+            self.metrics.observe("llm_first_token", first_token)
+        usage = result["usage"] or {}
+        self.metrics.add("prompt_tokens", usage.get("prompt_tokens") or 0)
+        self.metrics.add("completion_tokens", usage.get("completion_tokens") or 0)
+        self.metrics.add("cost_usd", usage.get("cost") or 0)
+        first_token_text = f"{first_token:.1f}s" if first_token is not None else "n/a"
+        print(f"OpenRouter response: first token {first_token_text}, total {result['total_latency']:.1f}s")
+        if not content:
+            raise PRAnalysisError("Error calling OpenRouter API: empty response")
+        
+        if self.llm_cache:
+            # A hedged backup's answer is cached under the backup model, never served as the primary's
+            self.llm_cache.put(winning_model, self.temperature, prompt, content)
+        return content
     
     def save_to_json(self, analysis: str, pr_data: Dict[str, Any], commits_data: list,
                      repo_owner: str, repo_name: str, pr_number: int, 
-                     output_file: str = "pr_analysis.json"):
+                     output_file: str = "pr_analysis.json", generated_by: Optional[str] = None):
         """
         Save the analysis to a JSON file
         
@@ -165,8 +669,10 @@ Here is the git diff output for analysis:
             repo_owner: GitHub repository owner
             repo_name: GitHub repository name
             pr_number: Pull Request number
-            output_file: Output JSON file path
+            output_file: Output JSON file path (ignored when an analysis store is configured)
+            generated_by: Marker for analyses not written by the model, e.g. "rules:lockfile_only" or "similar:1234"
         """
+        parse_start = time.perf_counter()
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         pr_url = f"https://github.com/{repo_owner}/{repo_name}/pull/{pr_number}"
         
@@ -225,21 +731,237 @@ Here is the git diff output for analysis:
             "original_description": pr_data.get('body', 'No description provided'),
             "raw_analysis": analysis
         }
+        if generated_by:
+            json_data["generated_by"] = generated_by
+        self.metrics.observe("parse", time.perf_counter() - parse_start)
+        
+        if self.analysis_store:
+            try:
+                with self.metrics.timer("write"):
+                    self.analysis_store.put(json_data)
+                print(f"Analysis of PR #{pr_number} saved to the analysis store")
+            except (IOError, sqlite3.Error) as e:
+                raise PRAnalysisError(f"Error saving analysis: {e}") from e
+            return
         
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
+            with self.metrics.timer("write"), open(output_file, 'w', encoding='utf-8') as f:
                 json.dump(json_data, f, indent=2, ensure_ascii=False)
             print(f"Analysis saved to {output_file}")
         except IOError as e:
-            print(f"Error saving JSON file: {e}")
-            sys.exit(1)
+            raise PRAnalysisError(f"Error saving JSON file: {e}") from e
+
+
+def process_pr(analyzer: GitHubPRAnalyzer, repo_owner: str, repo_name: str,
+               pr_number: int, output_file: str, prefetched: Optional[Tuple] = None):
+    """
+    Fetch, analyze and save a single PR
+    
+    Args:
+        analyzer: Analyzer used for the GitHub and OpenRouter calls
+        repo_owner: GitHub repository owner
+        repo_name: GitHub repository name
+        pr_number: Pull Request number
+        output_file: Output JSON file path
+        prefetched: Already known (pr_data, commits_data) for this PR
+    """
+    with analyzer.metrics.pr(pr_number), analyzer.metrics.timer("pr_total"):
+        pr_data, commits_data = prefetched or (None, None)
+        print(f"Fetching PR #{pr_number} from {repo_owner}/{repo_name}...")
+        diff_content, pr_data, commits_data = analyzer.fetch_pr_diff(repo_owner, repo_name, pr_number,
+                                                                     pr_data, commits_data)
+        
+        trivial = classify_trivial(diff_content, pr_data, commits_data) if analyzer.rule_summaries else None
+        per_commit = trivial is None and analyzer.should_analyze_per_commit(commits_data)
+        similar = None
+        # Per-commit PRs reuse their known commits from the commit store and still cover new ones
+        if trivial is None and not per_commit and analyzer.similarity_index is not None:
+            with analyzer.metrics.timer("similarity"):
+                similar = analyzer.similarity_index.query(diff_content, analyzer.similarity_threshold, exclude=pr_number)
+        generated_by = None
+        if trivial:
+            rule, analysis = trivial
+            generated_by = f"rules:{rule}"
+            print(f"PR #{pr_number} is trivial ({rule}), summarizing without OpenRouter")
+            analyzer.metrics.add("rule_summaries")
+            analyzer.metrics.add(f"rule_{rule}")
+        elif similar:
+            record, score, reverted = similar
+            analysis = adapt_analysis(record, reverted)
+            generated_by = f"similar:{record['number']}"
+            print(f"PR #{pr_number} {'reverts' if reverted else 'repeats'} PR #{record['number']} "
+                  f"(similarity {score:.2f}), reusing its summary")
+            analyzer.metrics.add("similar_reuses")
+        elif per_commit:
+            print(f"Analyzing PR #{pr_number} with OpenRouter...")
+            analysis = analyzer.analyze_per_commit(repo_owner, repo_name, commits_data)
+        else:
+            print(f"Analyzing PR #{pr_number} with OpenRouter...")
+            analysis = analyzer.analyze_with_openrouter(diff_content, pr_data, commits_data)
+        
+        analyzer.save_to_json(analysis, pr_data, commits_data, repo_owner, repo_name, pr_number, output_file,
+                              generated_by=generated_by)
+        if generated_by is None and analyzer.similarity_index is not None:
+            analyzer.similarity_index.add(pr_number, diff_content, analysis, pr_data.get('title', ''))
+
+
+def process_prs_batch(analyzer: GitHubPRAnalyzer, repo_owner: str, repo_name: str,
+                      pr_numbers: List[int], output_dir: str, concurrency: int = 4,
+                      listing: Optional[Dict[int, Dict[str, Any]]] = None,
+                      backend: str = "graphql", budget: Optional[RunBudget] = None) -> Dict[int, Optional[str]]:
+    """
+    Process many PRs concurrently in a bounded worker pool
+    
+    A failing PR is reported and skipped; it does not stop the remaining PRs.
+    With a budget, PRs are planned cheapest first and the ones that do not fit
+    the token or time cap are deferred to budget.deferred instead of failing.
+    
+    Args:
+        analyzer: Analyzer shared by all workers
+        repo_owner: GitHub repository owner
+        repo_name: GitHub repository name
+        pr_numbers: Pull Request numbers to process
+        output_dir: Folder receiving one <pr_number>.json file per PR
+        concurrency: Maximum number of PRs processed at the same time
+        listing: PR metadata by number from list_prs_without_summaries
+        backend: "graphql" to prefetch metadata and commits in batches, "rest" for per-PR requests
+        budget: Token and wall-clock caps of the run, None for no caps
+        
+    Returns:
+        Mapping of PR number to None on success or the error message on failure; deferred PRs are left out
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    results = {}
+    
+    if backend == "graphql":
+        prefetched = analyzer.prefetch_prs(repo_owner, repo_name, pr_numbers, listing)
+    else:
+        prefetched = {number: ((listing or {}).get(number), None) for number in pr_numbers}
+    
+    estimates = {}
+    if budget is not None:
+        with analyzer.metrics.timer("plan"):
+            estimates = {estimate["number"]: estimate
+                         for estimate in analyzer.estimate_prs(repo_owner, repo_name, prefetched)}
+        planned, deferred = plan_run(list(estimates.values()), budget.max_tokens,
+                                     budget.remaining_seconds(), concurrency)
+        budget.defer(estimate["number"] for estimate in deferred)
+        pr_numbers = [estimate["number"] for estimate in planned]
+    
+    def run(pr_number: int, overdue: bool = False) -> bool:
+        # The plan is checked again against the tokens actually used so far
+        if budget is not None and not overdue and not budget.admit(estimates[pr_number]):
+            return False
+        try:
+            process_pr(analyzer, repo_owner, repo_name, pr_number,
+                       os.path.join(output_dir, f"{pr_number}.json"), prefetched.get(pr_number))
+        finally:
+            if budget is not None:
+                budget.release(pr_number)
+        return True
+    
+    def collect(futures):
+        for future in as_completed(futures):
+            pr_number = futures[future]
+            try:
+                if not future.result():
+                    continue
+                results[pr_number] = None
+                analyzer.metrics.add("prs_succeeded")
+            except Exception as e:
+                print(f"PR #{pr_number} failed: {e}")
+                results[pr_number] = str(e)
+                analyzer.metrics.add("prs_failed")
+    
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        collect({executor.submit(run, pr_number): pr_number for pr_number in pr_numbers})
+        
+        # The oldest deferred PR still gets its turn once the queue is empty, so no PR is deferred forever
+        if budget is not None and budget.deferred:
+            oldest = min(budget.deferred)
+            if budget.admit_overdue(estimates[oldest]):
+                print(f"Queue empty, starting deferred PR #{oldest}")
+                collect({executor.submit(run, oldest, True): oldest})
+    
+    return results
+
+
+def read_pr_numbers(prs: Optional[str], pr_file: Optional[str]) -> List[int]:
+    """
+    Collect PR numbers from a comma/space separated string and/or a file
+    
+    Args:
+        prs: PR numbers such as "123,124 125"
+        pr_file: File with whitespace separated PR numbers (e.g. pr_list.txt)
+        
+    Returns:
+        Unique PR numbers in their original order
+    """
+    tokens = []
+    if prs:
+        tokens.extend(prs.replace(',', ' ').split())
+    if pr_file:
+        with open(pr_file, 'r', encoding='utf-8') as f:
+            tokens.extend(f.read().replace(',', ' ').split())
+    
+    pr_numbers = []
+    for token in tokens:
+        pr_number = int(token)
+        if pr_number not in pr_numbers:
+            pr_numbers.append(pr_number)
+    return pr_numbers
+
+
+def read_listing(listing_file: str) -> Dict[int, Dict[str, Any]]:
+    """
+    Load the PR listing written by list_prs_without_summaries --listing-output
+    
+    Args:
+        listing_file: Path to the JSON listing
+        
+    Returns:
+        PR metadata keyed by PR number
+    """
+    with open(listing_file, 'r', encoding='utf-8') as f:
+        return {pr["number"]: pr for pr in json.load(f)}
 
 def main():
     """Main function to run the PR analyzer"""
     parser = argparse.ArgumentParser(description="Analyze GitHub Pull Request using OpenRouter")
     parser.add_argument("--repo", required=True, help="Repository in format owner/repo")
-    parser.add_argument("--pr", required=True, type=int, help="Pull Request number")
+    pr_group = parser.add_mutually_exclusive_group(required=True)
+    pr_group.add_argument("--pr", type=int, help="Pull Request number")
+    pr_group.add_argument("--prs", help="Batch mode: comma or space separated Pull Request numbers")
+    pr_group.add_argument("--pr-file", help="Batch mode: file with Pull Request numbers (e.g. pr_list.txt)")
     parser.add_argument("--output", default="pr_analysis.json", help="Output file (JSON or markdown)")
+    parser.add_argument("--output-dir", default=".", help="Batch mode: folder for the <pr>.json output files")
+    parser.add_argument("--concurrency", type=int, default=4, help="Batch mode: number of PRs processed in parallel (default: 4)")
+    parser.add_argument("--listing-file", help="Batch mode: PR listing JSON from list_prs_without_summaries.py --listing-output")
+    parser.add_argument("--backend", choices=["graphql", "rest"], default="graphql", help="Batch mode: how PR metadata and commits are fetched")
+    parser.add_argument("--chunk-tokens", type=int, default=30000, help="Diff token budget per prompt; larger diffs are summarized in chunks (default: 30000)")
+    parser.add_argument("--diff-budget", type=int, default=500000, help="Bytes of file diffs downloaded per PR, 0 for no limit (default: 500000)")
+    parser.add_argument("--routing-config", help="Model routing policy JSON (size tiers and hedging); default: built-in tiers")
+    parser.add_argument("--hedge-after", type=float, help="Start a backup model request when the primary has not answered after this many seconds")
+    parser.add_argument("--routing-log", help="Append one JSON line per LLM request with its tier, model and hedge outcome")
+    parser.add_argument("--no-rule-summaries", action="store_true", help="Send trivial PRs (lockfile bumps, image assets, whitespace and typo fixes) to the model too")
+    parser.add_argument("--reuse-similar", action="store_true", help="Reuse the summary of a nearly identical (or reverted) earlier PR instead of calling the model")
+    parser.add_argument("--similarity-index", help="Near-duplicate index (default: data/similarity/<owner>/<repo>.jsonl)")
+    parser.add_argument("--similarity-threshold", type=float, default=0.95, help="Minimum diff similarity for reusing a summary (default: 0.95)")
+    parser.add_argument("--diff-context", type=int, default=1, help="Context lines kept around changes when compacting diffs for the prompt (default: 1)")
+    parser.add_argument("--no-compact-diff", action="store_true", help="Send diffs to the model verbatim instead of compacting them")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call OpenRouter instead of reusing cached responses")
+    parser.add_argument("--per-commit", action="store_true", help="Summarize multi-commit PRs commit by commit, reusing stored commit summaries")
+    parser.add_argument("--commit-store", help="Commit summary store (default: data/commit-summaries/<owner>/<repo>.jsonl)")
+    parser.add_argument("--first-token-timeout", type=float, default=120, help="Seconds to wait for the first streamed LLM token (default: 120)")
+    parser.add_argument("--total-timeout", type=float, default=600, help="Seconds allowed for a whole LLM response (default: 600)")
+    parser.add_argument("--llm-retries", type=int, default=1, help="Retries after a timed out LLM generation (default: 1)")
+    parser.add_argument("--plan", action="store_true", help="Dry run: estimate the tokens and time of every PR from its line counts and print the run plan without calling OpenRouter")
+    parser.add_argument("--max-tokens", type=int, help="Batch mode: token cap of the run; PRs that do not fit are deferred to the next run")
+    parser.add_argument("--max-minutes", type=float, help="Batch mode: wall-clock cap of the run in minutes; PRs that do not fit are deferred to the next run")
+    parser.add_argument("--deferred-output", help="Batch mode: write the deferred PR numbers to this file")
+    parser.add_argument("--store", help="Analysis store (e.g. data/analysis.sqlite) used instead of per-PR JSON files")
+    parser.add_argument("--metrics-output", help="Write per-stage timings, token usage and cost of this run as JSON")
+    parser.add_argument("--prometheus-output", help="Also write the run metrics as a Prometheus text file")
     parser.add_argument("--format", choices=["json", "markdown"], default="json", help="Output format")
     parser.add_argument("--api-key", help="OpenRouter API key (or use OPENROUTER_API_KEY env var)")
     
@@ -247,7 +969,7 @@ def main():
     
     # Get API key from argument or environment
     api_key = args.api_key or os.getenv("OPENROUTER_API_KEY")
-    if not api_key:
+    if not api_key and not args.plan:
         print("Error: OpenRouter API key is required. Set OPENROUTER_API_KEY environment variable or use --api-key argument.")
         sys.exit(1)
     
@@ -259,19 +981,86 @@ def main():
         sys.exit(1)
     
     # Initialize analyzer
-    analyzer = GitHubPRAnalyzer(api_key)
+    try:
+        router = ModelRouter.from_file(args.routing_config, args.routing_log) if args.routing_config \
+            else ModelRouter(log_file=args.routing_log)
+    except (IOError, ValueError) as e:
+        print(f"Error reading routing configuration: {e}")
+        sys.exit(1)
+    if args.hedge_after is not None:
+        router.hedge_after = args.hedge_after
+    llm_cache = None if args.no_llm_cache else LLMCache()
+    commit_store = None
+    if args.per_commit:
+        commit_store = CommitSummaryStore(args.commit_store or f"data/commit-summaries/{repo_owner}/{repo_name}.jsonl")
+    similarity_index = None
+    if args.reuse_similar:
+        similarity_index = SimilarityIndex(args.similarity_index or f"data/similarity/{repo_owner}/{repo_name}.jsonl")
+    analyzer = GitHubPRAnalyzer(api_key, chunk_tokens=args.chunk_tokens, llm_cache=llm_cache,
+                                commit_store=commit_store, first_token_timeout=args.first_token_timeout,
+                                total_timeout=args.total_timeout, llm_retries=args.llm_retries,
+                                analysis_store=open_store(args.store, args.repo) if args.store else None,
+                                diff_budget=args.diff_budget, router=router,
+                                rule_summaries=not args.no_rule_summaries, similarity_index=similarity_index,
+                                similarity_threshold=args.similarity_threshold,
+                                diff_context=None if args.no_compact_diff else args.diff_context)
+    
+    max_seconds = args.max_minutes * 60 if args.max_minutes is not None else None
+    
+    if args.pr is None or args.plan:
+        try:
+            pr_numbers = [args.pr] if args.pr is not None else read_pr_numbers(args.prs, args.pr_file)
+            listing = read_listing(args.listing_file) if args.listing_file else None
+        except (IOError, ValueError, KeyError) as e:
+            print(f"Error reading PR numbers: {e}")
+            sys.exit(1)
     
-    print(f"Fetching PR #{args.pr} from {args.repo}...")
-    diff_content, pr_data, commits_data = analyzer.fetch_pr_diff(repo_owner, repo_name, args.pr)
+    if args.plan:
+        if args.backend == "graphql":
+            prefetched = analyzer.prefetch_prs(repo_owner, repo_name, pr_numbers, listing)
+        else:
+            prefetched = {number: ((listing or {}).get(number), None) for number in pr_numbers}
+        planned, deferred = plan_run(analyzer.estimate_prs(repo_owner, repo_name, prefetched),
+                                     args.max_tokens, max_seconds, args.concurrency)
+        print_plan(planned, deferred, args.concurrency)
+        return
     
-    print(f"Analyzing diff with OpenRouter...")
-    analysis = analyzer.analyze_with_openrouter(diff_content, pr_data, commits_data)
+    if args.pr is None:
+        budget = None
+        if args.max_tokens is not None or max_seconds is not None:
+            budget = RunBudget(analyzer.metrics, args.max_tokens, max_seconds)
+        
+        results = process_prs_batch(analyzer, repo_owner, repo_name, pr_numbers,
+                                    args.output_dir, args.concurrency, listing, args.backend, budget)
+        failed = sorted(pr for pr, error in results.items() if error)
+        deferred = sorted(budget.deferred) if budget else []
+        if args.deferred_output:
+            os.makedirs(os.path.dirname(args.deferred_output) or ".", exist_ok=True)
+            with open(args.deferred_output, 'w', encoding='utf-8') as f:
+                f.write(''.join(f"{pr}\n" for pr in deferred))
+        if llm_cache:
+            print(llm_cache.stats())
+        analyzer.metrics.add("prs_deferred", len(deferred))
+        analyzer.metrics.write(args.metrics_output, args.prometheus_output)
+        print(f"Done! {len(results) - len(failed)} succeeded, {len(failed)} failed, {len(deferred)} deferred")
+        if deferred:
+            print(f"Deferred PRs (over the run budget, listed again next run): {', '.join(str(pr) for pr in deferred)}")
+        if failed:
+            print(f"Failed PRs: {', '.join(str(pr) for pr in failed)}")
+            sys.exit(1)
+        return
     
-    print("Saving analysis to JSON...")
-    analyzer.save_to_json(analysis, pr_data, commits_data, repo_owner, repo_name, args.pr, args.output)
+    try:
+        process_pr(analyzer, repo_owner, repo_name, args.pr, args.output)
+    except PRAnalysisError as e:
+        print(e)
+        analyzer.metrics.write(args.metrics_output, args.prometheus_output)
+        sys.exit(1)
     
+    if llm_cache:
+        print(llm_cache.stats())
+    analyzer.metrics.write(args.metrics_output, args.prometheus_output)
     print("Done!")
 
-
 if __name__ == "__main__":
     main()
\ No newline at end of file
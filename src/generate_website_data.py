@@ -1,12 +1,29 @@
 #!/usr/bin/env python3
 
 import os
+import gzip
 import json
+import hashlib
 from datetime import datetime
 from pathlib import Path
+import re
 import argparse
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from xml.sax.saxutils import escape, quoteattr
+
+from analysis_store import is_sqlite_location, open_store
+from metrics import get_shared_metrics
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it only gzip variants are written
+    brotli = None
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Fields the card grid needs up front; everything else is fetched when a card is expanded
+LIST_FIELDS = ("number", "title", "author", "created", "url", "generated_title", "generated_by")
+DETAIL_DIR = "pr"
 
 def parse_json_file(file_path):
     """Parse a JSON file and extract PR information"""
@@ -20,164 +37,506 @@ def parse_json_file(file_path):
         print(f"Error parsing {file_path}: {e}")
         return None
 
-def generate_website_data(analysis_dir_name: str, output: str):
-    """Generate data for the website from all JSON files"""
+def file_hash(data: bytes) -> str:
+    """Return the content hash used in the change manifest"""
+    return hashlib.sha256(data).hexdigest()
+
+def load_manifest(manifest_path: Path, output_path: Path):
+    """
+    Load the change manifest and the previous output it describes
+    
+    The manifest is only trusted if the output file still has the hash
+    recorded when it was written; otherwise everything is rebuilt.
+    
+    Returns:
+        Tuple of (manifest file entries, previous PR records by file name)
+    """
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        with open(output_path, 'rb') as f:
+            output_bytes = f.read()
+    except (IOError, ValueError):
+        return {}, {}
+    
+    if manifest.get('output_hash') != file_hash(output_bytes):
+        print("Output changed since the last run, rebuilding everything")
+        return {}, {}
+    
+    records = {}
+    try:
+        by_number = {pr.get('number'): pr for pr in json.loads(output_bytes)}
+    except ValueError:
+        return {}, {}
+    for name, entry in manifest.get('files', {}).items():
+        if entry.get('number') in by_number:
+            records[name] = by_number[entry['number']]
+    
+    return {name: entry for name, entry in manifest.get('files', {}).items() if name in records}, records
+
+def default_manifest_path(output_path: Path) -> Path:
+    """One manifest per output so several sites can be built from the same checkout"""
+    manifest_name = str(output_path).strip('./').replace('/', '_').replace('\\', '_')
+    return Path('.cache/website') / f"{manifest_name}.manifest.json"
+
+def default_records_path(output_path: Path) -> Path:
+    """Full PR records kept between compact runs, as the compact output cannot be reused"""
+    records_name = str(output_path).strip('./').replace('/', '_').replace('\\', '_')
+    return Path('.cache/website') / f"{records_name}.records.json"
+
+def print_summary(pr_data):
+    """Print the totals of a generated data set"""
+    print("\n=== Summary ===")
+    print(f"Total PRs: {len(pr_data)}")
+    if pr_data:
+        print(f"Latest PR: #{pr_data[0].get('number', 'N/A')} - {pr_data[0].get('title', 'N/A')}")
+        print(f"Oldest PR: #{pr_data[-1].get('number', 'N/A')} - {pr_data[-1].get('title', 'N/A')}")
+
+def generate_website_data_from_store(store_location: str, output: str, manifest_path: str = None,
+                                     repository: str = None):
+    """
+    Generate data for the website from a consolidated analysis store
+    
+    The store is read sequentially in PR number order; the output is only
+    rewritten when the store's fingerprint changed since the last run.
+    
+    Returns:
+        Tuple of (sorted PR records, whether the output was rewritten, None as
+        changes are not tracked per PR)
+    """
+    store = open_store(store_location, repository)
+    output_path = Path(output)
+    manifest_path = Path(manifest_path) if manifest_path else default_manifest_path(output_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    fingerprint = f"{repository}:{store.fingerprint()}"
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            unchanged = json.load(f).get('store_fingerprint') == fingerprint and output_path.exists()
+    except (IOError, ValueError):
+        unchanged = False
+    
+    pr_data = list(store.export())
+    print(f"Loaded {len(pr_data)} PR analyses from {store_location}")
+    
+    if unchanged:
+        print("No changes, keeping existing output")
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(pr_data, indent=2))
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({"store_fingerprint": fingerprint}, f)
+        print(f"Generated pr-data.json with {len(pr_data)} PRs")
+    
+    print_summary(pr_data)
+    return pr_data, not unchanged, None
+
+def generate_website_data(analysis_dir_name: str, output: str, manifest_path: str = None, repository: str = None):
+    """
+    Generate data for the website from all JSON files
+    
+    Only analyses that are new or changed since the last run (according to
+    the manifest of path, mtime/size and content hash) are parsed; the rest
+    is taken from the previous output. Nothing is rewritten if nothing changed.
+    
+    Returns:
+        Tuple of (sorted PR records, whether the output was rewritten, numbers
+        of the PRs parsed in this run)
+    """
+    if is_sqlite_location(analysis_dir_name):
+        return generate_website_data_from_store(analysis_dir_name, output, manifest_path, repository)
     
     # Path to the analysis files
     analysis_dir = Path(analysis_dir_name)
     
     if not analysis_dir.exists():
         print(f"Analysis directory not found: {analysis_dir}")
-        return
+        return [], False, set()
+    
+    output_path = Path(output)
+    manifest_path = Path(manifest_path) if manifest_path else default_manifest_path(output_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    old_entries, old_records = load_manifest(manifest_path, output_path)
     
-    # Parse all JSON files
-    pr_data = []
+    entries = {}
+    records = {}
+    changed_numbers = set()
     
-    for json_file in analysis_dir.glob('*.json'):
-        print(f"Parsing {json_file.name}...")
-        pr_info = parse_json_file(json_file)
-        if pr_info:
-            pr_data.append(pr_info)
+    with os.scandir(analysis_dir) as it:
+        for dir_entry in it:
+            if not dir_entry.name.endswith('.json') or not dir_entry.is_file():
+                continue
+            stat = dir_entry.stat()
+            old = old_entries.get(dir_entry.name)
+            
+            # Unchanged size and mtime: reuse without reading the file
+            if old and old['mtime'] == stat.st_mtime and old['size'] == stat.st_size:
+                entries[dir_entry.name] = old
+                records[dir_entry.name] = old_records[dir_entry.name]
+                continue
+            
+            with open(dir_entry.path, 'rb') as f:
+                data = f.read()
+            digest = file_hash(data)
+            
+            # Touched but identical content (e.g. fresh checkout)
+            if old and old['hash'] == digest:
+                entries[dir_entry.name] = dict(old, mtime=stat.st_mtime, size=stat.st_size)
+                records[dir_entry.name] = old_records[dir_entry.name]
+                continue
+            
+            print(f"Parsing {dir_entry.name}...")
+            pr_info = parse_json_file(dir_entry.path)
+            if pr_info:
+                entries[dir_entry.name] = {
+                    "mtime": stat.st_mtime,
+                    "size": stat.st_size,
+                    "hash": digest,
+                    "number": pr_info.get('number'),
+                }
+                records[dir_entry.name] = pr_info
+                changed_numbers.add(pr_info.get('number'))
+    
+    changed = len(changed_numbers)
+    removed = len(set(old_entries) - set(entries))
+    pr_data = list(records.values())
     
     # Sort by PR number (descending)
     pr_data.sort(key=lambda x: x.get('number', 0), reverse=True)
     
-    print(f"Parsed {len(pr_data)} PR analyses")
-        
-    with open(Path(output), 'w', encoding='utf-8') as f:
-        f.write(json.dumps(pr_data, indent=2))
+    print(f"Parsed {changed} new or changed PR analyses, {removed} removed, {len(pr_data) - changed} unchanged")
     
-    print(f"Generated pr-data.json with {len(pr_data)} PRs")
+    if changed == 0 and removed == 0 and output_path.exists() and old_entries:
+        print("No changes, keeping existing output")
+        rewritten = False
+    else:
+        output_bytes = json.dumps(pr_data, indent=2).encode('utf-8')
+        with open(output_path, 'wb') as f:
+            f.write(output_bytes)
+        
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({"output_hash": file_hash(output_bytes), "files": entries}, f)
+        
+        print(f"Generated pr-data.json with {len(pr_data)} PRs")
+        rewritten = True
     
     # Print summary
-    print("\n=== Summary ===")
-    print(f"Total PRs: {len(pr_data)}")
-    if pr_data:
-        print(f"Latest PR: #{pr_data[0].get('number', 'N/A')} - {pr_data[0].get('title', 'N/A')}")
-        print(f"Oldest PR: #{pr_data[-1].get('number', 'N/A')} - {pr_data[-1].get('title', 'N/A')}")
+    print_summary(pr_data)
+    
+    return pr_data, rewritten, changed_numbers
+
+def write_precompressed(path: Path, data: bytes):
+    """Write a file with gzip (and, if available, brotli) variants next to it for static serving"""
+    with open(path, 'wb') as f:
+        f.write(data)
+    # mtime=0 keeps the gzip bytes identical for identical content
+    with open(f"{path}.gz", 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(f"{path}.br", 'wb') as f:
+            f.write(brotli.compress(data))
+
+def minify(value) -> bytes:
+    """Serialize JSON without whitespace"""
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
 
-def generate_atom_feed(pr_data, output_path, base_url="https://llm-pr-summary.com"):
-    """Generate an Atom feed from PR data"""
+def previous_details(output_path: Path):
+    """Detail file names by PR number from the previous list payload"""
+    try:
+        with open(output_path, 'r', encoding='utf-8') as f:
+            return {item['number']: item['detail'][len(DETAIL_DIR) + 1:] for item in json.load(f) if 'detail' in item}
+    except (IOError, ValueError, KeyError, TypeError):
+        return {}
+
+def write_compact_payload(pr_data, output, rewrite: bool = True, changed=None):
+    """
+    Write the list payload and the per-PR detail files
     
-    # Create the root feed element
-    feed = ET.Element("feed", xmlns="http://www.w3.org/2005/Atom")
+    The list only has the LIST_FIELDS of every PR plus the path of its
+    detail file. Detail files hold the full record and are named by a hash
+    of their content, so they can be cached forever and are only written
+    when new; detail files no longer referenced are removed.
     
-    # Feed metadata
-    title = ET.SubElement(feed, "title")
-    title.text = "LLM PR Summary Feed"
+    Args:
+        pr_data: Sorted full PR records
+        output: List payload path (e.g. app/public/pr-data.json)
+        rewrite: Rewrite the list payload even if it exists
+        changed: Numbers of the PRs whose records changed, None if unknown;
+            the others keep the detail file of the previous list payload
     
-    link = ET.SubElement(feed, "link", href=base_url, rel="alternate")
-    link_self = ET.SubElement(feed, "link", href=f"{base_url}/feed.xml", rel="self")
+    Returns:
+        Number of detail files written
+    """
+    output_path = Path(output)
+    detail_dir = output_path.parent / DETAIL_DIR
+    detail_dir.mkdir(parents=True, exist_ok=True)
+    previous = previous_details(output_path) if changed is not None else {}
     
-    feed_id = ET.SubElement(feed, "id")
-    feed_id.text = f"{base_url}/feed.xml"
+    listing = []
+    referenced = set()
+    written = 0
+    for pr in pr_data:
+        name = previous.get(pr.get('number'))
+        if name is None or pr.get('number') in changed or not (detail_dir / name).exists():
+            data = minify(pr)
+            name = f"{pr.get('number')}.{file_hash(data)[:12]}.json"
+            if not (detail_dir / name).exists():
+                write_precompressed(detail_dir / name, data)
+                written += 1
+        referenced.add(name)
+        item = {field: pr[field] for field in LIST_FIELDS if field in pr}
+        item["detail"] = f"{DETAIL_DIR}/{name}"
+        listing.append(item)
     
-    subtitle = ET.SubElement(feed, "subtitle")
-    subtitle.text = "AI-generated summaries of GitHub pull requests"
+    removed = 0
+    for entry in os.scandir(detail_dir):
+        if entry.name.split('.json')[0] + '.json' not in referenced:
+            os.remove(entry.path)
+            removed += 1
     
-    author = ET.SubElement(feed, "author")
-    author_name = ET.SubElement(author, "name")
-    author_name.text = "LLM PR Summary"
+    if rewrite or not output_path.exists():
+        write_precompressed(output_path, minify(listing))
+        print(f"Generated compact {output_path.name} with {len(listing)} PRs")
+    print(f"Wrote {written} detail files, removed {removed} stale files in {detail_dir}")
+    return written
+
+def tokenize(text: str):
+    """Split text into lowercase alphanumeric search terms"""
+    return TOKEN_RE.findall(text.lower())
+
+def build_search_index(pr_data):
+    """
+    Build a compact inverted index for the website search
     
-    # Use the latest PR date as the feed updated time, or current time if no PRs
-    if pr_data:
-        latest_date = pr_data[0].get('created', datetime.now().isoformat())
-        # Convert to ISO format if needed
-        if 'T' in latest_date and not latest_date.endswith('Z'):
-            latest_date = latest_date + 'Z' if not latest_date.endswith('Z') else latest_date
-    else:
-        latest_date = datetime.now().isoformat() + 'Z'
+    Terms come from the same fields the client searched linearly before:
+    title, number, author, summary and details. Terms are sorted so the
+    client can find all terms with a given prefix by binary search.
     
-    updated = ET.SubElement(feed, "updated")
-    updated.text = latest_date
+    Returns:
+        Dict with "terms" ([term, [PR numbers]] pairs sorted by term) and
+        "authors" ([author, [PR numbers]] pairs sorted by lowercase author)
+    """
+    postings = {}
+    authors = {}
     
-    # Add entries for each PR (limit to most recent 20 for feed size)
-    for pr in pr_data[:20]:
-        entry = ET.SubElement(feed, "entry")
+    for pr in pr_data:
+        number = pr.get('number')
+        if number is None:
+            continue
         
-        entry_title = ET.SubElement(entry, "title")
-        entry_title.text = f"#{pr.get('number', 'N/A')}: {pr.get('title', 'No title')}"
+        author = str(pr.get('author', '')).lower()
+        authors.setdefault(author, []).append(number)
         
-        entry_link = ET.SubElement(entry, "link", href=f"https://pr.tim.ad/?search={pr.get('number', '')}")
-        
-        entry_id = ET.SubElement(entry, "id")
-        entry_id.text = pr.get('url', f"{base_url}/pr/{pr.get('number', 'unknown')}")
-        
-        entry_updated = ET.SubElement(entry, "updated")
-        pr_date = pr.get('created', datetime.now().isoformat())
-        if 'T' in pr_date and not pr_date.endswith('Z'):
-            pr_date = pr_date + 'Z' if not pr_date.endswith('Z') else pr_date
-        entry_updated.text = pr_date
-        
-        entry_published = ET.SubElement(entry, "published")
-        entry_published.text = pr_date
-        
-        entry_author = ET.SubElement(entry, "author")
-        entry_author_name = ET.SubElement(entry_author, "name")
-        entry_author_name.text = pr.get('author', 'Unknown')
-        
-        # Use summary as content
-        entry_summary = ET.SubElement(entry, "summary", type="text")
-        summary_text = pr.get('summary', '')
-        if not summary_text and pr.get('details'):
-            # Fallback to details if no summary
-            summary_text = '\n'.join(pr.get('details', []))
-        entry_summary.text = summary_text
-        
-        # Add content with more detailed information
-        entry_content = ET.SubElement(entry, "content", type="html")
-        content_html = f"""
+        text = ' '.join([
+            str(pr.get('title', '')),
+            str(number),
+            author,
+            str(pr.get('summary', '')),
+            ' '.join(pr.get('details', [])),
+        ])
+        for term in set(tokenize(text)):
+            postings.setdefault(term, []).append(number)
+    
+    return {
+        "version": 1,
+        "terms": [[term, postings[term]] for term in sorted(postings)],
+        "authors": [[author, authors[author]] for author in sorted(authors)],
+    }
+
+def write_search_index(pr_data, output_path, precompress: bool = False):
+    """Write the search index as minified JSON, optionally with precompressed variants"""
+    index = build_search_index(pr_data)
+    if precompress:
+        write_precompressed(Path(output_path), minify(index))
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'), ensure_ascii=False)
+    
+    print(f"Generated search index with {len(index['terms'])} terms at {output_path}")
+
+def atom_date(value):
+    """Return a timestamp in the form used by the feed"""
+    value = value or datetime.now().isoformat()
+    # Convert to ISO format if needed
+    if 'T' in value and not value.endswith('Z'):
+        value = value + 'Z'
+    return value
+
+def write_atom_entry(f, pr, base_url):
+    """Write a single PR entry to an open feed file"""
+    pr_date = atom_date(pr.get('created'))
+    
+    # Use summary as content
+    summary_text = pr.get('summary', '')
+    if not summary_text and pr.get('details'):
+        # Fallback to details if no summary
+        summary_text = '\n'.join(pr.get('details', []))
+    
+    # Add content with more detailed information
+    content_html = f"""
         <h3>Summary</h3>
         <p>{summary_text}</p>
         
         <h3>Details</h3>
         <ul>
         """
-        for detail in pr.get('details', []):
-            content_html += f"<li>{detail}</li>\n"
-        
-        content_html += """
+    for detail in pr.get('details', []):
+        content_html += f"<li>{detail}</li>\n"
+    
+    content_html += """
         </ul>
         
         <p><strong>Repository:</strong> {}</p>
         <p><strong>State:</strong> {}</p>
         <p><strong>Analysis Date:</strong> {}</p>
         """.format(
-            pr.get('repository', 'Unknown'),
-            pr.get('state', 'Unknown'),
-            pr.get('analysis_date', 'Unknown')
-        )
-        
-        entry_content.text = content_html
+        pr.get('repository', 'Unknown'),
+        pr.get('state', 'Unknown'),
+        pr.get('analysis_date', 'Unknown')
+    )
+    
+    number = pr.get('number', 'N/A')
+    entry_title = f"#{number}: {pr.get('title', 'No title')}"
+    entry_link = f"{base_url}/?search={pr.get('number', '')}"
+    entry_id = pr.get('url', f"{base_url}/pr/{pr.get('number', 'unknown')}")
     
-    # Pretty print the XML
-    rough_string = ET.tostring(feed, encoding='unicode')
-    reparsed = minidom.parseString(rough_string)
-    pretty_xml = reparsed.toprettyxml(indent="  ")
+    f.write('  <entry>\n')
+    f.write(f"    <title>{escape(entry_title)}</title>\n")
+    f.write(f"    <link href={quoteattr(entry_link)}/>\n")
+    f.write(f"    <id>{escape(entry_id)}</id>\n")
+    f.write(f"    <updated>{escape(pr_date)}</updated>\n")
+    f.write(f"    <published>{escape(pr_date)}</published>\n")
+    f.write('    <author>\n')
+    f.write(f"      <name>{escape(str(pr.get('author', 'Unknown')))}</name>\n")
+    f.write('    </author>\n')
+    f.write(f'    <summary type="text">{escape(summary_text)}</summary>\n')
+    f.write(f'    <content type="html">{escape(content_html)}</content>\n')
+    f.write('  </entry>\n')
+
+def generate_atom_feed(pr_data, output_path, base_url="https://llm-pr-summary.com", max_entries=20,
+                       title="LLM PR Summary Feed", feed_path="feed.xml"):
+    """
+    Generate an Atom feed from PR data
     
-    # Remove extra blank lines
-    lines = [line for line in pretty_xml.split('\n') if line.strip()]
-    pretty_xml = '\n'.join(lines)
+    The feed is streamed entry by entry to the output file from the
+    already sorted records (newest first); only max_entries are read.
+    """
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    self_url = f"{base_url}/{feed_path}"
+    entries = pr_data[:max_entries]
+    
+    # Use the latest PR date as the feed updated time, or current time if no PRs
+    if entries:
+        latest_date = atom_date(entries[0].get('created'))
+    else:
+        latest_date = datetime.now().isoformat() + 'Z'
     
-    # Write to file
     with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(pretty_xml)
+        # Feed metadata
+        f.write('<?xml version="1.0" ?>\n')
+        f.write('<feed xmlns="http://www.w3.org/2005/Atom">\n')
+        f.write(f"  <title>{escape(title)}</title>\n")
+        f.write(f'  <link href={quoteattr(base_url)} rel="alternate"/>\n')
+        f.write(f'  <link href={quoteattr(self_url)} rel="self"/>\n')
+        f.write(f"  <id>{escape(self_url)}</id>\n")
+        f.write('  <subtitle>AI-generated summaries of GitHub pull requests</subtitle>\n')
+        f.write('  <author>\n')
+        f.write('    <name>LLM PR Summary</name>\n')
+        f.write('  </author>\n')
+        f.write(f"  <updated>{escape(latest_date)}</updated>\n")
+        
+        for pr in entries:
+            write_atom_entry(f, pr, base_url)
+        
+        f.write('</feed>')
+    
+    print(f"Generated atom feed with {len(entries)} entries at {output_path}")
+
+def feed_slug(value):
+    """Turn a repository or author name into a file name"""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '-', str(value)).strip('-') or 'unknown'
+
+def generate_group_feeds(pr_data, feed_dir, base_url, max_entries=20, per_repo=True, per_author=True):
+    """
+    Generate one Atom feed per repository and/or per author
+    
+    A single pass over the sorted records keeps at most max_entries per
+    group, so memory stays bounded by the number of groups.
+    """
+    groups = {}
+    for pr in pr_data:
+        keys = []
+        if per_repo:
+            keys.append(('repo', pr.get('repository', 'unknown')))
+        if per_author:
+            keys.append(('author', pr.get('author', 'unknown')))
+        for key in keys:
+            entries = groups.setdefault(key, [])
+            if len(entries) < max_entries:
+                entries.append(pr)
+    
+    for (kind, name), entries in groups.items():
+        feed_path = f"feeds/{kind}/{feed_slug(name)}.atom"
+        generate_atom_feed(entries, Path(feed_dir) / kind / f"{feed_slug(name)}.atom", base_url,
+                           max_entries=max_entries, title=f"LLM PR Summary Feed: {name}",
+                           feed_path=feed_path)
+
+def build_website(analysis_folder: str, output: str, manifest: str = None, search_index: str = None,
+                  feed_output: str = "app/public/feed.atom", base_url: str = "https://pr.tim.ad",
+                  feed_entries: int = 20, repo_feeds: bool = False, author_feeds: bool = False,
+                  repository: str = None, compact: bool = False):
+    """
+    Generate pr-data.json, the search index and the Atom feeds for one analysis folder or store
     
-    print(f"Generated atom feed with {min(len(pr_data), 20)} entries at {output_path}")
+    With compact, pr-data.json is the minified list payload with lazily
+    fetched detail files (see write_compact_payload); the full records are
+    kept in the website cache for the next incremental run.
+    """
+    metrics = get_shared_metrics()
+    with metrics.timer("website_data"):
+        records_output = default_records_path(Path(output)) if compact else output
+        pr_data, rewritten, changed = generate_website_data(analysis_folder, str(records_output), manifest, repository)
+        if compact:
+            metrics.add("website_detail_files", write_compact_payload(pr_data, output, rewritten, changed))
+    search_index_path = Path(search_index) if search_index else Path(output).with_name("search-index.json")
+    if rewritten or not search_index_path.exists():
+        with metrics.timer("search_index"):
+            write_search_index(pr_data, search_index_path, precompress=compact)
+    if rewritten or not Path(feed_output).exists():
+        with metrics.timer("feeds"):
+            generate_atom_feed(pr_data,
+                              output_path=feed_output,
+                              base_url=base_url,
+                              max_entries=feed_entries)
+            if repo_feeds or author_feeds:
+                generate_group_feeds(pr_data, Path(feed_output).parent / "feeds", base_url,
+                                     max_entries=feed_entries, per_repo=repo_feeds, per_author=author_feeds)
+    metrics.add("website_prs", len(pr_data))
 
 def main():
     parser = argparse.ArgumentParser(description="Generate website data from PR analyses")
-    parser.add_argument("--analysis-folder", default="data/analysis/github/docs", help="Path to analysis folder")
+    parser.add_argument("--analysis-folder", default="data/analysis/github/docs", help="Path to analysis folder or analysis store (*.sqlite)")
+    parser.add_argument("--repository", help="owner/repo to read from a shared analysis store")
     parser.add_argument("--output", default="public/pr-data.json", help="Output file path")
+    parser.add_argument("--search-index", help="Search index output path (default: search-index.json next to --output)")
+    parser.add_argument("--feed-output", default="app/public/feed.atom", help="Atom feed output path")
+    parser.add_argument("--feed-entries", type=int, default=20, help="Number of entries per feed (default: 20)")
+    parser.add_argument("--repo-feeds", action="store_true", help="Also write one feed per repository under feeds/repo/")
+    parser.add_argument("--author-feeds", action="store_true", help="Also write one feed per author under feeds/author/")
+    parser.add_argument("--compact", action="store_true", help="Write a minified list payload with lazily loaded, content-hashed detail files and .gz/.br variants")
+    parser.add_argument("--manifest", help="Change manifest path (default: .cache/website/<output path>.manifest.json)")
+    parser.add_argument("--metrics-output", help="Write the run's stage timings as JSON")
+    parser.add_argument("--prometheus-output", help="Also write the run metrics as a Prometheus text file")
     
     args = parser.parse_args()
 
         
     try:        
-        generate_website_data(args.analysis_folder, args.output)
-        generate_atom_feed(json.load(open(args.output, 'r', encoding='utf-8')), 
-                          output_path="app/public/feed.atom",
-                          base_url="https://pr.tim.ad")
+        build_website(args.analysis_folder, args.output, args.manifest, args.search_index,
+                      feed_output=args.feed_output, feed_entries=args.feed_entries,
+                      repo_feeds=args.repo_feeds, author_feeds=args.author_feeds,
+                      repository=args.repository, compact=args.compact)
+        get_shared_metrics().write(args.metrics_output, args.prometheus_output)
     
     except FileNotFoundError as e:
         print(f"Error: {e}")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Batched GitHub GraphQL fetch of PR metadata and commits
+Results are converted to the REST API shape so existing consumers work unchanged
+"""
+
+import os
+from typing import Dict, Any, List, Optional, Tuple
+
+import requests
+
+from http_cache import CachedSession, get_shared_session
+
+
+GITHUB_GRAPHQL_URL = os.getenv("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+
+PR_FIELDS = """
+    number
+    title
+    body
+    state
+    createdAt
+    mergedAt
+    updatedAt
+    additions
+    deletions
+    changedFiles
+    files(first: 100) { nodes { path additions deletions } }
+    author { login }
+    commits(first: 100) {
+      nodes {
+        commit {
+          oid
+          message
+          author { name }
+          parents(first: 2) { nodes { oid } }
+        }
+      }
+    }
+"""
+
+
+def build_batch_query(pr_numbers: List[int]) -> str:
+    """
+    Build one GraphQL query that fetches several PRs using aliases
+
+    Args:
+        pr_numbers: Pull Request numbers to include
+
+    Returns:
+        GraphQL query string
+    """
+    aliases = '\n'.join(
+        f"  pr{number}: pullRequest(number: {int(number)}) {{{PR_FIELDS}  }}"
+        for number in pr_numbers
+    )
+    return f"""query($owner: String!, $repo: String!) {{
+  repository(owner: $owner, name: $repo) {{
+{aliases}
+  }}
+}}"""
+
+
+def to_rest_shape(node: Dict[str, Any]) -> Tuple[Dict[str, Any], list]:
+    """
+    Convert a GraphQL pullRequest node to REST-style PR and commit dicts
+
+    Args:
+        node: pullRequest node from the GraphQL response
+
+    Returns:
+        PR data and commits data as returned by the REST API
+    """
+    pr_data = {
+        "number": node.get("number"),
+        "title": node.get("title"),
+        "body": node.get("body"),
+        "state": "open" if node.get("state") == "OPEN" else "closed",
+        "created_at": node.get("createdAt"),
+        "merged_at": node.get("mergedAt"),
+        "updated_at": node.get("updatedAt"),
+        "additions": node.get("additions"),
+        "deletions": node.get("deletions"),
+        "changed_files": node.get("changedFiles"),
+        "files": [
+            {"filename": file.get("path"), "additions": file.get("additions"), "deletions": file.get("deletions")}
+            for file in (node.get("files") or {}).get("nodes", [])
+        ],
+        "user": {"login": (node.get("author") or {}).get("login", "ghost")},
+    }
+
+    commits_data = []
+    for commit_node in (node.get("commits") or {}).get("nodes", []):
+        commit = commit_node.get("commit", {})
+        commits_data.append({
+            "sha": commit.get("oid", "Unknown"),
+            "parents": [{"sha": parent.get("oid")} for parent in (commit.get("parents") or {}).get("nodes", [])],
+            "commit": {
+                "message": commit.get("message", ""),
+                "author": {"name": (commit.get("author") or {}).get("name", "Unknown")},
+            },
+        })
+
+    return pr_data, commits_data
+
+
+def fetch_prs_graphql(owner: str, repo: str, pr_numbers: List[int], token: str,
+                      batch_size: int = 50, session: Optional[CachedSession] = None) -> Dict[int, Tuple[Dict[str, Any], list]]:
+    """
+    Fetch metadata and commits for many PRs with one GraphQL query per batch
+
+    PRs missing from the response (errors, not found) are left out so the caller
+    can fall back to the REST API for them.
+
+    Args:
+        owner: Repository owner
+        repo: Repository name
+        pr_numbers: Pull Request numbers to fetch
+        token: GitHub token (GraphQL requires authentication)
+        batch_size: Number of PRs per query
+        session: HTTP session to use (defaults to the shared pooled session)
+
+    Returns:
+        Mapping of PR number to (pr_data, commits_data)
+    """
+    session = session or get_shared_session()
+    headers = {
+        "Authorization": f"bearer {token}",
+        "User-Agent": "PR-Analyzer",
+    }
+
+    results = {}
+    for start in range(0, len(pr_numbers), batch_size):
+        batch = pr_numbers[start:start + batch_size]
+        try:
+            response = session.post(
+                GITHUB_GRAPHQL_URL,
+                headers=headers,
+                json={"query": build_batch_query(batch), "variables": {"owner": owner, "repo": repo}},
+                timeout=60,
+            )
+            response.raise_for_status()
+            payload = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error fetching PRs via GraphQL: {e}")
+            continue
+
+        for error in payload.get("errors") or []:
+            print(f"GraphQL error: {error.get('message')}")
+
+        repository = (payload.get("data") or {}).get("repository") or {}
+        for number in batch:
+            node = repository.get(f"pr{number}")
+            if node:
+                results[number] = to_rest_shape(node)
+
+    return results
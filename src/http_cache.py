@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP session with keep-alive pooling and an on-disk conditional-request cache
+Repeat GET requests send If-None-Match / If-Modified-Since and reuse the stored body on a 304
+"""
+
+import os
+import sys
+import json
+import hashlib
+import threading
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from rate_limit import RequestGovernor, get_shared_governor
+
+
+DEFAULT_CACHE_DIR = os.getenv("PR_SUMMARY_HTTP_CACHE", ".cache/http")
+
+
+class CachedSession:
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR, pool_size: int = 16,
+                 governor: Optional[RequestGovernor] = None):
+        """
+        Initialize a pooled session with an optional on-disk ETag cache
+
+        Args:
+            cache_dir: Folder for cached responses, or None to disable caching
+            pool_size: Number of keep-alive connections kept per host
+            governor: Rate limit governor (defaults to the shared governor)
+        """
+        self.governor = governor or get_shared_governor()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _cache_key(self, url: str, params: Optional[Dict[str, Any]], headers: Dict[str, str]) -> str:
+        """
+        Build a cache key from everything that changes the response body
+
+        The Authorization header is left out: GitHub Actions tokens change on
+        every job, which would make entries restored from a previous run miss.
+        Cached bodies are still revalidated with the current token.
+        """
+        key_data = json.dumps({
+            "method": "GET",
+            "url": url,
+            "params": sorted((str(k), str(v)) for k, v in (params or {}).items()),
+            "accept": headers.get("Accept", ""),
+        })
+        return hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+
+    def _load_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Load a cached response entry from disk"""
+        try:
+            with open(self.cache_dir / f"{key}.json", 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def _store_entry(self, key: str, response: requests.Response):
+        """Store a response atomically so concurrent workers never see partial files"""
+        entry = {
+            "url": response.url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "headers": dict(response.headers),
+            "encoding": response.encoding,
+            "body": response.content.decode("utf-8", errors="surrogateescape"),
+        }
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8', errors='surrogateescape') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self.cache_dir / f"{key}.json")
+        except IOError as e:
+            print(f"Error writing HTTP cache entry: {e}", file=sys.stderr)
+
+    def _response_from_entry(self, entry: Dict[str, Any]) -> requests.Response:
+        """Rebuild a 200 response from a cached entry"""
+        response = requests.Response()
+        response.status_code = 200
+        response.url = entry["url"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = entry.get("encoding")
+        response._content = entry["body"].encode("utf-8", errors="surrogateescape")
+        response.from_cache = True
+        return response
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+            params: Optional[Dict[str, Any]] = None, **kwargs) -> requests.Response:
+        """
+        Send a GET request, revalidating any cached copy with the server
+
+        Args:
+            url: Request URL
+            headers: Request headers
+            params: Query string parameters
+
+        Returns:
+            The response; a 304 is transparently replaced by the cached 200 body.
+            Streamed requests (stream=True) bypass the cache, as storing them would read the whole body.
+        """
+        headers = dict(headers or {})
+        if not self.cache_dir or kwargs.get("stream"):
+            return self.governor.request(url, lambda: self.session.get(url, headers=headers, params=params, **kwargs))
+
+        key = self._cache_key(url, params, headers)
+        entry = self._load_entry(key)
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self.governor.request(url, lambda: self.session.get(url, headers=headers, params=params, **kwargs))
+
+        if response.status_code == 304 and entry:
+            with self._lock:
+                self.hits += 1
+            return self._response_from_entry(entry)
+
+        with self._lock:
+            self.misses += 1
+        if response.ok and (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+            self._store_entry(key, response)
+        response.from_cache = False
+        return response
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Send an uncached POST request over the pooled connections, not resent once it reached the server"""
+        return self.governor.request(url, lambda: self.session.post(url, **kwargs), idempotent=False)
+
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def get_shared_session() -> CachedSession:
+    """Return the process-wide session so all callers reuse the same connection pool"""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = CachedSession()
+        return _shared_session
@@ -1,19 +1,36 @@
 import os
+import json
 import argparse
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional, Set
 import requests
 from pathlib import Path
 
-def get_pull_requests(owner: str, repo: str, token: str, days: int) -> List[Dict]:
+from http_cache import get_shared_session
+from analysis_store import open_store
+from metrics import get_shared_metrics
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
+def parse_github_date(value: str) -> datetime:
+    """Parse a GitHub API timestamp such as 2025-09-03T03:35:55Z"""
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+
+
+def get_pull_requests(owner: str, repo: str, token: str, days: int, since: Optional[datetime] = None) -> List[Dict]:
     """
-    Fetch merged pull requests from GitHub repository within the specified number of days.
+    Fetch merged pull requests from GitHub repository updated since a watermark.
+    
+    PRs are listed by last update, so paging stops at the first PR older than
+    the watermark (or the --days cutoff). In the steady state this is a
+    single page.
     
     Args:
         owner: Repository owner
         repo: Repository name
         token: GitHub personal access token
         days: Number of days to look back
+        since: Watermark from the previous run; only PRs updated at or after it are returned
         
     Returns:
         List of pull request dictionaries
@@ -23,81 +40,170 @@ def get_pull_requests(owner: str, repo: str, token: str, days: int) -> List[Dict
         "Accept": "application/vnd.github.v3+json"
     }
     
-    since_date = datetime.now() - timedelta(days=days)
+    cutoff = datetime.now() - timedelta(days=days)
+    if since and since > cutoff:
+        cutoff = since
     
     all_prs = []
     page = 1
     per_page = 100
     
     while True:
-        url = f"https://api.github.com/repos/{owner}/{repo}/pulls"
+        url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/pulls"
         params = {
             "state": "closed",  # Changed from "all" to "closed" since merged PRs are closed
-            "sort": "created",
+            "sort": "updated",  # Merging updates a PR, so recently merged PRs come first
             "direction": "desc",
             "page": page,
             "per_page": per_page
         }
         
-        response = requests.get(url, headers=headers, params=params)
+        response = get_shared_session().get(url, headers=headers, params=params)
         response.raise_for_status()
+        get_shared_metrics().add("github_bytes", len(response.content))
         
         prs = response.json()
         if not prs:
             break
             
         for pr in prs:
+            if parse_github_date(pr["updated_at"]) < cutoff:
+                return all_prs
+            
             # Only include merged PRs
             if pr.get("merged_at") is None:
                 continue
-                
-            created_at = datetime.strptime(pr["created_at"], "%Y-%m-%dT%H:%M:%SZ")
-            if created_at < since_date:
-                return all_prs
             all_prs.append(pr)
         
+        if len(prs) < per_page:
+            break
         page += 1
     
     return all_prs
 
 
-def check_summary_exists(owner: str, repo: str, pr_number: int, data_folder: str = "data/analysis") -> bool:
+def load_existing_summaries(owner: str, repo: str, data_folder: str = "data/analysis") -> Set[int]:
     """
-    Check if a summary file exists for the given PR number.
+    Load the PR numbers that already have a summary with one directory scan.
     
     Args:
-        pr_number: Pull request number
+        owner: Repository owner
+        repo: Repository name
         data_folder: Path to the analysis folder
         
     Returns:
-        True if summary file exists, False otherwise
+        Set of PR numbers with a summary file
     """
-    summary_path = Path(data_folder) / f"{owner}/{repo}/{pr_number}.json"
-    return summary_path.exists()
+    summary_dir = Path(data_folder) / owner / repo
+    if not summary_dir.is_dir():
+        return set()
+    
+    numbers = set()
+    with os.scandir(summary_dir) as it:
+        for entry in it:
+            stem, ext = os.path.splitext(entry.name)
+            if ext == ".json" and stem.isdigit():
+                numbers.add(int(stem))
+    return numbers
 
 
-def list_prs_without_summaries(owner: str, repo: str, token: str, days: int) -> List[Dict]:
+def slim_pr(pr: Dict) -> Dict:
+    """Keep only the PR fields needed by generate_summary.py"""
+    return {
+        "number": pr["number"],
+        "title": pr.get("title"),
+        "body": pr.get("body"),
+        "state": pr.get("state"),
+        "created_at": pr.get("created_at"),
+        "merged_at": pr.get("merged_at"),
+        "updated_at": pr.get("updated_at"),
+        "user": {"login": (pr.get("user") or {}).get("login")},
+    }
+
+
+def load_state(state_file: str) -> Dict:
+    """
+    Load the discovery state: watermark and PRs listed but not yet summarized.
+    
+    Args:
+        state_file: Path to the state JSON file
+        
+    Returns:
+        State dictionary (empty if there is no previous run)
+    """
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def save_state(state_file: str, state: Dict):
+    """
+    Persist the discovery state for the next run.
+    
+    Args:
+        state_file: Path to the state JSON file
+        state: State dictionary
+    """
+    Path(state_file).parent.mkdir(parents=True, exist_ok=True)
+    with open(state_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+
+
+def list_prs_without_summaries(owner: str, repo: str, token: str, days: int,
+                               data_folder: str = "data/analysis", state_file: Optional[str] = None,
+                               store: Optional[str] = None) -> List[Dict]:
     """
     Get list of merged PRs without summary files.
     
+    With a state file, only PRs updated since the previous run's watermark are
+    fetched. PRs listed earlier that still have no summary (e.g. a failed
+    generation) are kept as pending and listed again.
+    
     Args:
         owner: Repository owner
         repo: Repository name
         token: GitHub personal access token
         days: Number of days to look back
+        data_folder: Path to the analysis folder
+        state_file: Path to the discovery state file, or None to always scan the full window
+        store: Analysis store location (e.g. data/analysis.sqlite) to check instead of the data folder
         
     Returns:
         List of PR dictionaries without summaries
     """
-    prs = get_pull_requests(owner, repo, token, days)
-    prs_without_summaries = []
+    metrics = get_shared_metrics()
+    state = load_state(state_file) if state_file else {}
+    since = parse_github_date(state["watermark"]) if state.get("watermark") else None
+    
+    with metrics.timer("discover_fetch"):
+        prs = get_pull_requests(owner, repo, token, days, since)
+    with metrics.timer("discover_existing"):
+        if store:
+            existing = open_store(store, f"{owner}/{repo}").numbers()
+        else:
+            existing = load_existing_summaries(owner, repo, data_folder)
     
+    # Give up on pending PRs once they fall out of the --days window
+    cutoff = datetime.now() - timedelta(days=days)
+    prs_without_summaries = {}
+    for pr in state.get("pending", []):
+        if pr["number"] not in existing and parse_github_date(pr["updated_at"]) >= cutoff:
+            prs_without_summaries[pr["number"]] = pr
     for pr in prs:
-        pr_number = pr["number"]
-        if not check_summary_exists(owner, repo, pr_number):
-            prs_without_summaries.append(pr_number)
+        if pr["number"] not in existing:
+            prs_without_summaries[pr["number"]] = pr
     
-    return prs_without_summaries
+    if state_file:
+        watermark = max((pr["updated_at"] for pr in prs), default=state.get("watermark"))
+        save_state(state_file, {
+            "watermark": watermark,
+            "pending": [slim_pr(pr) for pr in prs_without_summaries.values()],
+        })
+    
+    metrics.add("prs_listed", len(prs_without_summaries))
+    return sorted(prs_without_summaries.values(), key=lambda pr: pr["number"], reverse=True)
 
 
 def main():
@@ -107,6 +213,11 @@ def main():
     parser.add_argument("--token", required=True, help="GitHub personal access token")
     parser.add_argument("--days", type=int, default=7, help="Number of days to look back (default: 7)")
     parser.add_argument("--data-folder", default="data/analysis", help="Path to analysis folder")
+    parser.add_argument("--store", help="Analysis store (e.g. data/analysis.sqlite) to check instead of --data-folder")
+    parser.add_argument("--state-file", help="Discovery state (watermark and pending PRs) for incremental runs")
+    parser.add_argument("--listing-output", help="Also write the listed PRs' metadata as JSON for generate_summary.py --listing-file")
+    parser.add_argument("--metrics-output", help="Write the run's stage timings and counters as JSON")
+    parser.add_argument("--prometheus-output", help="Also write the run metrics as a Prometheus text file")
     
     args = parser.parse_args()
     
@@ -115,10 +226,16 @@ def main():
     
     try:
         prs_without_summaries = list_prs_without_summaries(
-            args.owner, args.repo, args.token, args.days
+            args.owner, args.repo, args.token, args.days, args.data_folder, args.state_file,
+            args.store
         )
 
-        print('\n'.join(str(pr) for pr in prs_without_summaries))
+        if args.listing_output:
+            with open(args.listing_output, 'w', encoding='utf-8') as f:
+                json.dump(prs_without_summaries, f)
+
+        print('\n'.join(str(pr["number"]) for pr in prs_without_summaries))
+        get_shared_metrics().write(args.metrics_output, args.prometheus_output)
     
     except requests.exceptions.RequestException as e:
         print(f"Error fetching PRs: {e}")
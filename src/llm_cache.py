@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for LLM responses
+Entries are keyed by a hash of model, temperature and the normalized prompt and evicted least-recently-used
+"""
+
+import os
+import sys
+import json
+import hashlib
+import threading
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+
+DEFAULT_CACHE_DIR = os.getenv("PR_SUMMARY_LLM_CACHE", ".cache/llm")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a prompt so insignificant whitespace differences share a cache entry
+
+    Args:
+        prompt: Prompt text
+
+    Returns:
+        Prompt with unified line endings and trailing whitespace removed
+    """
+    lines = prompt.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip()
+
+
+def cache_key(model: str, temperature: float, prompt: str) -> str:
+    """
+    Build the content address of a request
+
+    Args:
+        model: Model name
+        temperature: Sampling temperature
+        prompt: Prompt text
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    key_data = json.dumps({
+        "model": model,
+        "temperature": temperature,
+        "prompt": normalize_prompt(prompt),
+    }, ensure_ascii=False)
+    return hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: Folder holding one file per cached response
+            max_bytes: Total size above which least recently used entries are evicted
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None
+        self._lock = threading.Lock()
+
+    def get(self, model: str, temperature: float, prompt: str) -> Optional[str]:
+        """
+        Look up a cached response
+
+        Args:
+            model: Model name
+            temperature: Sampling temperature
+            prompt: Prompt text
+
+        Returns:
+            Cached response content, or None on a miss
+        """
+        path = self.cache_dir / f"{cache_key(model, temperature, prompt)}.json"
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = json.load(f)["content"]
+            # Refresh the access time used for LRU eviction
+            os.utime(path)
+        except (IOError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return content
+
+    def put(self, model: str, temperature: float, prompt: str, content: str):
+        """
+        Store a response and evict old entries if the cache grew too large
+
+        Args:
+            model: Model name
+            temperature: Sampling temperature
+            prompt: Prompt text
+            content: Response content to cache
+        """
+        path = self.cache_dir / f"{cache_key(model, temperature, prompt)}.json"
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"model": model, "temperature": temperature, "content": content}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            size = path.stat().st_size
+        except (IOError, OSError) as e:
+            print(f"Error writing LLM cache entry: {e}", file=sys.stderr)
+            return
+
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += size
+            needs_eviction = self._total_bytes is None or self._total_bytes > self.max_bytes
+        if needs_eviction:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_bytes"""
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.cache_dir.glob('*.json'):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            if total <= self.max_bytes:
+                self._total_bytes = total
+                return
+
+            for _, size, path in sorted(entries):
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_bytes:
+                    break
+            self._total_bytes = total
+
+    def stats(self) -> str:
+        """Return a one-line hit/miss summary"""
+        lookups = self.hits + self.misses
+        rate = (self.hits / lookups * 100) if lookups else 0
+        return f"LLM cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)"
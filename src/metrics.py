@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Lightweight run instrumentation
+Stage timers and counters, attributed to the PR being processed, written as a JSON report
+per run and optionally as a Prometheus text file (node_exporter textfile collector format)
+"""
+
+import os
+import json
+import math
+import time
+import threading
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, List, Optional
+
+
+# PR number the current thread is working on; workers inherit it through propagate_context
+_current_pr = contextvars.ContextVar("current_pr", default=None)
+
+
+def propagate_context(fn: Callable) -> Callable:
+    """Wrap fn so that it runs in a copy of the caller's context (e.g. inside a thread pool)"""
+    context = contextvars.copy_context()
+
+    def wrapper(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return wrapper
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile, or None for no values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Metrics:
+    def __init__(self):
+        """Initialize an empty set of stage timings and counters"""
+        self.started = datetime.now(timezone.utc)
+        self.start_time = time.perf_counter()
+        self.timings = defaultdict(list)
+        self.counters = defaultdict(float)
+        self.prs = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def pr(self, pr_number: int):
+        """Attribute the timings and counters recorded inside the block to a PR"""
+        token = _current_pr.set(pr_number)
+        try:
+            yield
+        finally:
+            _current_pr.reset(token)
+
+    def observe(self, stage: str, seconds: float):
+        """Record one duration of a stage"""
+        pr_number = _current_pr.get()
+        with self._lock:
+            self.timings[stage].append(seconds)
+            if pr_number is not None:
+                self.prs[pr_number][f"{stage}_seconds"] += seconds
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Time the block as one occurrence of a stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def add(self, name: str, value: float = 1):
+        """Increase a counter (e.g. bytes fetched, tokens, cost)"""
+        pr_number = _current_pr.get()
+        with self._lock:
+            self.counters[name] += value
+            if pr_number is not None:
+                self.prs[pr_number][name] += value
+
+    def value(self, name: str) -> float:
+        """Current value of a counter"""
+        with self._lock:
+            return self.counters.get(name, 0)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Build the run report
+
+        Returns:
+            Dict with the run window, per-stage timing statistics, counters and per-PR totals
+        """
+        with self._lock:
+            stages = {}
+            for stage, values in self.timings.items():
+                stages[stage] = {
+                    "count": len(values),
+                    "total_seconds": sum(values),
+                    "mean_seconds": sum(values) / len(values),
+                    "p50_seconds": percentile(values, 0.5),
+                    "p95_seconds": percentile(values, 0.95),
+                    "max_seconds": max(values),
+                }
+            return {
+                "started": self.started.isoformat(),
+                "duration_seconds": time.perf_counter() - self.start_time,
+                "stages": stages,
+                "counters": dict(self.counters),
+                "prs": {str(number): dict(values) for number, values in sorted(self.prs.items())},
+            }
+
+    def write_json(self, path: str):
+        """Write the run report as JSON"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def write_prometheus(self, path: str, prefix: str = "pr_summary"):
+        """
+        Write stage timings and counters in the Prometheus text format
+
+        Per-PR values are left out to keep the label cardinality bounded.
+        The file is replaced atomically so a scraper never reads a partial file.
+        """
+        report = self.report()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per pipeline stage",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for stage, stats in sorted(report["stages"].items()):
+            for quantile, key in (("0.5", "p50_seconds"), ("0.95", "p95_seconds")):
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[key]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {stats["total_seconds"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        for name, value in sorted(report["counters"].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        lines.append(f"# TYPE {prefix}_run_duration_seconds gauge")
+        lines.append(f"{prefix}_run_duration_seconds {report['duration_seconds']}")
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+
+    def write(self, json_path: Optional[str] = None, prometheus_path: Optional[str] = None):
+        """Write whichever outputs are configured"""
+        if json_path:
+            self.write_json(json_path)
+        if prometheus_path:
+            self.write_prometheus(prometheus_path)
+
+
+_shared_metrics = None
+_shared_metrics_lock = threading.Lock()
+
+
+def get_shared_metrics() -> Metrics:
+    """Return the process-wide metrics so every stage reports into the same run"""
+    global _shared_metrics
+    with _shared_metrics_lock:
+        if _shared_metrics is None:
+            _shared_metrics = Metrics()
+        return _shared_metrics
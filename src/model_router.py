@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Size-based model routing and hedged requests
+Picks a model tier from the prompt size and, optionally, starts a backup model when the primary
+has not answered within a deadline; the first valid response wins and every outcome is logged
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from metrics import propagate_context
+
+
+DEFAULT_TIERS = [
+    # Small diffs (typo fixes, one-file changes) do not need a reasoning model
+    {"name": "small", "max_tokens": 4000, "model": "mistralai/mistral-small-3.2-24b-instruct:free"},
+    {"name": "large", "max_tokens": None, "model": "deepseek/deepseek-r1-0528:free"},
+]
+
+DEFAULT_HEDGE_MODEL = "meta-llama/llama-3.3-70b-instruct:free"
+
+
+class ModelRouter:
+    def __init__(self, tiers: Optional[List[Dict[str, Any]]] = None, hedge_after: Optional[float] = None,
+                 hedge_model: Optional[str] = None, log_file: Optional[str] = None):
+        """
+        Initialize the routing policy
+
+        Args:
+            tiers: Tiers ordered by size, each with "name", "model" and "max_tokens" (None for no limit)
+            hedge_after: Seconds after which a backup request is started, None to disable hedging
+            hedge_model: Model of the backup request
+            log_file: JSONL file receiving one line per routed request, for tuning
+        """
+        self.tiers = tiers or DEFAULT_TIERS
+        self.hedge_after = hedge_after
+        self.hedge_model = hedge_model or DEFAULT_HEDGE_MODEL
+        self.log_file = log_file
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, config_file: str, log_file: Optional[str] = None) -> "ModelRouter":
+        """
+        Load a routing policy
+
+        Example:
+            {
+              "tiers": [
+                {"name": "small", "max_tokens": 4000, "model": "mistralai/mistral-small-3.2-24b-instruct:free"},
+                {"name": "large", "model": "deepseek/deepseek-r1-0528:free"}
+              ],
+              "hedge": {"after_seconds": 30, "model": "meta-llama/llama-3.3-70b-instruct:free"}
+            }
+
+        Args:
+            config_file: Path to the JSON policy
+            log_file: JSONL file for routing outcomes
+
+        Returns:
+            The configured router
+        """
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        hedge = config.get("hedge") or {}
+        return cls(config.get("tiers"), hedge.get("after_seconds"), hedge.get("model"), log_file)
+
+    @property
+    def default_model(self) -> str:
+        """Model of the largest tier"""
+        return self.tiers[-1]["model"]
+
+    def route(self, prompt_tokens: int) -> Tuple[str, str]:
+        """
+        Pick the tier for a prompt
+
+        Args:
+            prompt_tokens: Estimated prompt size
+
+        Returns:
+            Tier name and model
+        """
+        for tier in self.tiers:
+            if tier.get("max_tokens") is None or prompt_tokens <= tier["max_tokens"]:
+                return tier["name"], tier["model"]
+        return self.tiers[-1]["name"], self.tiers[-1]["model"]
+
+    def backup_for(self, model: str) -> Optional[str]:
+        """Model to hedge a request with, or None if hedging does not apply"""
+        if self.hedge_after is None or self.hedge_model == model:
+            return None
+        return self.hedge_model
+
+    def record(self, outcome: Dict[str, Any]):
+        """Append a routing outcome to the log file"""
+        if not self.log_file:
+            return
+        line = json.dumps(dict(outcome, time=datetime.now().isoformat(timespec="seconds")))
+        with self._lock:
+            os.makedirs(os.path.dirname(self.log_file) or ".", exist_ok=True)
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+def run_hedged(primary: Callable[[threading.Event], Any], backup: Optional[Callable[[threading.Event], Any]],
+               hedge_after: Optional[float], valid: Callable[[Any], bool]) -> Tuple[Any, str, bool]:
+    """
+    Run a request and hedge it with a backup once it is slow or failed
+
+    Each callable receives an Event that is set when the other request won, so
+    it can stop streaming. The backup starts after hedge_after seconds, or
+    immediately when the primary fails or returns an invalid result.
+
+    Args:
+        primary: Primary request
+        backup: Backup request, or None for no hedging
+        hedge_after: Seconds to wait for the primary before starting the backup
+        valid: Check applied to a result before it may win
+
+    Returns:
+        The winning result, "primary" or "backup", and whether the backup was started
+
+    Raises:
+        The primary's exception if no request returned a result
+    """
+    results = queue.Queue()
+    cancels = {"primary": threading.Event(), "backup": threading.Event()}
+
+    def start(name: str, request: Callable[[threading.Event], Any]):
+        def run():
+            try:
+                results.put((name, request(cancels[name]), None))
+            except Exception as e:
+                results.put((name, None, e))
+        threading.Thread(target=propagate_context(run), daemon=True).start()
+
+    start("primary", primary)
+    started = 1
+    hedged = False
+    deadline = time.monotonic() + (hedge_after or 0)
+    invalid = {}
+    errors = {}
+
+    while True:
+        timeout = None if hedged or backup is None else max(0.0, deadline - time.monotonic())
+        try:
+            name, value, error = results.get(timeout=timeout)
+        except queue.Empty:
+            start("backup", backup)
+            started += 1
+            hedged = True
+            continue
+
+        if error is None and valid(value):
+            for other, cancel in cancels.items():
+                if other != name:
+                    cancel.set()
+            return value, name, hedged
+
+        if error is None:
+            invalid[name] = value
+        else:
+            errors[name] = error
+
+        if backup is not None and not hedged:
+            start("backup", backup)
+            started += 1
+            hedged = True
+            continue
+
+        if len(invalid) + len(errors) == started:
+            # Neither request produced a valid result; prefer returning an invalid result to the caller
+            for name in ("primary", "backup"):
+                if name in invalid:
+                    return invalid[name], name, hedged
+            raise errors.get("primary") or errors["backup"]
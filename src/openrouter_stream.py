@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Streaming (SSE) client for OpenRouter chat completions
+Enforces separate time-to-first-token and total-duration deadlines and records both latencies
+"""
+
+import json
+import time
+import threading
+from typing import Dict, Any, Optional
+
+import requests
+
+
+class StreamTimeout(Exception):
+    """Raised when a streamed completion misses its first-token or total deadline"""
+
+
+class StreamCancelled(Exception):
+    """Raised when a streamed completion is no longer needed (e.g. a hedged request won)"""
+
+
+def set_read_timeout(response: requests.Response, seconds: float):
+    """Change the socket timeout of the remaining reads of a streamed response, if its socket is reachable"""
+    sock = getattr(getattr(response.raw, "connection", None), "sock", None)
+    if sock is None:
+        return
+    try:
+        sock.settimeout(max(0.01, seconds))
+    except OSError:
+        pass
+
+
+def stream_chat_completion(session, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                           first_token_timeout: float = 60, total_timeout: float = 600,
+                           cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    Send a chat completion request with "stream": true and collect the response
+
+    OpenRouter sends ": OPENROUTER PROCESSING" comment lines while a request is
+    queued; they keep the connection alive but do not count as a first token.
+    Reasoning tokens do count, since they show the model is generating.
+
+    Args:
+        session: HTTP session used for the request
+        url: Chat completions endpoint
+        headers: Request headers
+        payload: Request body; "stream" is forced to true
+        first_token_timeout: Seconds allowed until the first generated token
+        total_timeout: Seconds allowed for the whole response
+        cancel: Event that aborts the stream when set, checked on every received line
+
+    Returns:
+        Dict with "content", "usage", "first_token_latency" and "total_latency"
+    """
+    payload = dict(payload, stream=True)
+    start = time.monotonic()
+    first_token_at = None
+    content_parts = []
+    usage = None
+
+    # The socket read timeout bounds how long a silent connection can block between deadline checks
+    read_timeout = min(first_token_timeout, total_timeout)
+    response = None
+
+    try:
+        response = session.post(url, headers=headers, json=payload, stream=True, timeout=(10, read_timeout))
+        if not response.ok:
+            # Read the error body before the connection is closed so callers can report it
+            response.content
+        response.raise_for_status()
+
+        def next_read_timeout() -> float:
+            # A silent socket must not block past the deadline that applies next
+            deadline = total_timeout if first_token_at is not None else min(first_token_timeout, total_timeout)
+            return min(read_timeout, deadline - (time.monotonic() - start))
+
+        set_read_timeout(response, next_read_timeout())
+        for raw_line in response.iter_lines(chunk_size=None, decode_unicode=True):
+            now = time.monotonic()
+            if cancel is not None and cancel.is_set():
+                raise StreamCancelled("Request cancelled")
+            if first_token_at is None and now - start > first_token_timeout:
+                raise StreamTimeout(f"No token within {first_token_timeout}s")
+            if now - start > total_timeout:
+                raise StreamTimeout(f"Response not complete within {total_timeout}s")
+            set_read_timeout(response, next_read_timeout())
+
+            if not raw_line or raw_line.startswith(':'):
+                continue
+            if not raw_line.startswith('data:'):
+                continue
+
+            data = raw_line[len('data:'):].strip()
+            if data == '[DONE]':
+                break
+
+            try:
+                event = json.loads(data)
+            except ValueError:
+                continue
+
+            if event.get("error"):
+                raise requests.exceptions.RequestException(f"Stream error: {event['error'].get('message', event['error'])}")
+
+            if event.get("usage"):
+                usage = event["usage"]
+
+            for choice in event.get("choices", []):
+                delta = choice.get("delta", {})
+                if first_token_at is None and (delta.get("content") or delta.get("reasoning")):
+                    first_token_at = now
+                if delta.get("content"):
+                    content_parts.append(delta["content"])
+
+    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+        # requests reports a read timeout during iteration as a ConnectionError
+        if not isinstance(e, requests.exceptions.Timeout) and "timed out" not in str(e).lower():
+            raise
+        if response is None:
+            raise StreamTimeout(f"No response within {read_timeout}s") from e
+        if first_token_at is None:
+            raise StreamTimeout(f"No token within {first_token_timeout}s") from e
+        if time.monotonic() - start >= total_timeout:
+            raise StreamTimeout(f"Response not complete within {total_timeout}s") from e
+        raise StreamTimeout(f"Stream stalled for {read_timeout}s") from e
+    finally:
+        if response is not None:
+            response.close()
+
+    end = time.monotonic()
+    return {
+        "content": ''.join(content_parts),
+        "usage": usage,
+        "first_token_latency": (first_token_at - start) if first_token_at is not None else None,
+        "total_latency": end - start,
+    }
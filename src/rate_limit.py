@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Rate-limit-aware request governor
+Paces requests with a token bucket per endpoint family, follows X-RateLimit-* and Retry-After
+headers and retries transient failures with jittered exponential backoff
+"""
+
+import sys
+import time
+import random
+import threading
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def connection_not_established(error: requests.exceptions.RequestException) -> bool:
+    """Whether a request failed before it reached the server, so resending it cannot duplicate it"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(error, requests.exceptions.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, rate: float):
+        """
+        Initialize a full bucket
+
+        Args:
+            capacity: Maximum burst size
+            rate: Tokens added per second
+        """
+        self.capacity = capacity
+        self.default_rate = rate
+        self.rate = rate
+        self.tokens = capacity
+        self.blocked_until = 0.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a token is available and take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def block_for(self, seconds: float):
+        """Refuse tokens for the given number of seconds (e.g. Retry-After)"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def observe_limit(self, remaining: int, limit: Optional[int], reset_in: float):
+        """
+        Adjust pacing to the server's view of the remaining quota
+
+        Below 10% of the quota, the remaining requests are spread evenly until
+        the reset; at zero, the bucket blocks until the reset.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + reset_in)
+                self.rate = self.default_rate
+            elif limit and remaining < limit * 0.1 and reset_in > 0:
+                self.rate = min(self.default_rate, remaining / reset_in)
+            else:
+                self.rate = self.default_rate
+
+
+class RequestGovernor:
+    def __init__(self, max_retries: int = 4, backoff_base: float = 1.0, backoff_cap: float = 60.0,
+                 max_wait: float = 300.0):
+        """
+        Initialize the governor with one bucket per endpoint family
+
+        Args:
+            max_retries: Retries for rate-limited and transient failures
+            backoff_base: First backoff ceiling in seconds
+            backoff_cap: Maximum backoff ceiling in seconds
+            max_wait: Longest server-requested wait worth retrying after; longer waits return the error
+        """
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.buckets = {
+            # 5000 requests/hour for authenticated REST calls
+            "github": TokenBucket(capacity=100, rate=5000 / 3600),
+            # GraphQL has a separate points budget; batched queries are few
+            "github-graphql": TokenBucket(capacity=20, rate=5000 / 3600),
+            # Free models are limited to 20 requests/minute
+            "openrouter": TokenBucket(capacity=20, rate=20 / 60),
+            "other": TokenBucket(capacity=50, rate=10),
+        }
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def _count_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def family(self, url: str) -> str:
+        """Map a request URL to its rate limit family"""
+        parsed = urlparse(url)
+        if "openrouter" in parsed.netloc or parsed.path.endswith("/chat/completions"):
+            return "openrouter"
+        if parsed.path.endswith("/graphql"):
+            return "github-graphql"
+        if "github" in parsed.netloc or parsed.path.startswith("/repos/"):
+            return "github"
+        return "other"
+
+    def _observe(self, bucket: TokenBucket, response: requests.Response):
+        """Feed rate limit headers back into the bucket"""
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is not None and reset is not None:
+            try:
+                limit = response.headers.get("X-RateLimit-Limit")
+                bucket.observe_limit(int(remaining), int(limit) if limit else None,
+                                     max(0.0, float(reset) - time.time()))
+            except ValueError:
+                pass
+
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response]) -> Optional[float]:
+        """
+        Decide whether and how long to wait before retrying
+
+        Returns:
+            Seconds to wait, or None if the response should not be retried
+        """
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            rate_limited = response.status_code in RETRY_STATUS_CODES or (
+                response.status_code == 403 and (retry_after or response.headers.get("X-RateLimit-Remaining") == "0")
+            )
+            if not rate_limited:
+                return None
+            if retry_after:
+                try:
+                    return float(retry_after)
+                except ValueError:
+                    pass
+            if response.headers.get("X-RateLimit-Remaining") == "0" and response.headers.get("X-RateLimit-Reset"):
+                try:
+                    return max(1.0, float(response.headers["X-RateLimit-Reset"]) - time.time())
+                except ValueError:
+                    pass
+
+        # Full jitter exponential backoff
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def request(self, url: str, send: Callable[[], requests.Response], idempotent: bool = True) -> requests.Response:
+        """
+        Send a request under the governor
+
+        Timeouts, dropped connections and 5xx responses are only retried for
+        idempotent requests; other requests (e.g. streamed LLM completions,
+        whose callers own their deadlines and retries) are only resent if they
+        never reached the server or were rejected with a 429.
+
+        Args:
+            url: Request URL, used to pick the endpoint family
+            send: Function performing the request
+            idempotent: Whether the request may be sent again after it reached the server
+
+        Returns:
+            The final response (possibly an error response after all retries)
+        """
+        bucket = self.buckets[self.family(url)]
+
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            try:
+                response = send()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.max_retries or not (idempotent or connection_not_established(e)):
+                    raise
+                delay = self._retry_delay(attempt, None)
+                print(f"Request to {url} failed, retrying in {delay:.1f}s", file=sys.stderr)
+                self._count_retry()
+                time.sleep(delay)
+                continue
+
+            self._observe(bucket, response)
+            delay = self._retry_delay(attempt, response)
+            if delay is None or delay > self.max_wait or attempt == self.max_retries:
+                return response
+            # A 5xx may come after the server acted on the request; only a 429 certainly did not
+            if not idempotent and response.status_code != 429:
+                return response
+
+            print(f"Request to {url} returned {response.status_code}, retrying in {delay:.1f}s", file=sys.stderr)
+            self._count_retry()
+            response.close()
+            bucket.block_for(delay)
+
+        return response
+
+
+_shared_governor = None
+_shared_governor_lock = threading.Lock()
+
+
+def get_shared_governor() -> RequestGovernor:
+    """Return the process-wide governor so all sessions pace against the same quotas"""
+    global _shared_governor
+    with _shared_governor_lock:
+        if _shared_governor is None:
+            _shared_governor = RequestGovernor()
+        return _shared_governor
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Run planning and budget caps
+Estimates the prompt tokens and time of every PR from its line counts before anything is sent
+to the model, orders the queue so the most PRs fit the budget, and defers the PRs that do not fit
+to the next run instead of letting one huge PR use up the quota
+"""
+
+import time
+import heapq
+import threading
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from diff_chunker import CHARS_PER_TOKEN
+from diff_filter import BYTES_PER_CHANGED_LINE, FILE_HEADER_BYTES, classify_path
+from metrics import Metrics
+
+
+# Instructions and commit messages around each diff
+PROMPT_OVERHEAD_TOKENS = 400
+COMPLETION_TOKENS = 250
+
+# Latency model of one request: a fixed delay plus prompt processing
+REQUEST_SECONDS = 10.0
+PROMPT_TOKENS_PER_SECOND = 2000.0
+
+
+def estimate_pr(pr_data: Dict[str, Any], diff_budget: int, chunk_tokens: int) -> Dict[str, Any]:
+    """
+    Estimate the model usage of a PR from its metadata
+
+    With the complete file list (GraphQL prefetch), lockfiles, generated,
+    binary and vendored files are left out like in the prompt; otherwise the
+    PR's line counts include them and the estimate is an upper bound. Only
+    changed lines are counted, about what is left after diff compaction.
+
+    Args:
+        pr_data: PR metadata with additions, deletions and changed_files, and optionally files
+        diff_budget: Bytes of file diffs downloaded per PR, 0 for no limit
+        chunk_tokens: Diff token budget per prompt
+
+    Returns:
+        Dict with number, changed_lines, calls, prompt_tokens, completion_tokens, tokens and seconds
+    """
+    additions = pr_data.get("additions")
+    deletions = pr_data.get("deletions")
+    changed_files = pr_data.get("changed_files") or 1
+    files = pr_data.get("files")
+    if files and len(files) == pr_data.get("changed_files"):
+        kept = [file for file in files if classify_path(file.get("filename") or "") is None]
+        additions = sum(file.get("additions") or 0 for file in kept)
+        deletions = sum(file.get("deletions") or 0 for file in kept)
+        changed_files = len(kept)
+    if additions is None or deletions is None:
+        # Unknown size: assume a full prompt
+        diff_tokens = chunk_tokens
+        changed_lines = None
+    else:
+        changed_lines = additions + deletions
+        diff_bytes = changed_lines * BYTES_PER_CHANGED_LINE + changed_files * FILE_HEADER_BYTES
+        if diff_budget:
+            diff_bytes = min(diff_bytes, diff_budget)
+        diff_tokens = (diff_bytes + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    # Diffs over the chunk budget take one call per chunk plus a merge call
+    chunks = max(1, -(-diff_tokens // chunk_tokens))
+    calls = 1 if chunks == 1 else chunks + 1
+    prompt_tokens = diff_tokens + PROMPT_OVERHEAD_TOKENS * calls + (COMPLETION_TOKENS * chunks if chunks > 1 else 0)
+    completion_tokens = COMPLETION_TOKENS * calls
+    # Chunks are summarized in parallel, the merge waits for them
+    seconds = REQUEST_SECONDS * (1 if chunks == 1 else 2) + prompt_tokens / PROMPT_TOKENS_PER_SECOND
+
+    return {
+        "number": pr_data.get("number"),
+        "changed_lines": changed_lines,
+        "calls": calls,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "tokens": prompt_tokens + completion_tokens,
+        "seconds": round(seconds, 1),
+    }
+
+
+def plan_run(estimates: List[Dict[str, Any]], max_tokens: Optional[int] = None,
+             max_seconds: Optional[float] = None, concurrency: int = 1) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Choose and order the PRs of a run within the budget
+
+    Cheapest PRs go first, which maximizes the number of PRs completed for a
+    given budget. Wall-clock time is simulated by assigning each PR to the
+    worker that becomes free first.
+
+    Args:
+        estimates: Per-PR estimates from estimate_pr
+        max_tokens: Token cap of the run, None for no cap
+        max_seconds: Wall-clock cap of the run, None for no cap
+        concurrency: Number of PRs processed at the same time
+
+    Returns:
+        PRs to process in order, and PRs deferred to the next run
+    """
+    planned, deferred = [], []
+    tokens = 0
+    workers = [0.0] * max(1, concurrency)
+    for estimate in sorted(estimates, key=lambda estimate: (estimate["tokens"], estimate["number"])):
+        if max_tokens is not None and tokens + estimate["tokens"] > max_tokens:
+            deferred.append(estimate)
+            continue
+        finish = workers[0] + estimate["seconds"]
+        if max_seconds is not None and finish > max_seconds:
+            deferred.append(estimate)
+            continue
+        heapq.heapreplace(workers, finish)
+        tokens += estimate["tokens"]
+        planned.append(estimate)
+    return planned, deferred
+
+
+def print_plan(planned: List[Dict[str, Any]], deferred: List[Dict[str, Any]], concurrency: int = 1):
+    """Print the planned and deferred PRs with their estimates"""
+    print(f"{'PR':>8} {'lines':>8} {'calls':>5} {'tokens':>9} {'seconds':>8}")
+    for status, estimates in (("", planned), (" (deferred)", deferred)):
+        for estimate in estimates:
+            lines = "?" if estimate["changed_lines"] is None else estimate["changed_lines"]
+            print(f"{estimate['number']:>8} {lines:>8} {estimate['calls']:>5} {estimate['tokens']:>9} "
+                  f"{estimate['seconds']:>8}{status}")
+    tokens = sum(estimate["tokens"] for estimate in planned)
+    workers = [0.0] * max(1, concurrency)
+    for estimate in planned:
+        heapq.heapreplace(workers, workers[0] + estimate["seconds"])
+    seconds = max(workers)
+    print(f"Plan: {len(planned)} PRs, about {tokens} tokens and {seconds / 60:.1f} minutes "
+          f"with {concurrency} workers; {len(deferred)} deferred")
+
+
+class RunBudget:
+    def __init__(self, metrics: Metrics, max_tokens: Optional[int] = None, max_seconds: Optional[float] = None):
+        """
+        Enforce the run caps while PRs are processed
+
+        Tokens already reported by the metrics plus the estimates of the PRs
+        in flight must stay within max_tokens; a PR is only started if its
+        estimated time still fits before max_seconds.
+
+        Args:
+            metrics: Run metrics receiving the prompt_tokens and completion_tokens counters
+            max_tokens: Token cap of the run, None for no cap
+            max_seconds: Wall-clock cap of the run, None for no cap
+        """
+        self.metrics = metrics
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.start = time.monotonic()
+        self.reserved = {}
+        self.deferred = []
+        self._lock = threading.Lock()
+
+    def remaining_seconds(self) -> Optional[float]:
+        """Seconds left before the time cap, None for no cap"""
+        if self.max_seconds is None:
+            return None
+        return max(0.0, self.max_seconds - (time.monotonic() - self.start))
+
+    def defer(self, numbers: Iterable[int]):
+        """Defer PRs to the next run"""
+        with self._lock:
+            self.deferred.extend(numbers)
+
+    def admit(self, estimate: Dict[str, Any]) -> bool:
+        """
+        Reserve the budget of a PR before it starts
+
+        Returns:
+            True if the PR may start, False if it was deferred
+        """
+        with self._lock:
+            used = self.metrics.value("prompt_tokens") + self.metrics.value("completion_tokens")
+            over_tokens = (self.max_tokens is not None
+                           and used + sum(self.reserved.values()) + estimate["tokens"] > self.max_tokens)
+            over_time = (self.max_seconds is not None
+                         and time.monotonic() - self.start + estimate["seconds"] > self.max_seconds)
+            if over_tokens or over_time:
+                self.deferred.append(estimate["number"])
+                return False
+            self.reserved[estimate["number"]] = estimate["tokens"]
+            return True
+
+    def admit_overdue(self, estimate: Dict[str, Any]) -> bool:
+        """
+        Start a deferred PR once the planned PRs are done, as long as the caps were not reached
+
+        Estimates are upper bounds, so without this a PR estimated over the
+        budget would be deferred on every run and never finish.
+
+        Returns:
+            True if the PR may start
+        """
+        with self._lock:
+            used = self.metrics.value("prompt_tokens") + self.metrics.value("completion_tokens")
+            if self.max_tokens is not None and used >= self.max_tokens:
+                return False
+            if self.max_seconds is not None and time.monotonic() - self.start >= self.max_seconds:
+                return False
+            if estimate["number"] in self.deferred:
+                self.deferred.remove(estimate["number"])
+            self.reserved[estimate["number"]] = estimate["tokens"]
+            return True
+
+    def release(self, number: int):
+        """Drop the reservation of a finished PR; its actual usage is in the metrics"""
+        with self._lock:
+            self.reserved.pop(number, None)
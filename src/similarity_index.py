@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate diff index
+MinHash signatures of the normalized changed lines of every summarized PR, bucketed with
+locality-sensitive hashing, so PRs repeating an earlier change (sync merges, cherry-picks,
+reverts) reuse its summary instead of calling the model
+"""
+
+import os
+import re
+import json
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+from diff_chunker import parse_diff
+from diff_filter import parse_stat_summary
+
+
+NUM_PERM = 64
+# 16 bands of 4 rows: PRs with a Jaccard similarity around 0.5 and above share a bucket with high probability
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 5
+# Below this many shingles from the kept diff, matches come from file names and sizes alone
+MIN_CONTENT_SHINGLES = 16
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def _permutations() -> List[Tuple[int, int]]:
+    """Fixed (a, b) pairs of the universal hash functions, identical in every process"""
+    permutations = []
+    for i in range(NUM_PERM):
+        digest = hashlib.sha256(f"minhash-{i}".encode("utf-8")).digest()
+        a = int.from_bytes(digest[:8], "little") % MERSENNE_PRIME or 1
+        b = int.from_bytes(digest[8:16], "little") % MERSENNE_PRIME
+        permutations.append((a, b))
+    return permutations
+
+
+PERMUTATIONS = _permutations()
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def shingle_sets(diff_content: str, flip: bool = False) -> Tuple[Set[int], Set[int]]:
+    """
+    Hash the normalized changes of a diff into shingles
+
+    Only added and removed lines count: context lines, hunk positions and
+    index headers differ between otherwise identical changes. Each content
+    shingle is a run of words of one changed line with its +/- sign and file
+    name; each file left out of the prompt adds one shingle of its name,
+    reason and line counts.
+
+    Args:
+        diff_content: Diff as returned by fetch_pr_diff
+        flip: Swap added and removed lines, to find the change a revert undoes
+
+    Returns:
+        Shingle hashes of the summarized files and of the kept diff's content
+    """
+    summarized, diff = parse_stat_summary(diff_content)
+    summary_shingles, shingles = set(), set()
+
+    for entry, reason in summarized:
+        additions, deletions = entry.get("additions", "?"), entry.get("deletions", "?")
+        if flip:
+            additions, deletions = deletions, additions
+        summary_shingles.add(_hash(f"{entry['filename']}:{reason}:+{additions}-{deletions}"))
+
+    def add(text: str):
+        shingles.add(_hash(text))
+
+    for file in parse_diff(diff):
+        if not file["path"]:
+            continue
+        name = os.path.basename(file["path"])
+        for hunk in file["hunks"]:
+            for line in hunk.splitlines()[1:]:
+                if not line.startswith(("+", "-")):
+                    continue
+                sign = line[0]
+                if flip:
+                    sign = "-" if sign == "+" else "+"
+                words = WORD_RE.findall(line[1:].lower())
+                if not words:
+                    continue
+                for start in range(max(1, len(words) - SHINGLE_WORDS + 1)):
+                    add(f"{name}{sign}{' '.join(words[start:start + SHINGLE_WORDS])}")
+    return summary_shingles, shingles
+
+
+def diff_shingles(diff_content: str, flip: bool = False) -> Set[int]:
+    """All shingles of a diff, see shingle_sets"""
+    summary_shingles, shingles = shingle_sets(diff_content, flip)
+    return summary_shingles | shingles
+
+
+def minhash(shingles: Set[int]) -> List[int]:
+    """MinHash signature of a shingle set"""
+    signature = []
+    for a, b in PERMUTATIONS:
+        signature.append(min(((a * shingle + b) % MERSENNE_PRIME) & MAX_HASH for shingle in shingles))
+    return signature
+
+
+def similarity(first: List[int], second: List[int]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(first, second) if x == y) / NUM_PERM
+
+
+def band_keys(signature: List[int]) -> List[Tuple[int, ...]]:
+    """LSH bucket keys of a signature, one per band"""
+    return [(band,) + tuple(signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+class SimilarityIndex:
+    def __init__(self, path: str):
+        """
+        Load the index from disk
+
+        Args:
+            path: JSON lines file with one {"number", "signature", "analysis", ...} record per line
+        """
+        self.path = Path(path)
+        self.entries = {}
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self._insert(record)
+                    except (ValueError, KeyError):
+                        # Ignore a partially written last line
+                        continue
+
+    def _insert(self, record: Dict[str, Any]):
+        number = record["number"]
+        if number in self.entries:
+            return
+        if len(record["signature"]) != NUM_PERM:
+            raise ValueError("Signature of a different size")
+        self.entries[number] = record
+        for key in band_keys(record["signature"]):
+            self.buckets.setdefault(key, []).append(number)
+
+    def __contains__(self, number: int) -> bool:
+        return number in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, number: int, diff_content: str, analysis: str, title: str = ""):
+        """
+        Add a summarized PR to the index and append it to the file
+
+        Args:
+            number: Pull Request number
+            diff_content: Diff the analysis was written from
+            analysis: The model's analysis ("### Summary / ### Title")
+            title: PR title, kept for readability
+        """
+        shingles = diff_shingles(diff_content)
+        if not shingles:
+            return
+        record = {
+            "number": number,
+            "title": title,
+            "signature": minhash(shingles),
+            "analysis": analysis,
+            "analysis_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with self._lock:
+            if number in self.entries:
+                return
+            self._insert(record)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def _best(self, signature: List[int], exclude: Optional[int]) -> Tuple[Optional[Dict[str, Any]], float]:
+        """Most similar indexed PR among the ones sharing a bucket with the signature"""
+        with self._lock:
+            candidates = set()
+            for key in band_keys(signature):
+                candidates.update(self.buckets.get(key, ()))
+            candidates.discard(exclude)
+            best, best_score = None, 0.0
+            for number in candidates:
+                score = similarity(signature, self.entries[number]["signature"])
+                if score > best_score:
+                    best, best_score = self.entries[number], score
+        return best, best_score
+
+    def query(self, diff_content: str, threshold: float, exclude: Optional[int] = None) -> Optional[Tuple[Dict[str, Any], float, bool]]:
+        """
+        Find an indexed PR whose diff is nearly identical, or that this diff reverts
+
+        Args:
+            diff_content: Diff of the new PR
+            threshold: Minimum estimated Jaccard similarity
+            exclude: PR number to leave out (the PR itself)
+
+        Returns:
+            The indexed record, its similarity and whether the new diff reverts it, or None
+        """
+        summary_shingles, content_shingles = shingle_sets(diff_content)
+        # Small or fully summarized diffs reach any threshold by chance
+        if len(content_shingles) < MIN_CONTENT_SHINGLES:
+            return None
+        best, score = self._best(minhash(summary_shingles | content_shingles), exclude)
+        if best is not None and score >= threshold:
+            return best, score, False
+        reverted, score = self._best(minhash(diff_shingles(diff_content, flip=True)), exclude)
+        if reverted is not None and score >= threshold:
+            return reverted, score, True
+        return None
+
+
+def adapt_analysis(record: Dict[str, Any], reverted: bool) -> str:
+    """
+    Reuse an indexed analysis for a near-duplicate PR
+
+    A duplicate (sync merge, cherry-pick) gets the analysis unchanged; a
+    revert gets a summary that points to the reverted PR and its changes.
+    """
+    if not reverted:
+        return record["analysis"]
+    bullets, title, section = [], "", None
+    for line in record["analysis"].split('\n'):
+        stripped = line.strip()
+        if stripped == "### Summary":
+            section = "summary"
+        elif stripped == "### Title":
+            section = "title"
+        elif section == "summary" and stripped.startswith(('- ', '* ', '• ')):
+            bullets.append(stripped[2:].strip())
+        elif section == "title" and stripped:
+            title = f"{title} {stripped}".strip()
+    title = title or record.get("title") or f"#{record['number']}"
+    lines = ["### Summary", f"- Reverts #{record['number']}: {title}"]
+    lines += [f"- Undoes: {bullet}" for bullet in bullets]
+    lines += ["", "### Title", f"Revert \"{title}\""]
+    return '\n'.join(lines)
+
+
+def build(index: SimilarityIndex, analysis_folder: str, repo_owner: str, repo_name: str, concurrency: int = 4) -> int:
+    """
+    Backfill the index from existing analyses, fetching each PR's diff from GitHub
+
+    Args:
+        index: Index to fill
+        analysis_folder: Folder with one <number>.json analysis per PR
+        repo_owner: GitHub repository owner
+        repo_name: GitHub repository name
+        concurrency: Number of diffs fetched in parallel
+
+    Returns:
+        Number of PRs added
+    """
+    # Imported here as generate_summary itself uses this module
+    from generate_summary import GitHubPRAnalyzer
+
+    analyzer = GitHubPRAnalyzer(openrouter_api_key="")
+    records = []
+    for entry in os.scandir(analysis_folder):
+        if not entry.name.endswith('.json'):
+            continue
+        try:
+            with open(entry.path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (IOError, ValueError) as e:
+            print(f"Skipping {entry.name}: {e}")
+            continue
+        # Rule-generated and reused analyses do not describe a diff of their own
+        if record.get("number") not in index and record.get("raw_analysis") and not record.get("generated_by"):
+            records.append(record)
+
+    def add(record: Dict[str, Any]) -> bool:
+        number = record["number"]
+        url = f"{analyzer.github_api_url}/repos/{repo_owner}/{repo_name}/pulls/{number}"
+        try:
+            diff_content = analyzer.fetch_filtered_diff(url, analyzer._github_headers(), files_url=f"{url}/files")
+        except Exception as e:
+            print(f"PR #{number}: {e}")
+            return False
+        index.add(number, diff_content, record["raw_analysis"], record.get("title", ""))
+        return True
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        return sum(executor.map(add, sorted(records, key=lambda record: record["number"])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the near-duplicate diff index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Add existing analyses to the index, fetching their diffs")
+    build_parser.add_argument("--repo", required=True, help="Repository in format owner/repo")
+    build_parser.add_argument("--analysis-folder", help="Analysis folder (default: data/analysis/<owner>/<repo>)")
+    build_parser.add_argument("--index", help="Index file (default: data/similarity/<owner>/<repo>.jsonl)")
+    build_parser.add_argument("--concurrency", type=int, default=4, help="Diffs fetched in parallel (default: 4)")
+
+    query_parser = subparsers.add_parser("query", help="Find the indexed PR most similar to a diff file")
+    query_parser.add_argument("--index", required=True, help="Index file")
+    query_parser.add_argument("--diff", required=True, help="Diff file")
+    query_parser.add_argument("--threshold", type=float, default=0.95, help="Minimum similarity (default: 0.95)")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        repo_owner, repo_name = args.repo.split('/', 1)
+        index = SimilarityIndex(args.index or f"data/similarity/{repo_owner}/{repo_name}.jsonl")
+        added = build(index, args.analysis_folder or f"data/analysis/{repo_owner}/{repo_name}",
+                      repo_owner, repo_name, args.concurrency)
+        print(f"Added {added} PRs, the index has {len(index)} PRs")
+    elif args.command == "query":
+        index = SimilarityIndex(args.index)
+        with open(args.diff, 'r', encoding='utf-8') as f:
+            match = index.query(f.read(), args.threshold)
+        if match is None:
+            print("No similar PR")
+        else:
+            record, score, reverted = match
+            print(f"{'Reverts' if reverted else 'Similar to'} #{record['number']} ({score:.2f}): {record.get('title', '')}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
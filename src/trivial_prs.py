@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Rule-based summaries for trivial PRs
+Recognizes PRs with nothing worth a model call (lockfile-only and bot dependency bumps, image
+asset additions, whitespace and typo fixes) from the diff and commits, and writes a templated
+analysis in the same "### Summary / ### Title" format the model answers with
+"""
+
+import re
+import difflib
+import posixpath
+from typing import Dict, Any, List, Optional, Tuple
+
+from diff_chunker import parse_diff
+from diff_filter import parse_stat_summary
+
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".ico", ".webp", ".bmp", ".tiff", ".svg"}
+
+DOC_EXTENSIONS = {".md", ".mdx", ".markdown", ".rst", ".txt", ".adoc"}
+
+MANIFESTS = {
+    "package.json", "requirements.txt", "pyproject.toml", "Pipfile", "setup.cfg", "Cargo.toml",
+    "go.mod", "Gemfile", "composer.json", "pom.xml", "build.gradle", "build.gradle.kts", "mix.exs",
+}
+
+# Whitespace changes in these files can change their meaning
+INDENT_SENSITIVE_EXTENSIONS = {".py", ".pyx", ".yml", ".yaml", ".haml", ".pug", ".sass", ".coffee", ".nim"}
+INDENT_SENSITIVE_FILES = {"Makefile", "GNUmakefile"}
+
+# GraphQL reports bot logins without the "[bot]" suffix used by the REST API
+KNOWN_BOTS = {"dependabot", "dependabot-preview", "renovate", "renovate-bot", "github-actions", "snyk-bot"}
+
+# A typo fix touches a handful of lines and a couple of words per line
+MAX_TYPO_LINES = 6
+MAX_TYPO_WORDS = 2
+# Edits allowed in a respelled word, by the length of the shorter spelling: none for
+# words up to 3 characters ("now" and "not"), one below 5 characters, two from then on
+WORD_EDIT_DISTANCES = ((3, 0), (4, 1))
+MAX_WORD_EDIT_DISTANCE = 2
+
+# A bot dependency bump only edits version strings in its manifests
+MAX_BUMP_MANIFEST_LINES = 20
+
+WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def is_bot(pr_data: Dict[str, Any]) -> bool:
+    """Check whether a PR was opened by a bot account"""
+    user = pr_data.get('user') or {}
+    login = user.get('login', '')
+    return user.get('type') == "Bot" or login.endswith("[bot]") or login in KNOWN_BOTS
+
+
+def changed_lines(hunks: List[str]) -> Tuple[List[str], List[str]]:
+    """Removed and added lines of a file's hunks, without their +/- markers"""
+    removed, added = [], []
+    for hunk in hunks:
+        for line in hunk.splitlines()[1:]:
+            if line.startswith("-"):
+                removed.append(line[1:])
+            elif line.startswith("+"):
+                added.append(line[1:])
+    return removed, added
+
+
+def normalize_whitespace(path: str, lines: List[str]) -> List[str]:
+    """
+    Strip the whitespace that cannot change the meaning of a file's lines
+
+    Blank lines and trailing whitespace never matter; other whitespace is only
+    ignored where indentation is not significant.
+    """
+    name = posixpath.basename(path)
+    significant = name in INDENT_SENSITIVE_FILES or posixpath.splitext(name)[1].lower() in INDENT_SENSITIVE_EXTENSIONS
+    normalized = (line.rstrip() if significant else ''.join(line.split()) for line in lines)
+    return [line for line in normalized if line]
+
+
+def hunk_line_pairs(hunk: str) -> Optional[List[Tuple[str, str]]]:
+    """
+    Pair each removed line of a hunk with the added line replacing it
+
+    Returns:
+        (removed, added) pairs, or None if a block of removals is not replaced line for line
+    """
+    pairs = []
+    removed, added = [], []
+    for line in hunk.splitlines()[1:] + [" "]:
+        if line.startswith("-"):
+            if added:
+                return None
+            removed.append(line[1:])
+        elif line.startswith("+"):
+            added.append(line[1:])
+        elif line.startswith("\\"):
+            continue
+        else:
+            if len(removed) != len(added):
+                return None
+            pairs.extend(zip(removed, added))
+            removed, added = [], []
+    return pairs
+
+
+def is_word(token: str) -> bool:
+    """Whether a WORD_RE token is a word rather than a punctuation mark"""
+    return bool(re.match(r"\w", token))
+
+
+def edit_distance(first: str, second: str) -> int:
+    """Levenshtein distance of two words"""
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current = [i]
+        for j, second_char in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (first_char != second_char)))
+        previous = current
+    return previous[-1]
+
+
+def allowed_edit_distance(length: int) -> int:
+    """Edits allowed in a respelled word of this length"""
+    for max_length, distance in WORD_EDIT_DISTANCES:
+        if length <= max_length:
+            return distance
+    return MAX_WORD_EDIT_DISTANCE
+
+
+def is_misspelling(old: str, new: str) -> bool:
+    """Check whether one word is a respelling of the other rather than a different word"""
+    old, new = old.lower(), new.lower()
+    if not (is_word(old) and is_word(new)):
+        # One punctuation mark for another
+        return not (is_word(old) or is_word(new))
+    if any(char.isdigit() for char in old + new):
+        return False
+    # An added or removed prefix or suffix ("able" and "unable", "http" and "https") changes the meaning
+    if old != new and (old.endswith(new) or new.endswith(old) or old.startswith(new) or new.startswith(old)):
+        return False
+    return edit_distance(old, new) <= allowed_edit_distance(min(len(old), len(new)))
+
+
+
+def is_typo_edit(before: str, after: str) -> bool:
+    """
+    Check whether two lines differ by at most a couple of misspelled words
+
+    Inserted or removed words ("must" and "must not") and changed numbers are
+    content changes; only punctuation may be added or removed.
+    """
+    before_words, after_words = WORD_RE.findall(before), WORD_RE.findall(after)
+    changed = 0
+    matcher = difflib.SequenceMatcher(None, before_words, after_words, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if tag == "replace":
+            if i2 - i1 != j2 - j1:
+                return False
+            if not all(is_misspelling(old, new) for old, new in zip(before_words[i1:i2], after_words[j1:j2])):
+                return False
+        elif any(is_word(word) for word in before_words[i1:i2] + after_words[j1:j2]):
+            return False
+        changed += max(i2 - i1, j2 - j1)
+    return 0 < changed <= MAX_TYPO_WORDS
+
+
+def describe(entry: Dict[str, Any]) -> str:
+    """Path of a summarized file with its line counts, if known"""
+    if "additions" in entry:
+        return f"`{entry['filename']}` (+{entry['additions']} -{entry['deletions']})"
+    return f"`{entry['filename']}`"
+
+
+def format_analysis(bullets: List[str], title: str) -> str:
+    """Build an analysis in the format produced by the model"""
+    lines = ["### Summary"] + [f"- {bullet}" for bullet in bullets] + ["", "### Title", title]
+    return '\n'.join(lines)
+
+
+def commit_bullets(commits_data: list, limit: int = 5) -> List[str]:
+    """First lines of the PR's commit messages, as summary bullets"""
+    messages = []
+    for commit in commits_data or []:
+        message = commit.get('commit', {}).get('message', '').split('\n')[0].strip()
+        if message and message not in messages:
+            messages.append(message)
+    bullets = [f"Commit: {message}" for message in messages[:limit]]
+    if len(messages) > limit:
+        bullets.append(f"{len(messages) - limit} more commits")
+    return bullets
+
+
+def plural(count: int, word: str) -> str:
+    """Count followed by the singular or plural form of a word"""
+    return f"{count} {word}" if count == 1 else f"{count} {word}s"
+
+
+def classify_trivial(diff_content: str, pr_data: Dict[str, Any], commits_data: list) -> Optional[Tuple[str, str]]:
+    """
+    Recognize a PR that can be summarized without the model
+
+    Args:
+        diff_content: Diff as returned by fetch_pr_diff (stat summaries followed by the kept diff)
+        pr_data: PR metadata from GitHub API
+        commits_data: List of commits in the PR
+
+    Returns:
+        The matching rule and its templated analysis, or None if the PR needs the model
+    """
+    summarized, diff = parse_stat_summary(diff_content)
+    files = [file for file in parse_diff(diff) if file["path"]]
+    if not summarized and not files:
+        return None
+    reasons = {reason for _, reason in summarized}
+    if reasons - {"lockfile", "binary"}:
+        # Generated, vendored or over budget files may hide a real change
+        return None
+
+    # Lockfile refreshes, and bot bumps that only touch version strings in manifests
+    if reasons == {"lockfile"} or (not summarized and files):
+        if not files:
+            lockfiles = ', '.join(describe(entry) for entry, _ in summarized)
+            bullets = [f"Regenerates the dependency lockfile {lockfiles} without other changes"]
+            title = pr_data.get('title') if is_bot(pr_data) else "Update dependency lockfile"
+            return "lockfile_only", format_analysis(bullets + commit_bullets(commits_data), title)
+        manifest_lines = sum(len(lines) for file in files for lines in changed_lines(file["hunks"]))
+        if (is_bot(pr_data) and all(posixpath.basename(file["path"]) in MANIFESTS for file in files)
+                and manifest_lines <= MAX_BUMP_MANIFEST_LINES):
+            paths = ', '.join(f"`{file['path']}`" for file in files)
+            bullets = [f"Updates dependency versions in {paths}"]
+            if summarized:
+                bullets.append("Regenerates " + ', '.join(describe(entry) for entry, _ in summarized))
+            title = pr_data.get('title') or "Bump dependencies"
+            return "dependency_bump", format_analysis(bullets + commit_bullets(commits_data), title)
+
+    # Image assets only
+    if reasons == {"binary"} and not files:
+        paths = [entry["filename"] for entry, _ in summarized]
+        if all(posixpath.splitext(path)[1].lower() in IMAGE_EXTENSIONS for path in paths):
+            added = all(entry.get("status") == "added" for entry, _ in summarized)
+            verb = "Adds" if added else "Updates"
+            bullets = [f"{verb} {plural(len(paths), 'image')}: " + ', '.join(f"`{path}`" for path in paths[:10])]
+            if len(paths) > 10:
+                bullets[-1] += f" and {len(paths) - 10} more"
+            title = f"{'Add' if added else 'Update'} {plural(len(paths), 'image asset')}"
+            return "image_assets", format_analysis(bullets + commit_bullets(commits_data), title)
+        return None
+
+    if summarized or not files:
+        return None
+
+    # Whitespace or formatting only: the same lines, in the same order, once whitespace is ignored
+    whitespace_only = True
+    for file in files:
+        removed, added = changed_lines(file["hunks"])
+        if not removed and not added:
+            whitespace_only = False
+            break
+        if normalize_whitespace(file["path"], removed) != normalize_whitespace(file["path"], added):
+            whitespace_only = False
+            break
+    if whitespace_only:
+        paths = ', '.join(f"`{file['path']}`" for file in files)
+        bullets = [f"Whitespace and formatting changes in {paths}, no content changes"]
+        return "whitespace_only", format_analysis(bullets, "Fix whitespace and formatting")
+
+    # Typo fixes in documentation
+    if not all(posixpath.splitext(file["path"])[1].lower() in DOC_EXTENSIONS for file in files):
+        return None
+    pairs = []
+    for file in files:
+        for hunk in file["hunks"]:
+            hunk_pairs = hunk_line_pairs(hunk)
+            if hunk_pairs is None:
+                return None
+            pairs.extend(hunk_pairs)
+    if not pairs or len(pairs) > MAX_TYPO_LINES or not all(is_typo_edit(before, after) for before, after in pairs):
+        return None
+    paths = ', '.join(f"`{file['path']}`" for file in files)
+    bullets = [f"Fixes spelling on {plural(len(pairs), 'line')} of {paths}, no content changes"]
+    return "typo_fix", format_analysis(bullets, "Fix typos in documentation")
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Webhook-driven summary service
+Accepts GitHub pull_request webhooks for merged PRs over HTTP, queues them in a durable work
+queue and summarizes them with a pool of workers, writing each analysis as soon as it is done
+"""
+
+import os
+import sys
+import hmac
+import json
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Tuple
+
+import requests
+
+from http_cache import get_shared_session
+from llm_cache import LLMCache
+from commit_store import CommitSummaryStore
+from similarity_index import SimilarityIndex
+from generate_summary import GitHubPRAnalyzer, process_pr
+from fleet import load_config, publish
+from work_queue import WorkQueue
+from metrics import get_shared_metrics
+
+
+# GitHub caps webhook payloads at 25 MB
+MAX_PAYLOAD_BYTES = 25 * 1024 * 1024
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """
+    Check the X-Hub-Signature-256 header of a delivery
+
+    Args:
+        secret: Webhook secret configured on GitHub
+        body: Raw request body
+        signature: Header value, "sha256=<hex digest>"
+
+    Returns:
+        True if the body was signed with the secret
+    """
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256="):])
+
+
+def parse_delivery(event: Optional[str], payload: Dict[str, Any]) -> Tuple[Optional[Tuple[str, int]], str]:
+    """
+    Extract the merged PR from a webhook delivery
+
+    Args:
+        event: X-GitHub-Event header
+        payload: Decoded JSON body
+
+    Returns:
+        ("owner/repo", number) for a merged PR, or None, and a short reason for the response
+    """
+    if event != "pull_request":
+        return None, f"ignored {event or 'unknown'} event"
+    pull_request = payload.get("pull_request") or {}
+    if payload.get("action") != "closed" or not (pull_request.get("merged") or pull_request.get("merged_at")):
+        return None, "ignored: PR was not merged"
+    repository = (payload.get("repository") or {}).get("full_name")
+    number = pull_request.get("number", payload.get("number"))
+    if not repository or not isinstance(number, int):
+        return None, "ignored: payload has no repository or PR number"
+    return (repository, number), "merged"
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """POST /webhook receives deliveries, GET /healthz reports the queue"""
+
+    protocol_version = "HTTP/1.1"
+    service: "WebhookService" = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, data: Dict[str, Any]):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self.send_json(200, {"status": "ok", "queue": self.service.queue.counts()})
+        else:
+            self.send_json(404, {"message": "Not Found"})
+
+    def do_POST(self):
+        if self.path != "/webhook":
+            self.send_json(404, {"message": "Not Found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_PAYLOAD_BYTES:
+            self.send_json(413, {"message": "Payload too large"})
+            return
+        body = self.rfile.read(length)
+
+        if self.service.secret and not verify_signature(self.service.secret, body,
+                                                         self.headers.get("X-Hub-Signature-256")):
+            self.send_json(401, {"message": "Invalid signature"})
+            return
+
+        event = self.headers.get("X-GitHub-Event")
+        if event == "ping":
+            self.send_json(200, {"status": "pong"})
+            return
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self.send_json(400, {"message": "Body is not valid JSON"})
+            return
+        if not isinstance(payload, dict):
+            self.send_json(400, {"message": "Body is not a JSON object"})
+            return
+
+        pr, reason = parse_delivery(event, payload)
+        if pr is None:
+            self.send_json(202, {"status": reason})
+            return
+        repository, number = pr
+        if repository not in self.service.repos:
+            self.send_json(202, {"status": f"ignored: {repository} is not configured"})
+            return
+
+        queued = self.service.queue.enqueue(repository, number, payload["pull_request"])
+        print(f"{repository} PR #{number} {'queued' if queued else 'already queued or summarized'}")
+        self.send_json(202, {"status": "queued" if queued else "duplicate", "repository": repository,
+                             "number": number})
+
+
+class WebhookService:
+    def __init__(self, config: Dict[str, Any], api_key: str, queue: WorkQueue, secret: Optional[str] = None,
+                 workers: Optional[int] = None, publish_website: bool = False):
+        """
+        Initialize the service for the repositories of a fleet configuration
+
+        Args:
+            config: Fleet configuration (repositories, data folder, per-commit and near-duplicate reuse)
+            api_key: OpenRouter API key
+            queue: Durable queue of PRs to summarize
+            secret: Webhook secret; deliveries without a valid signature are rejected when set
+            workers: Number of PRs summarized in parallel (default: the configuration's concurrency)
+            publish_website: Regenerate website data whenever the queue runs empty
+        """
+        self.config = config
+        self.queue = queue
+        self.secret = secret
+        self.workers = workers or config['concurrency']
+        self.publish_website = publish_website
+        self.metrics = get_shared_metrics()
+        self.repos = {f"{repo['owner']}/{repo['repo']}": repo for repo in config['repos']}
+        self._stop = threading.Event()
+        self._threads = []
+        self._publish_lock = threading.Lock()
+
+        session = get_shared_session()
+        llm_cache = LLMCache()
+        self.analyzers = {}
+        for name, repo in self.repos.items():
+            commit_store = None
+            if config['per_commit']:
+                commit_store = CommitSummaryStore(f"data/commit-summaries/{repo['owner']}/{repo['repo']}.jsonl")
+            similarity_index = None
+            if config['reuse_similar']:
+                similarity_index = SimilarityIndex(f"data/similarity/{repo['owner']}/{repo['repo']}.jsonl")
+            self.analyzers[name] = GitHubPRAnalyzer(api_key, session=session, llm_cache=llm_cache,
+                                                    commit_store=commit_store, metrics=self.metrics,
+                                                    similarity_index=similarity_index)
+
+    def handle(self, job: Dict[str, Any]):
+        """Summarize one claimed PR and record the outcome in the queue"""
+        repository, number = job["repository"], job["number"]
+        owner, repo_name = repository.split("/", 1)
+        output_dir = os.path.join(self.config['data_folder'], owner, repo_name)
+        output_file = os.path.join(output_dir, f"{number}.json")
+
+        if os.path.exists(output_file):
+            print(f"{repository} PR #{number} already has a summary")
+            self.queue.complete(repository, number)
+            return
+
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            # The webhook's pull_request object has the REST shape, so it replaces the metadata request
+            process_pr(self.analyzers[repository], owner, repo_name, number, output_file, (job["payload"], None))
+        except Exception as e:
+            retry = self.queue.fail(repository, number, str(e))
+            self.metrics.add("prs_failed")
+            print(f"{repository} PR #{number} failed (attempt {job['attempts'] + 1}): {e}"
+                  f"{'; will retry' if retry else '; giving up'}")
+            return
+
+        self.queue.complete(repository, number)
+        self.metrics.add("prs_succeeded")
+        print(f"{repository} PR #{number} summarized")
+        counts = self.queue.counts()
+        if self.publish_website and not counts.get("pending") and not counts.get("running"):
+            self.publish()
+
+    def publish(self):
+        """Regenerate website data, once at a time"""
+        if not self._publish_lock.acquire(blocking=False):
+            return
+        try:
+            publish(self.config)
+        finally:
+            self._publish_lock.release()
+
+    def work(self):
+        """Worker loop: claim and summarize PRs until the service stops"""
+        while not self._stop.is_set():
+            job = self.queue.claim(timeout=1.0)
+            if job is not None:
+                self.handle(job)
+
+    def start_workers(self):
+        """Start the worker pool in background threads"""
+        for index in range(max(1, self.workers)):
+            thread = threading.Thread(target=self.work, name=f"worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop claiming PRs and wait for the running ones to finish"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def make_server(self, host: str, port: int) -> ThreadingHTTPServer:
+        """Create the HTTP server receiving the deliveries"""
+        handler_class = type(WebhookHandler.__name__, (WebhookHandler,), {"service": self})
+        server = ThreadingHTTPServer((host, port), handler_class)
+        server.daemon_threads = True
+        return server
+
+
+def sample_payload(repository: str, number: int) -> Dict[str, Any]:
+    """
+    Build a pull_request "closed" delivery for a merged PR from the GitHub API
+
+    Args:
+        repository: "owner/repo"
+        number: Pull Request number
+
+    Returns:
+        Payload in the shape GitHub sends for the webhook
+    """
+    headers = {"Accept": "application/vnd.github.v3+json", "User-Agent": "PR-Analyzer"}
+    github_token = os.getenv("GITHUB_TOKEN")
+    if github_token:
+        headers["Authorization"] = f"token {github_token}"
+    github_api_url = os.getenv("GITHUB_API_URL", "https://api.github.com")
+    response = get_shared_session().get(f"{github_api_url}/repos/{repository}/pulls/{number}", headers=headers)
+    response.raise_for_status()
+    pull_request = response.json()
+    return {"action": "closed", "number": number, "pull_request": pull_request,
+            "repository": {"full_name": repository}}
+
+
+def send(url: str, payload: Dict[str, Any], secret: Optional[str] = None, event: str = "pull_request") -> requests.Response:
+    """Post a delivery to the service, signed like GitHub does when a secret is given"""
+    body = json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json", "X-GitHub-Event": event}
+    if secret:
+        headers["X-Hub-Signature-256"] = "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return requests.post(url, data=body, headers=headers, timeout=30)
+
+
+def main():
+    """Main function to run the service or send it a test delivery"""
+    parser = argparse.ArgumentParser(description="Summarize merged PRs as their webhooks arrive")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Receive webhooks and summarize the merged PRs")
+    serve_parser.add_argument("--config", default="fleet.json", help="Fleet configuration with the accepted repositories (default: fleet.json)")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    serve_parser.add_argument("--queue", default=".cache/webhook/queue.sqlite", help="Durable work queue database (default: .cache/webhook/queue.sqlite)")
+    serve_parser.add_argument("--workers", type=int, help="PRs summarized in parallel (default: the configuration's concurrency)")
+    serve_parser.add_argument("--max-attempts", type=int, default=3, help="Attempts per PR before it is marked as failed (default: 3)")
+    serve_parser.add_argument("--publish", action="store_true", help="Regenerate website data whenever the queue runs empty")
+    serve_parser.add_argument("--api-key", help="OpenRouter API key (or use OPENROUTER_API_KEY env var)")
+    serve_parser.add_argument("--secret", help="Webhook secret (or use WEBHOOK_SECRET env var); unsigned deliveries are rejected when set")
+    serve_parser.add_argument("--metrics-output", help="Write per-stage timings, token usage and cost as JSON on shutdown")
+    serve_parser.add_argument("--prometheus-output", help="Also write the metrics as a Prometheus text file on shutdown")
+
+    send_parser = subparsers.add_parser("send", help="Post a merged pull_request delivery to a running service")
+    send_parser.add_argument("--url", default="http://127.0.0.1:8080/webhook", help="Webhook URL (default: http://127.0.0.1:8080/webhook)")
+    send_parser.add_argument("--repo", help="Build the payload from this owner/repo's PR on GitHub")
+    send_parser.add_argument("--pr", type=int, help="PR number for --repo")
+    send_parser.add_argument("--payload", help="Post this saved delivery body (JSON file) instead")
+    send_parser.add_argument("--secret", help="Webhook secret to sign with (or use WEBHOOK_SECRET env var)")
+
+    args = parser.parse_args()
+    secret = args.secret or os.getenv("WEBHOOK_SECRET")
+
+    if args.command == "send":
+        try:
+            if args.payload:
+                with open(args.payload, 'r', encoding='utf-8') as f:
+                    payload = json.load(f)
+            elif args.repo and args.pr:
+                payload = sample_payload(args.repo, args.pr)
+            else:
+                print("Error: pass --payload, or --repo and --pr")
+                return 1
+            response = send(args.url, payload, secret)
+        except (IOError, ValueError, requests.exceptions.RequestException) as e:
+            print(f"Error sending delivery: {e}")
+            return 1
+        print(f"{response.status_code} {response.text}")
+        return 0 if response.ok else 1
+
+    api_key = args.api_key or os.getenv("OPENROUTER_API_KEY")
+    if not api_key:
+        print("Error: OpenRouter API key is required. Set OPENROUTER_API_KEY environment variable or use --api-key")
+        return 1
+    try:
+        config = load_config(args.config)
+    except (IOError, ValueError) as e:
+        print(f"Error reading fleet configuration: {e}")
+        return 1
+
+    queue = WorkQueue(args.queue, max_attempts=args.max_attempts)
+    if queue.recovered:
+        print(f"Resuming {queue.recovered} PRs interrupted by the last shutdown")
+    service = WebhookService(config, api_key, queue, secret, args.workers, args.publish)
+    server = service.make_server(args.host, args.port)
+    service.start_workers()
+    print(f"Listening on http://{args.host}:{server.server_port}/webhook for {', '.join(service.repos)} "
+          f"({service.workers} workers, queue: {queue.counts()})")
+    if not secret:
+        print("Warning: no webhook secret set, deliveries are not authenticated")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down, waiting for running PRs...")
+    finally:
+        server.server_close()
+        service.stop()
+        queue.close()
+        service.metrics.write(args.metrics_output, args.prometheus_output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
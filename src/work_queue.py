@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Durable PR work queue
+PRs waiting to be summarized are kept in a SQLite database, so queued and interrupted work
+survives a restart; failed PRs are retried with exponential backoff up to a maximum number of attempts
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+
+class WorkQueue:
+    def __init__(self, path: str, max_attempts: int = 3, retry_delay: float = 60):
+        """
+        Open the queue, returning PRs left running by a previous process to the queue
+
+        Args:
+            path: Database file
+            max_attempts: Attempts before a PR is marked as failed
+            retry_delay: Seconds before the first retry; doubled for every further attempt
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS jobs (
+                repository TEXT NOT NULL,
+                number INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                not_before REAL NOT NULL DEFAULT 0,
+                enqueued REAL NOT NULL,
+                updated REAL NOT NULL,
+                error TEXT,
+                payload TEXT,
+                PRIMARY KEY (repository, number)
+            );
+            CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, not_before, enqueued);
+        """)
+        with self._lock:
+            self.recovered = self._conn.execute(
+                "UPDATE jobs SET status = 'pending', updated = ? WHERE status = 'running'", (time.time(),)
+            ).rowcount
+            self._conn.commit()
+
+    def enqueue(self, repository: str, number: int, payload: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Queue a PR unless it is already queued, running or done
+
+        A PR that failed before is queued again with a fresh attempt count.
+
+        Args:
+            repository: "owner/repo"
+            number: Pull Request number
+            payload: PR metadata to hand to the worker (e.g. the webhook's pull_request object)
+
+        Returns:
+            True if the PR was queued
+        """
+        now = time.time()
+        data = json.dumps(payload, ensure_ascii=False) if payload is not None else None
+        with self._available:
+            row = self._conn.execute("SELECT status FROM jobs WHERE repository = ? AND number = ?",
+                                     (repository, number)).fetchone()
+            if row and row[0] != "failed":
+                return False
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (repository, number, status, attempts, not_before, enqueued, updated, payload) "
+                "VALUES (?, ?, 'pending', 0, 0, ?, ?, ?)",
+                (repository, number, now, now, data),
+            )
+            self._conn.commit()
+            self._available.notify()
+        return True
+
+    def claim(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Take the oldest PR that is due and mark it as running
+
+        Args:
+            timeout: Seconds to wait for work, None to wait until a PR is due
+
+        Returns:
+            Dict with "repository", "number", "attempts" and "payload", or None if nothing was due in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._available:
+            while True:
+                now = time.time()
+                row = self._conn.execute(
+                    "SELECT repository, number, attempts, payload FROM jobs "
+                    "WHERE status = 'pending' AND not_before <= ? ORDER BY enqueued LIMIT 1", (now,)
+                ).fetchone()
+                if row:
+                    self._conn.execute("UPDATE jobs SET status = 'running', updated = ? WHERE repository = ? AND number = ?",
+                                       (now, row[0], row[1]))
+                    self._conn.commit()
+                    return {"repository": row[0], "number": row[1], "attempts": row[2],
+                            "payload": json.loads(row[3]) if row[3] else None}
+
+                # Sleep until new work arrives, the next retry is due or the timeout ends
+                wait = None
+                next_due = self._conn.execute(
+                    "SELECT MIN(not_before) FROM jobs WHERE status = 'pending'").fetchone()[0]
+                if next_due is not None:
+                    wait = max(0.0, next_due - now)
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._available.wait(wait)
+
+    def complete(self, repository: str, number: int):
+        """Mark a claimed PR as done"""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = 'done', error = NULL, updated = ? "
+                               "WHERE repository = ? AND number = ?", (time.time(), repository, number))
+            self._conn.commit()
+
+    def fail(self, repository: str, number: int, error: str) -> bool:
+        """
+        Record a failed attempt of a claimed PR
+
+        Returns:
+            True if the PR will be retried, False if it ran out of attempts
+        """
+        now = time.time()
+        with self._available:
+            attempts = self._conn.execute("SELECT attempts FROM jobs WHERE repository = ? AND number = ?",
+                                          (repository, number)).fetchone()[0] + 1
+            retry = attempts < self.max_attempts
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, not_before = ?, error = ?, updated = ? "
+                "WHERE repository = ? AND number = ?",
+                ("pending" if retry else "failed", attempts, now + self.retry_delay * 2 ** (attempts - 1),
+                 error, now, repository, number),
+            )
+            self._conn.commit()
+            if retry:
+                self._available.notify()
+        return retry
+
+    def counts(self) -> Dict[str, int]:
+        """Number of PRs per status (pending, running, done, failed)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,15 @@
+from metrics import percentile
+
+
+def test_percentile_nearest_rank():
+    assert percentile([1, 2], 0.5) == 1
+    assert percentile([1, 2, 3, 4, 5, 6], 0.5) == 3
+    assert percentile(list(range(1, 21)), 0.95) == 19
+    assert percentile(list(range(1, 101)), 0.99) == 99
+
+
+def test_percentile_bounds():
+    assert percentile([], 0.5) is None
+    assert percentile([7], 0.95) == 7
+    assert percentile([3, 1, 2], 0.0) == 1
+    assert percentile([3, 1, 2], 1.0) == 3
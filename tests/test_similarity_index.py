@@ -0,0 +1,29 @@
+from diff_filter import stat_summary
+from similarity_index import SimilarityIndex
+
+ANALYSIS = "### Summary\n- Change\n\n### Title\nChange"
+
+
+def docs_diff(lines: int) -> str:
+    body = "".join(f"+Line {i} of the page explains how the runner picks up new jobs\n" for i in range(lines))
+    return f"diff --git a/docs/runner.md b/docs/runner.md\n--- a/docs/runner.md\n+++ b/docs/runner.md\n@@ -1,1 +1,{lines + 1} @@\n intro\n{body}"
+
+
+def test_summarized_files_alone_never_match(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "index.jsonl"))
+    index.add(1, stat_summary([({"filename": "data/big.json", "additions": 5000, "deletions": 10}, "over budget")]), ANALYSIS)
+    other = stat_summary([({"filename": "data/big.json", "additions": 3, "deletions": 4000}, "over budget")])
+    assert index.query(other, 0.95) is None
+
+
+def test_small_diffs_never_match(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "index.jsonl"))
+    index.add(1, docs_diff(1), ANALYSIS)
+    assert index.query(docs_diff(1), 0.95, exclude=2) is None
+
+
+def test_duplicate_diff_matches(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "index.jsonl"))
+    index.add(1, docs_diff(10), ANALYSIS)
+    record, score, reverted = index.query(docs_diff(10), 0.95, exclude=2)
+    assert record["number"] == 1 and score == 1.0 and not reverted
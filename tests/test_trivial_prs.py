@@ -0,0 +1,72 @@
+import pytest
+
+from trivial_prs import allowed_edit_distance, classify_trivial, edit_distance, is_typo_edit
+
+
+def docs_diff(before: str, after: str) -> str:
+    return (
+        "diff --git a/content/index.md b/content/index.md\n"
+        "index 1111111..2222222 100644\n"
+        "--- a/content/index.md\n"
+        "+++ b/content/index.md\n"
+        "@@ -1,3 +1,3 @@\n"
+        " # Title\n"
+        f"-{before}\n"
+        f"+{after}\n"
+        " End\n"
+    )
+
+
+@pytest.mark.parametrize("before, after", [
+    ("This is the defualt.", "This is the default."),
+    ("Then run the comand.", "Then run the command."),
+    ("You will recieve a token.", "You will receive a token."),
+    ("See the configuraton page.", "See the configuration page."),
+    ("Hello world", "Hello, world"),
+])
+def test_typo_edits(before, after):
+    assert is_typo_edit(before, after)
+
+
+@pytest.mark.parametrize("before, after", [
+    ("You must restart the runner.", "You must not restart the runner."),
+    ("This is enabled by default.", "This is disabled by default."),
+    ("Wait 30 seconds.", "Wait 300 seconds."),
+    ("Requires admin access.", "Requires no admin access."),
+    ("The feature is able to sync.", "The feature is unable to sync."),
+    ("Use the the API.", "Use the API."),
+    ("Same line", "Same line"),
+    ("This is teh default.", "This is the default."),
+    ("The job is now running.", "The job is not running."),
+    ("Turn the setting on.", "Turn the setting off."),
+    ("Set the min value.", "Set the max value."),
+    ("Send a GET request.", "Send a PUT request."),
+    ("Use an http URL.", "Use an https URL."),
+    ("Choose the form field.", "Choose the from field."),
+])
+def test_content_changes_are_not_typos(before, after):
+    assert not is_typo_edit(before, after)
+
+
+def test_edit_distance():
+    assert edit_distance("teh", "the") == 2
+    assert edit_distance("now", "not") == 1
+    assert edit_distance("recieve", "receive") == 2
+    assert edit_distance("enabled", "disabled") == 3
+
+
+def test_classify_typo_fix():
+    result = classify_trivial(docs_diff("This is the defualt.", "This is the default."), {"user": {"login": "octocat"}}, [])
+    assert result is not None
+    assert result[0] == "typo_fix"
+
+
+def test_classify_negation_is_not_trivial():
+    diff = docs_diff("You must restart the runner.", "You must not restart the runner.")
+    assert classify_trivial(diff, {"user": {"login": "octocat"}}, []) is None
+
+
+def test_allowed_edit_distance_scales_with_length():
+    assert allowed_edit_distance(3) == 0
+    assert allowed_edit_distance(4) == 1
+    assert allowed_edit_distance(7) == 2